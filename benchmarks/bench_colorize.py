@@ -0,0 +1,51 @@
+from __future__ import print_function
+import numpy as np
+import argparse
+import time
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fcn.config import TRAIN_CLASSES, NUM_OF_CLASSES, RGB_OF_CLASSES
+from fcn.colorize import colorize, blend
+
+"""
+Palette lookup colorization against the per-class mask loop, at 256x512 and 1024x2048
+    python benchmarks/bench_colorize.py
+"""
+def colorize_loop(preds):
+    out = []
+    for pred in preds:
+        lab_image = np.zeros(pred.shape + (3,))
+        for i in range(NUM_OF_CLASSES):
+            lab_image[pred==i] = RGB_OF_CLASSES[TRAIN_CLASSES[i]]
+        out.append(lab_image)
+    return out
+
+
+def timeit(fn, repeat):
+    fn()
+    start = time.time()
+    for _ in range(repeat):
+        fn()
+    return (time.time() - start) / repeat
+
+
+def main(batch, repeat):
+    rng = np.random.RandomState(0)
+    print("%-10s %12s %12s %12s %9s" % ("size", "loop ms/img", "lut ms/img", "blend ms/img", "speedup"))
+    for height, width in [(256, 512), (1024, 2048)]:
+        preds = rng.randint(0, NUM_OF_CLASSES+1, size=(batch, height, width)).astype(np.uint8)
+        images = rng.randint(0, 256, size=(batch, height, width, 3)).astype(np.uint8)
+        assert all(np.array_equal(a, b) for a, b in zip(colorize_loop(preds), colorize(preds)))
+        t_loop = timeit(lambda: colorize_loop(preds), repeat) / batch
+        t_lut = timeit(lambda: colorize(preds), repeat) / batch
+        t_blend = timeit(lambda: blend(images, colorize(preds)), repeat) / batch
+        print("%-10s %12.2f %12.2f %12.2f %8.1fx" % ("%dx%d" % (height, width), t_loop*1e3, t_lut*1e3, t_blend*1e3, t_loop/t_lut))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Colorization benchmark')
+    parser.add_argument('--batch', type=int, default=8, help='Predictions per batch')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed repetitions')
+    args = parser.parse_args()
+    main(args.batch, args.repeat)
@@ -0,0 +1,86 @@
+from __future__ import print_function
+import tensorflow as tf
+import numpy as np
+import argparse
+import time
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fcn.config import IMSIZE_X, IMSIZE_Y
+from fcn.models import BACKBONES, HEADS, inference, variant_name
+
+"""
+Parameters, FLOPs and latency of every fc6/fc7 head for both backbones, skip and non-skip,
+printed as a markdown table. FLOPs count the multiply-adds (x2) of the convolutions at the
+given image size, latency is the median of --steps forward passes of one random image.
+    python benchmarks/bench_heads.py [--height 256 --width 512] [--output heads.md]
+"""
+# The original fc head first, the baseline of the others
+HEAD_ORDER = ['fc'] + sorted(head for head in HEADS if head != 'fc')
+CONV_OPS = ['Conv2D', 'DepthwiseConv2dNative', 'Conv2DBackpropInput']
+
+
+def conv_flops(graph):
+    """ 2 * multiply-adds of the convolutions and transposed convolutions of graph """
+    flops = 0
+    for op in graph.get_operations():
+        if op.type not in CONV_OPS:
+            continue
+        if op.type == 'Conv2DBackpropInput':
+            # Transposed convolution: every input pixel is multiplied by the whole kernel
+            kernel = op.inputs[1].shape.as_list()
+            pixels = np.prod(op.inputs[2].shape.as_list()[:3])
+            flops += 2 * pixels * np.prod(kernel)
+        else:
+            kernel = op.inputs[1].shape.as_list()
+            out = op.outputs[0].shape.as_list()
+            per_output = np.prod(kernel[:3]) if op.type == 'Conv2D' else np.prod(kernel[:2])
+            flops += 2 * np.prod(out) * per_output
+    return flops
+
+
+def measure(backbone, skip, head, height, width, num_steps):
+    """ (parameters, FLOPs, median ms per image) of one variant """
+    with tf.Graph().as_default() as graph:
+        image = tf.placeholder(tf.float32, shape=[1, height, width, 3])
+        pred_label, logits, reg_loss = inference(image, 1.0, backbone, skip, head=head)
+        params = sum(np.prod(v.shape.as_list()) for v in tf.trainable_variables())
+        flops = conv_flops(graph)
+        feed = {image: np.random.RandomState(0).uniform(0, 255, size=(1, height, width, 3))}
+        with tf.Session() as sess:
+            sess.run(tf.global_variables_initializer())
+            for _ in range(2):
+                sess.run(pred_label, feed_dict=feed)
+            latency = []
+            for _ in range(num_steps):
+                start = time.time()
+                sess.run(pred_label, feed_dict=feed)
+                latency.append(time.time() - start)
+    return params, flops, 1000 * np.median(latency)
+
+
+def main(height, width, num_steps, output=None):
+    lines = ["Heads at %dx%d, batch 1" % (height, width), "",
+             "| variant | head | params (M) | GFLOPs | latency (ms) |",
+             "|---|---|---:|---:|---:|"]
+    print("\n".join(lines))
+    for backbone in sorted(BACKBONES):
+        for skip in [True, False]:
+            for head in HEAD_ORDER:
+                params, flops, latency = measure(backbone, skip, head, height, width, num_steps)
+                lines.append("| %s | %s | %.1f | %.1f | %.1f |" % (variant_name(backbone, skip), head, params / 1e6,
+                                                                  flops / 1e9, latency))
+                print(lines[-1])
+    if output:
+        with open(output, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='fc6/fc7 head benchmark')
+    parser.add_argument('--height', type=int, default=IMSIZE_X, help='Image height')
+    parser.add_argument('--width', type=int, default=IMSIZE_Y, help='Image width')
+    parser.add_argument('--steps', type=int, default=10, help='Timed forward passes')
+    parser.add_argument('--output', type=str, help='Markdown file to write the table to')
+    args = parser.parse_args()
+    main(args.height, args.width, args.steps, args.output)
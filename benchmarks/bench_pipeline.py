@@ -0,0 +1,48 @@
+from __future__ import print_function
+import tensorflow as tf
+import argparse
+import time
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fcn.config import BATCH_SIZE, TRAIN_CLASSES, PIPELINE_CONFIGS
+from fcn.data import setup_dataset, setup_dataset_dir
+from fcn.labelstore import open_label_store
+
+"""
+Input pipeline throughput (images/sec) for every --pipeline configuration, with and without caching
+    python benchmarks/bench_pipeline.py --dataset DATASET_DIR
+"""
+def bench(im_fpath, lab_fpath, label_store, config, cache, num_batches, warmup):
+    with tf.Graph().as_default():
+        dataset = setup_dataset(im_fpath, lab_fpath, label_store, cache=cache, **config)
+        batch = dataset.make_one_shot_iterator().get_next()
+        with tf.Session() as sess:
+            for _ in range(warmup):
+                sess.run(batch)
+            start = time.time()
+            for _ in range(num_batches):
+                sess.run(batch)
+            elapsed = time.time() - start
+    return num_batches * BATCH_SIZE / elapsed
+
+
+def main(data_dir, num_batches, warmup):
+    im_fpath, lab_fpath = setup_dataset_dir(data_dir, dataset_mode="train")
+    label_store = open_label_store(data_dir, "train", TRAIN_CLASSES, lab_fpath=lab_fpath)
+    print("%-10s %-8s %12s" % ("pipeline", "cache", "images/sec"))
+    for name in sorted(PIPELINE_CONFIGS):
+        for cache in [None, ""]:
+            # The warmup fills the cache, so measured batches come from memory
+            ips = bench(im_fpath, lab_fpath, label_store, PIPELINE_CONFIGS[name], cache,
+                        num_batches, warmup if cache is None else max(warmup, len(im_fpath) // BATCH_SIZE + 1))
+            print("%-10s %-8s %12.2f" % (name, "none" if cache is None else "memory", ips))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Input pipeline benchmark')
+    parser.add_argument('--dataset', type=str, required=True, help='Specify the directory of dataset')
+    parser.add_argument('--batches', type=int, default=50, help='Number of timed batches')
+    parser.add_argument('--warmup', type=int, default=5, help='Number of untimed batches')
+    args = parser.parse_args()
+    main(args.dataset, args.batches, args.warmup)
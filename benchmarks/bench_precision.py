@@ -0,0 +1,90 @@
+from __future__ import print_function
+import tensorflow as tf
+import numpy as np
+import argparse
+import time
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fcn.config import NUM_OF_CLASSES, IMSIZE_X, IMSIZE_Y
+from fcn.models import BACKBONES, inference
+from fcn.precision import DTYPES
+from fcn.train import build_model
+
+"""
+float32 against float16/bfloat16 compute: inference images/sec, training steps/sec, weight
+memory and agreement of the predictions with float32, on synthetic images. The same weights
+are used by every precision, restored from --checkpoint (a LOG_DIR) or randomly initialized.
+    python benchmarks/bench_precision.py --model vgg --skip --batch 4 [--checkpoint logs/VGG_skip_c19/]
+"""
+PRECISIONS = ['float32', 'float16', 'bfloat16']
+
+
+def timed(sess, fetch, feed_dict, num_steps):
+    for _ in range(2):
+        sess.run(fetch, feed_dict=feed_dict)
+    start = time.time()
+    for _ in range(num_steps):
+        sess.run(fetch, feed_dict=feed_dict)
+    return num_steps / (time.time() - start)
+
+
+def run_precision(precision, backbone, skip, images, labels, weights, checkpoint, num_steps):
+    """ Returns (logits, images/sec, steps/sec, weight bytes) and the float32 weights used """
+    with tf.Graph().as_default():
+        image = tf.placeholder(tf.float32, shape=images.shape)
+        pred_label, logits, reg_loss = inference(image, 1.0, backbone, skip, precision=precision)
+        variables = dict((v.op.name, v) for v in tf.global_variables())
+        with tf.Session() as sess:
+            sess.run(tf.global_variables_initializer())
+            if checkpoint:
+                reader = tf.train.NewCheckpointReader(tf.train.latest_checkpoint(checkpoint))
+                weights = dict((name, reader.get_tensor(name)) for name in variables)
+            elif weights is None:
+                weights = dict((name, sess.run(v)) for name, v in variables.items())
+            for name, v in variables.items():
+                v.load(weights[name], sess)
+            out = sess.run(logits, feed_dict={image: images})
+            ips = timed(sess, pred_label, {image: images}, num_steps) * len(images)
+        weight_bytes = sum(w.size for w in weights.values()) * DTYPES[precision].size
+
+    with tf.Graph().as_default():
+        img, ann = tf.data.Dataset.from_tensors((images, labels)).repeat().make_one_shot_iterator().get_next()
+        loss, pixel_acc, train_op, global_step, confusion = build_model(img, ann, 0.85, backbone, skip, sparse=True, precision=precision)
+        with tf.Session() as sess:
+            sess.run([tf.global_variables_initializer(), tf.local_variables_initializer()])
+            sps = timed(sess, train_op, None, num_steps)
+    return (out, ips, sps, weight_bytes), weights
+
+
+def main(backbone, skip, batch, height, width, num_steps, checkpoint):
+    rng = np.random.RandomState(0)
+    images = rng.uniform(0, 255, size=(batch, height, width, 3)).astype(np.float32)
+    labels = rng.randint(0, NUM_OF_CLASSES+1, size=(batch, height, width)).astype(np.uint8)
+    results, weights = {}, None
+    for precision in PRECISIONS:
+        results[precision], weights = run_precision(precision, backbone, skip, images, labels, weights, checkpoint, num_steps)
+
+    reference = results['float32'][0]
+    print("%s %s %dx%d, batch %d" % (BACKBONES[backbone].name, "skip" if skip else "non-skip", height, width, batch))
+    print("%-9s %11s %11s %10s %10s %12s" % ("precision", "images/sec", "steps/sec", "weights MB", "agreement", "max |dlogit|"))
+    for precision in PRECISIONS:
+        logits, ips, sps, weight_bytes = results[precision]
+        agreement = np.mean(np.argmax(logits, axis=3) == np.argmax(reference, axis=3))
+        print("%-9s %11.2f %11.3f %10.1f %9.2f%% %12.4g" % (precision, ips, sps, weight_bytes / 1e6, 100 * agreement,
+                                                           np.max(np.abs(logits - reference))))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Reduced precision benchmark')
+    parser.add_argument('--model', type=str, default='vgg', choices=sorted(BACKBONES), help='Backbone network')
+    parser.add_argument('--skip', dest='skip', action='store_true', help='Decoder with skip connections')
+    parser.add_argument('--noskip', dest='skip', action='store_false', help='Decoder without skip connections')
+    parser.set_defaults(skip=True)
+    parser.add_argument('--batch', type=int, default=4, help='Images per batch')
+    parser.add_argument('--height', type=int, default=IMSIZE_X, help='Image height')
+    parser.add_argument('--width', type=int, default=IMSIZE_Y, help='Image width')
+    parser.add_argument('--steps', type=int, default=10, help='Timed steps')
+    parser.add_argument('--checkpoint', type=str, help='LOG_DIR to take the weights from')
+    args = parser.parse_args()
+    main(args.model, args.skip, args.batch, args.height, args.width, args.steps, args.checkpoint)
@@ -0,0 +1,140 @@
+from __future__ import print_function
+from six.moves import http_client
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+import tensorflow as tf
+import numpy as np
+import threading
+import argparse
+import socket
+import json
+import time
+import sys
+import io
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fcn.config import load_config
+from fcn.models import BACKBONES
+from fcn import serve
+
+"""
+Load generator for the serve mode: --concurrency clients each send their share of --requests
+images to POST /segment, and the p50/p99 latency and throughput are printed. Either against a
+running server (--url http://host:port or --socket PATH), or against servers started here for
+each batch window of --windows (in ms), same model settings as the serve mode:
+    python benchmarks/bench_serve.py --url http://127.0.0.1:8000 --concurrency 8
+    python benchmarks/bench_serve.py --model alexnet --batch 8 --windows 0 5 10 20 --concurrency 16
+"""
+
+
+class UnixHTTPConnection(http_client.HTTPConnection):
+    def __init__(self, socket_path, timeout=60):
+        http_client.HTTPConnection.__init__(self, 'localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.socket_path)
+
+
+def connect(url=None, socket_path=None):
+    if socket_path:
+        return UnixHTTPConnection(socket_path)
+    host, port = url.split('://')[-1].rstrip('/').split(':')
+    return http_client.HTTPConnection(host, int(port), timeout=60)
+
+
+def encode_image(path, height, width):
+    image = Image.open(path).convert('RGB') if path else \
+        Image.fromarray(np.random.RandomState(0).randint(0, 256, size=(height, width, 3)).astype(np.uint8))
+    png = io.BytesIO()
+    image.save(png, format='PNG')
+    return png.getvalue()
+
+
+def load(body, num_requests, concurrency, output, url=None, socket_path=None):
+    """ (latencies in seconds, seconds, batch sizes reported by the server) of num_requests requests """
+    latencies, batch_sizes = [], []
+    lock = threading.Lock()
+
+    def client(count):
+        conn = connect(url, socket_path)
+        for _ in range(count):
+            start = time.time()
+            conn.request('POST', '/segment?output=' + output, body, {'Content-Type': 'image/png'})
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                raise IOError("HTTP %d" % response.status)
+            with lock:
+                latencies.append(time.time() - start)
+                batch_sizes.append(int(response.getheader('X-Batch-Size', 0)))
+        conn.close()
+    counts = [num_requests // concurrency + (i < num_requests % concurrency) for i in range(concurrency)]
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for result in [pool.submit(client, c) for c in counts]:
+            result.result()
+    return latencies, time.time() - start, batch_sizes
+
+
+def report(name, latencies, elapsed, batch_sizes):
+    print("%-12s %10.1f %10.1f %12.1f %11.2f" % (name, 1000 * np.percentile(latencies, 50), 1000 * np.percentile(latencies, 99),
+                                                  len(latencies) / elapsed, np.mean(batch_sizes)))
+
+
+def main(args):
+    body = encode_image(args.image, args.height, args.width)
+    header = "%-12s %10s %10s %12s %11s" % ("window (ms)", "p50 (ms)", "p99 (ms)", "requests/s", "mean batch")
+    if args.url or args.socket:
+        conn = connect(args.url, args.socket)
+        conn.request('GET', '/health')
+        print("Server: %s" % json.loads(conn.getresponse().read().decode('utf-8')))
+        conn.close()
+        load(body, args.concurrency, args.concurrency, args.output, args.url, args.socket)
+        print(header)
+        report('server', *load(body, args.requests, args.concurrency, args.output, args.url, args.socket))
+        return
+
+    config = load_config(None, {'model': args.model, 'skip': args.skip, 'inference_batch_size': args.batch,
+                                'serve_random_weights': True})
+    results = []
+    with tf.Session() as sess:
+        image, pred, checkpoint = serve.build(sess, config)
+        for window in args.windows:
+            batcher = serve.Batcher(sess, image, pred, args.batch, window / 1000.0)
+            server = serve.make_server(batcher, config, port=0)
+            thread = threading.Thread(target=server.serve_forever)
+            thread.daemon = True
+            thread.start()
+            url = 'http://127.0.0.1:%d' % server.server_address[1]
+            # Warm up
+            load(body, args.concurrency, args.concurrency, args.output, url)
+            results.append((window, load(body, args.requests, args.concurrency, args.output, url)))
+            server.shutdown()
+            server.server_close()
+            batcher.close()
+    print("%s %s, batch %d, %d clients, %d requests" % (BACKBONES[args.model].name, "skip" if args.skip else "non-skip",
+                                                        args.batch, args.concurrency, args.requests))
+    print(header)
+    for window, result in results:
+        report('%g' % window, *result)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Serve mode load generator')
+    parser.add_argument('--url', type=str, help='Running server, e.g. http://127.0.0.1:8000')
+    parser.add_argument('--socket', type=str, help='Unix socket of a running server')
+    parser.add_argument('--model', type=str, default='vgg', choices=sorted(BACKBONES), help='Backbone network of the servers started here')
+    parser.add_argument('--skip', dest='skip', action='store_true', help='Decoder with skip connections')
+    parser.add_argument('--noskip', dest='skip', action='store_false', help='Decoder without skip connections')
+    parser.set_defaults(skip=True)
+    parser.add_argument('--batch', type=int, default=8, help='Maximum batch size of the servers started here')
+    parser.add_argument('--windows', type=float, nargs='+', default=[0, 5, 10, 20], help='Batch windows (ms) of the servers started here')
+    parser.add_argument('--image', type=str, help='Image sent by the clients, random pixels by default')
+    parser.add_argument('--height', type=int, default=1024, help='Height of the random image')
+    parser.add_argument('--width', type=int, default=2048, help='Width of the random image')
+    parser.add_argument('--output', type=str, default='label', choices=serve.OUTPUTS, help='Requested output')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients')
+    parser.add_argument('--requests', type=int, default=200, help='Requests in total')
+    main(parser.parse_args())
@@ -0,0 +1,83 @@
+from __future__ import print_function
+import subprocess
+import resource
+import argparse
+import json
+import time
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+"""
+Cold start of inference: time from process start (imports included) to the first prediction and
+peak resident memory, each path measured in fresh processes.
+    checkpoint  build inference(), run the initializers, restore the latest checkpoint
+    frozen      import LOG_DIR/frozen/model.pb of --mode export --set export_format=frozen
+    inference   import LOG_DIR/inference/model.meta and restore its weights (export_format=inference)
+Export both first; paths without an export are skipped.
+    python benchmarks/bench_startup.py --model vgg --skip [--runs 3]
+"""
+PATHS = ['checkpoint', 'frozen', 'inference']
+
+
+def child(path, config_args):
+    start = time.time()
+    import tensorflow as tf
+    import numpy as np
+    from fcn.config import load_config
+    from fcn.checkpoint import restore_latest
+    from fcn.export import export_dir, frozen_session_config, load_export
+    from fcn.models import inference, model_log_dir
+    config = load_config(None, config_args)
+    imported = time.time()
+    batch = np.zeros([1] + list(config.image_size) + [3], dtype=np.float32)
+    with tf.Session(config=frozen_session_config() if path == 'frozen' else None) as sess:
+        if path != 'checkpoint':
+            image, pred, logits = load_export(sess, export_dir(config, path), path)
+        else:
+            image = tf.placeholder(tf.float32, shape=[None] + list(config.image_size) + [3])
+            pred, logits, regularization_loss = inference(image, 1.0, config.model, config.skip, config.num_classes, head=config.head)
+            sess.run(tf.global_variables_initializer())
+            restore_latest(sess, tf.train.Saver(), model_log_dir(config))
+        loaded = time.time()
+        sess.run(pred, feed_dict={image: batch})
+        first = time.time()
+        sess.run(pred, feed_dict={image: batch})
+        second = time.time()
+    print(json.dumps({'import_secs': imported - start, 'load_secs': loaded - imported, 'first_run_secs': first - loaded,
+                      'total_secs': first - start, 'warm_run_secs': second - first,
+                      'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0}))
+
+
+def main(config_args, runs):
+    from fcn.config import load_config
+    from fcn.export import export_dir
+    config = load_config(None, config_args)
+    print("%-11s %10s %10s %10s %11s %10s %13s" % ("path", "imports s", "load s", "1st run s", "to 1st run", "warm run s", "peak RSS MB"))
+    for path in PATHS:
+        if path != 'checkpoint' and not os.path.exists(export_dir(config, path)):
+            print("%-11s no export in %s" % (path, export_dir(config, path)))
+            continue
+        results = []
+        for _ in range(runs):
+            out = subprocess.check_output([sys.executable, os.path.abspath(__file__), '--child', path, '--settings', json.dumps(config_args)])
+            results.append(json.loads(out.decode('utf-8').strip().splitlines()[-1]))
+        best = min(results, key=lambda r: r['total_secs'])
+        print("%-11s %10.2f %10.2f %10.2f %11.2f %10.3f %13.0f" % (path, best['import_secs'], best['load_secs'], best['first_run_secs'],
+                                                                 best['total_secs'], best['warm_run_secs'], best['peak_rss_mb']))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Inference cold start benchmark')
+    parser.add_argument('--model', type=str, default='vgg', choices=['alexnet', 'vgg'], help='Backbone network')
+    parser.add_argument('--skip', dest='skip', action='store_true', help='Decoder with skip connections')
+    parser.add_argument('--noskip', dest='skip', action='store_false', help='Decoder without skip connections')
+    parser.set_defaults(skip=True)
+    parser.add_argument('--runs', type=int, default=3, help='Processes per path, the fastest is reported')
+    parser.add_argument('--child', type=str, choices=PATHS, help=argparse.SUPPRESS)
+    parser.add_argument('--settings', type=str, default='{}', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, json.loads(args.settings))
+    else:
+        main({'model': args.model, 'skip': args.skip}, args.runs)
@@ -0,0 +1,242 @@
+from __future__ import print_function
+from PIL import Image
+import tensorflow as tf
+import numpy as np
+import scipy.io as spio
+import multiprocessing
+import subprocess
+import resource
+import platform
+import argparse
+import datetime
+import shutil
+import json
+import time
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fcn.config import BATCH_SIZE, IMSIZE_X, IMSIZE_Y, NUM_OF_CLASSES, PIPELINE_CONFIGS
+from fcn.data import setup_dataset
+from fcn.models import inference, variant_name, variants
+from fcn.train import build_model
+
+"""
+Benchmark suite of the four FCN variants (AlexNet/VGG, skip/non-skip) on CPU-friendly synthetic
+data, no dataset needed. Each variant runs in fresh processes, one for inference and one for
+training, so every peak RSS is its own:
+    parameters, size of the inference weights and of a training checkpoint (Adam slots included)
+    inference images/sec at every --batches size and --sizes resolution
+    training steps/sec at the first resolution (batch BATCH_SIZE, sparse labels)
+plus the images/sec of every input pipeline configuration on generated PNG/.mat files.
+The results, with the commit, TensorFlow version and host, go to --output (default
+benchmarks/results/<commit>.json); --compare prints the ratio of every metric to an older run.
+    python benchmarks/bench_suite.py [--sizes 128x256 256x512] [--batches 1 4] [--variants AlexNet VGG_skip]
+    python benchmarks/bench_suite.py --compare benchmarks/results/OLD.json
+"""
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+# Ratios below 1 - TOLERANCE (above 1 + TOLERANCE for memory) are flagged by --compare
+TOLERANCE = 0.1
+
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _size_mb(directory):
+    return sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory)) / 1e6
+
+
+def _timed(sess, fetches, feed_dict, num_steps, warmup=2):
+    """ Seconds per run of fetches after warmup runs """
+    for _ in range(warmup):
+        sess.run(fetches, feed_dict=feed_dict)
+    start = time.time()
+    for _ in range(num_steps):
+        sess.run(fetches, feed_dict=feed_dict)
+    return (time.time() - start) / num_steps
+
+
+def bench_inference(backbone, skip, sizes, batches, num_steps, tmp_dir):
+    result = {'inference': []}
+    rng = np.random.RandomState(0)
+    for height, width in sizes:
+        with tf.Graph().as_default():
+            image = tf.placeholder(tf.float32, shape=[None, height, width, 3])
+            pred_label, logits, regularization_loss = inference(image, 1.0, backbone, skip)
+            with tf.Session() as sess:
+                sess.run(tf.global_variables_initializer())
+                if 'params' not in result:
+                    result['params'] = int(sum(np.prod(v.shape.as_list()) for v in tf.trainable_variables()))
+                    tf.train.Saver().save(sess, os.path.join(tmp_dir, 'model.ckpt'), write_meta_graph=False, write_state=False)
+                    result['weights_mb'] = _size_mb(tmp_dir)
+                for batch in batches:
+                    feed = {image: rng.uniform(0, 255, size=(batch, height, width, 3)).astype(np.float32)}
+                    secs = _timed(sess, pred_label, feed, num_steps)
+                    result['inference'].append({'height': height, 'width': width, 'batch': batch,
+                                                'images_per_sec': batch / secs, 'ms_per_batch': 1000 * secs})
+    result['inference_peak_rss_mb'] = _peak_rss_mb()
+    return result
+
+
+def bench_train(backbone, skip, size, num_steps, tmp_dir):
+    height, width = size
+    rng = np.random.RandomState(0)
+    images = rng.uniform(0, 255, size=(BATCH_SIZE, height, width, 3)).astype(np.float32)
+    labels = rng.randint(0, NUM_OF_CLASSES + 1, size=(BATCH_SIZE, height, width)).astype(np.uint8)
+    img, ann = tf.data.Dataset.from_tensors((images, labels)).repeat().make_one_shot_iterator().get_next()
+    loss, pixel_acc, train_op, global_step, confusion = build_model(img, ann, 0.85, backbone, skip, sparse=True)
+    with tf.Session() as sess:
+        sess.run(tf.global_variables_initializer())
+        secs = _timed(sess, train_op, None, num_steps)
+        tf.train.Saver().save(sess, os.path.join(tmp_dir, 'model.ckpt'), write_meta_graph=False, write_state=False)
+    return {'train_height': height, 'train_width': width, 'train_batch': BATCH_SIZE, 'train_steps_per_sec': 1.0 / secs,
+            'checkpoint_mb': _size_mb(tmp_dir), 'train_peak_rss_mb': _peak_rss_mb()}
+
+
+def bench_pipeline(num_files, num_batches, tmp_dir):
+    """ images/sec of every PIPELINE_CONFIGS entry on num_files generated IMSIZE_X x IMSIZE_Y images with .mat labels """
+    rng = np.random.RandomState(0)
+    im_fpath, lab_fpath = [], []
+    for i in range(num_files):
+        im_fpath.append(os.path.join(tmp_dir, 'city_%06d_000019_leftImg8bit.png' % i))
+        lab_fpath.append(os.path.join(tmp_dir, 'city_%06d_000019_gtCoarse_color.mat' % i))
+        Image.fromarray(rng.randint(0, 256, size=(IMSIZE_X, IMSIZE_Y, 3)).astype(np.uint8)).save(im_fpath[-1])
+        spio.savemat(lab_fpath[-1], {'label': np.eye(NUM_OF_CLASSES, dtype=np.uint8)[rng.randint(0, NUM_OF_CLASSES, size=(IMSIZE_X, IMSIZE_Y))]})
+    result = {}
+    for name in sorted(PIPELINE_CONFIGS):
+        with tf.Graph().as_default():
+            batch = setup_dataset(im_fpath, lab_fpath, **PIPELINE_CONFIGS[name]).make_one_shot_iterator().get_next()
+            with tf.Session() as sess:
+                result[name + '_images_per_sec'] = BATCH_SIZE / _timed(sess, batch, None, num_batches)
+    result['pipeline_peak_rss_mb'] = _peak_rss_mb()
+    return result
+
+
+def child(task, settings):
+    tmp_dir = settings['tmp_dir']
+    if task == 'pipeline':
+        return bench_pipeline(settings['files'], settings['steps'], tmp_dir)
+    if task == 'inference':
+        return bench_inference(settings['backbone'], settings['skip'], settings['sizes'], settings['batches'], settings['steps'], tmp_dir)
+    return bench_train(settings['backbone'], settings['skip'], settings['sizes'][0], settings['steps'], tmp_dir)
+
+
+def run_child(task, settings):
+    """ Result of child(task, settings) in a fresh process, {'<task>_error': ...} when it fails (e.g. killed out of memory) """
+    tmp_dir = os.path.join(settings['output_dir'], '.bench_suite_%s' % task)
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+    try:
+        out = subprocess.check_output([sys.executable, os.path.abspath(__file__), '--child', task,
+                                       '--settings', json.dumps(dict(settings, tmp_dir=tmp_dir))])
+        return json.loads(out.decode('utf-8').strip().splitlines()[-1])
+    except subprocess.CalledProcessError as e:
+        print("%s failed with exit code %d" % (task, e.returncode))
+        return {task + '_error': 'exit code %d' % e.returncode}
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def _git(*args):
+    try:
+        return subprocess.check_output(['git'] + list(args), cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.STDOUT).decode('utf-8').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    """ Commit, TensorFlow version and host of the run """
+    status = _git('status', '--porcelain', '--untracked-files=no')
+    return {'commit': _git('rev-parse', 'HEAD'), 'dirty': bool(status) if status is not None else None,
+            'date': datetime.datetime.now().isoformat(), 'tensorflow': tf.__version__, 'python': platform.python_version(),
+            'platform': platform.platform(), 'processor': platform.processor(), 'cpus': multiprocessing.cpu_count()}
+
+
+def print_results(results):
+    print("%-12s %10s %10s %10s %12s %10s %10s" % ("variant", "params M", "weights MB", "ckpt MB", "train step/s", "train RSS", "infer RSS"))
+    for name, r in results['variants'].items():
+        print("%-12s %10.1f %10.1f %10.1f %12.3f %10.0f %10.0f" % (
+            name, r.get('params', float('nan')) / 1e6, r.get('weights_mb', float('nan')), r.get('checkpoint_mb', float('nan')),
+            r.get('train_steps_per_sec', float('nan')), r.get('train_peak_rss_mb', float('nan')), r.get('inference_peak_rss_mb', float('nan'))))
+    print("\n%-12s %10s %6s %12s %12s" % ("variant", "size", "batch", "images/sec", "ms/batch"))
+    for name, r in results['variants'].items():
+        for row in r.get('inference', []):
+            print("%-12s %10s %6d %12.2f %12.1f" % (name, '%dx%d' % (row['height'], row['width']), row['batch'],
+                                                    row['images_per_sec'], row['ms_per_batch']))
+    print("\n" + ", ".join("%s %.1f" % (key, value) for key, value in sorted(results['pipeline'].items())))
+
+
+def _metrics(results):
+    """ Flat {metric name: (value, higher is better)} of a results dict """
+    metrics = {}
+    for name, r in results.get('variants', {}).items():
+        for key in ['train_steps_per_sec', 'train_peak_rss_mb', 'inference_peak_rss_mb', 'checkpoint_mb']:
+            if key in r:
+                metrics['%s %s' % (name, key)] = (r[key], not key.endswith('_mb'))
+        for row in r.get('inference', []):
+            metrics['%s inference %dx%d batch %d images_per_sec' % (name, row['height'], row['width'], row['batch'])] = (row['images_per_sec'], True)
+    for key, value in results.get('pipeline', {}).items():
+        metrics['pipeline ' + key] = (value, not key.endswith('_mb'))
+    return metrics
+
+
+def compare(results, old_path):
+    """ Print new/old of every metric both runs have, flagging the changes for the worse beyond TOLERANCE """
+    with open(old_path) as f:
+        old = json.load(f)
+    print("\nCompared with %s (commit %s):" % (old_path, old.get('environment', {}).get('commit')))
+    new_metrics, old_metrics = _metrics(results), _metrics(old)
+    for key in sorted(set(new_metrics) & set(old_metrics)):
+        (value, higher_better), (old_value, _) = new_metrics[key], old_metrics[key]
+        ratio = value / old_value if old_value else float('nan')
+        worse = ratio < 1 - TOLERANCE if higher_better else ratio > 1 + TOLERANCE
+        print("%-60s %10.2f -> %10.2f  x%.2f%s" % (key, old_value, value, ratio, '  <-- worse' if worse else ''))
+
+
+def main(args):
+    sizes = [[int(x) for x in size.split('x')] for size in args.sizes]
+    names = dict((variant_name(backbone, skip), (backbone, skip)) for backbone, skip in variants())
+    output_dir = os.path.dirname(os.path.abspath(args.output)) if args.output else RESULTS_DIR
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    results = {'environment': environment(),
+               'settings': {'sizes': sizes, 'batches': args.batches, 'steps': args.steps, 'train_batch': BATCH_SIZE,
+                            'pipeline_files': args.files},
+               'variants': {}}
+    for name in args.variants:
+        backbone, skip = names[name]
+        settings = {'backbone': backbone, 'skip': skip, 'sizes': sizes, 'batches': args.batches, 'steps': args.steps, 'output_dir': output_dir}
+        print("Measuring %s..." % name)
+        results['variants'][name] = dict(run_child('inference', settings), **run_child('train', settings))
+    print("Measuring the input pipeline...")
+    results['pipeline'] = run_child('pipeline', {'files': args.files, 'steps': args.steps, 'output_dir': output_dir})
+    output = args.output or os.path.join(RESULTS_DIR, '%s.json' % (results['environment']['commit'] or 'results')[:12])
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print()
+    print_results(results)
+    print("\nSaved " + output)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    all_variants = [variant_name(backbone, skip) for backbone, skip in variants()]
+    parser = argparse.ArgumentParser(description='Benchmark suite of the FCN variants on synthetic data')
+    parser.add_argument('--variants', type=str, nargs='+', default=all_variants, choices=all_variants, help='Variants to measure')
+    parser.add_argument('--sizes', type=str, nargs='+', default=['%dx%d' % (IMSIZE_X // 2, IMSIZE_Y // 2), '%dx%d' % (IMSIZE_X, IMSIZE_Y)],
+                        help='Inference resolutions HEIGHTxWIDTH, training uses the first')
+    parser.add_argument('--batches', type=int, nargs='+', default=[1, 4], help='Inference batch sizes')
+    parser.add_argument('--steps', type=int, default=10, help='Timed runs of every measurement')
+    parser.add_argument('--files', type=int, default=16, help='Generated images of the input pipeline measurement')
+    parser.add_argument('--output', type=str, help='JSON results file, default benchmarks/results/<commit>.json')
+    parser.add_argument('--compare', type=str, help='JSON results of an older run to compare with')
+    parser.add_argument('--child', type=str, choices=['inference', 'train', 'pipeline'], help=argparse.SUPPRESS)
+    parser.add_argument('--settings', type=str, default='{}', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(child(args.child, json.loads(args.settings))))
+    else:
+        main(args)
@@ -0,0 +1,84 @@
+from __future__ import print_function
+from PIL import Image
+import tensorflow as tf
+import numpy as np
+import argparse
+import time
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fcn.config import IMSIZE_X, IMSIZE_Y, TRAIN_CLASSES, log_dir
+from fcn.checkpoint import restore_latest
+from fcn.data import setup_dataset_dir, _read_sparse_py_function
+from fcn.labelstore import open_label_store
+from fcn.metrics import ConfusionMatrix
+from fcn.models import BACKBONES, inference, variant_name
+from fcn.tiling import TiledSegmenter
+
+"""
+Full resolution tiled inference against downsample-then-upsample (the image resized to
+--height x --width, the logits resized back bilinearly) on the val split: latency per image and
+mIoU, both predictions compared with the labels at their stored resolution.
+    python benchmarks/bench_tiling.py --dataset DATASET_DIR --model vgg --skip --tile 512 1024 --overlap 128
+"""
+
+
+def main(data_dir, backbone, skip, image_size, tile_size, overlap, batch, max_images):
+    im_fpath, lab_fpath = setup_dataset_dir(data_dir, "val")
+    im_fpath, lab_fpath = im_fpath[:max_images], lab_fpath[:max_images]
+    label_store = open_label_store(data_dir, "val", TRAIN_CLASSES, lab_fpath=lab_fpath)
+    num_classes = len(TRAIN_CLASSES)
+    image = tf.placeholder(tf.float32, shape=[None, None, None, 3])
+    pred_label, logits, regularization_loss = inference(image, 1.0, backbone, skip, num_classes)
+    native_size = tf.placeholder(tf.int32, shape=[2])
+    upsampled = tf.argmax(tf.image.resize_bilinear(logits, native_size), axis=3)
+    matrices = {'resize': ConfusionMatrix(num_classes), 'tiled': ConfusionMatrix(num_classes)}
+    latency = {'resize': [], 'tiled': []}
+    with tf.Session() as sess:
+        sess.run(tf.global_variables_initializer())
+        if not restore_latest(sess, tf.train.Saver(), log_dir(variant_name(backbone, skip), num_classes)):
+            print("No checkpoint, random weights: only the latencies are meaningful")
+        segmenter = TiledSegmenter(sess, image, logits, tile_size, overlap, batch)
+        for i, (im_path, lab_path) in enumerate(zip(im_fpath, lab_fpath)):
+            im = Image.open(im_path).convert('RGB')
+            native = np.asarray(im, dtype=np.float32)
+            gt = label_store.read(lab_path) if label_store else _read_sparse_py_function(None, lab_path, TRAIN_CLASSES)[1]
+            preds = {}
+            start = time.time()
+            small = np.asarray(im.resize((image_size[1], image_size[0]), Image.BILINEAR), dtype=np.float32)
+            preds['resize'] = sess.run(upsampled, feed_dict={image: small[np.newaxis], native_size: native.shape[:2]})[0]
+            latency['resize'].append(time.time() - start)
+            start = time.time()
+            preds['tiled'] = segmenter(native)
+            latency['tiled'].append(time.time() - start)
+            for name, pred in preds.items():
+                # Nearest neighbour to the label resolution
+                rows = np.arange(gt.shape[0]) * pred.shape[0] // gt.shape[0]
+                cols = np.arange(gt.shape[1]) * pred.shape[1] // gt.shape[1]
+                matrices[name].update(gt, pred[rows][:, cols])
+            if i % 10 == 0:
+                print("%d/%d images" % (i, len(im_fpath)))
+
+    print("%s %s, %d val images, resize to %dx%d, tiles %dx%d overlap %d, batch %d"
+          % (BACKBONES[backbone].name, "skip" if skip else "non-skip", len(im_fpath), image_size[0], image_size[1],
+             tile_size[0], tile_size[1], overlap, batch))
+    print("%-8s %8s %14s" % ("method", "mIoU", "latency (ms)"))
+    for name in ['resize', 'tiled']:
+        print("%-8s %8.4f %14.1f" % (name, matrices[name].mean_iou(), 1000 * np.median(latency[name])))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Tiled full resolution inference benchmark')
+    parser.add_argument('--dataset', type=str, required=True, help='Dataset directory with a val split')
+    parser.add_argument('--model', type=str, default='vgg', choices=sorted(BACKBONES), help='Backbone network')
+    parser.add_argument('--skip', dest='skip', action='store_true', help='Decoder with skip connections')
+    parser.add_argument('--noskip', dest='skip', action='store_false', help='Decoder without skip connections')
+    parser.set_defaults(skip=True)
+    parser.add_argument('--height', type=int, default=IMSIZE_X, help='Height of the downsampled image')
+    parser.add_argument('--width', type=int, default=IMSIZE_Y, help='Width of the downsampled image')
+    parser.add_argument('--tile', type=int, nargs=2, default=[512, 1024], metavar=('HEIGHT', 'WIDTH'), help='Tile size')
+    parser.add_argument('--overlap', type=int, default=128, help='Tile overlap in pixels')
+    parser.add_argument('--batch', type=int, default=2, help='Tiles per sess.run')
+    parser.add_argument('--images', type=int, default=100, help='Number of val images')
+    args = parser.parse_args()
+    main(args.dataset, args.model, args.skip, (args.height, args.width), args.tile, args.overlap, args.batch, args.images)
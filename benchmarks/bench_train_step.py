@@ -0,0 +1,71 @@
+from __future__ import print_function
+import tensorflow as tf
+import numpy as np
+import argparse
+import time
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fcn.config import BATCH_SIZE, NUM_OF_CLASSES, IMSIZE_X, IMSIZE_Y
+from fcn.models import BACKBONES
+from fcn.train import build_model
+
+"""
+Training steps/sec of the old loop (separate logging forward pass and global_step reads) against
+the single sess.run step, on synthetic data
+    python benchmarks/bench_train_step.py --model vgg --skip
+"""
+def old_loop(sess, ops, feed_dict, num_steps):
+    loss, pixel_acc, train_op, global_step, summary_op = ops
+    for _ in range(num_steps):
+        sess.run(train_op, feed_dict=feed_dict)
+        step = tf.train.global_step(sess, global_step) - 1
+        if step % 10 == 0:
+            sess.run([loss, pixel_acc, summary_op], feed_dict=feed_dict)
+
+
+def new_loop(sess, ops, feed_dict, num_steps):
+    loss, pixel_acc, train_op, global_step, summary_op = ops
+    step = sess.run(global_step)
+    for _ in range(num_steps):
+        if step % 10 == 0:
+            sess.run([train_op, loss, pixel_acc, summary_op], feed_dict=feed_dict)
+        else:
+            sess.run(train_op, feed_dict=feed_dict)
+        step += 1
+
+
+def main(backbone, skip, height, width, num_steps):
+    rng = np.random.RandomState(0)
+    images = rng.uniform(0, 255, size=(BATCH_SIZE, height, width, 3)).astype(np.float32)
+    labels = np.eye(NUM_OF_CLASSES+1, dtype=np.float32)[rng.randint(0, NUM_OF_CLASSES+1, size=(BATCH_SIZE, height, width))]
+    results = {}
+    for name, loop in [('old', old_loop), ('single run', new_loop)]:
+        with tf.Graph().as_default():
+            img, ann = tf.data.Dataset.from_tensors((images, labels)).repeat().make_one_shot_iterator().get_next()
+            keep_probability = tf.placeholder(tf.float32, name="keep_probabilty")
+            loss, pixel_acc, train_op, global_step, confusion = build_model(img, ann, keep_probability, backbone, skip)
+            ops = (loss, pixel_acc, train_op, global_step, tf.summary.merge_all())
+            with tf.Session() as sess:
+                sess.run(tf.global_variables_initializer())
+                loop(sess, ops, {keep_probability: 0.85}, 2)
+                start = time.time()
+                loop(sess, ops, {keep_probability: 0.85}, num_steps)
+                results[name] = num_steps / (time.time() - start)
+    print("%s %s %dx%d, batch %d" % (BACKBONES[backbone].name, "skip" if skip else "non-skip", height, width, BATCH_SIZE))
+    for name in ['old', 'single run']:
+        print("%-12s %8.3f steps/sec" % (name, results[name]))
+    print("speedup      %8.2fx" % (results['single run'] / results['old']))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Training step benchmark')
+    parser.add_argument('--model', type=str, default='vgg', choices=sorted(BACKBONES), help='Backbone network')
+    parser.add_argument('--skip', dest='skip', action='store_true', help='Decoder with skip connections')
+    parser.add_argument('--noskip', dest='skip', action='store_false', help='Decoder without skip connections')
+    parser.set_defaults(skip=True)
+    parser.add_argument('--height', type=int, default=IMSIZE_X, help='Image height')
+    parser.add_argument('--width', type=int, default=IMSIZE_Y, help='Image width')
+    parser.add_argument('--steps', type=int, default=30, help='Timed training steps')
+    args = parser.parse_args()
+    main(args.model, args.skip, args.height, args.width, args.steps)
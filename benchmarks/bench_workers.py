@@ -0,0 +1,63 @@
+from __future__ import print_function
+import tensorflow as tf
+import numpy as np
+import argparse
+import time
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fcn.config import BATCH_SIZE, NUM_OF_CLASSES, IMSIZE_X, IMSIZE_Y
+from fcn.models import BACKBONES
+from fcn.train import build_model
+
+"""
+Scaling of data-parallel training (--workers of the train mode) on synthetic data: steps/sec
+and images/sec for every number of workers, each reading its own batch_size images, and the
+speedup and efficiency in images/sec over one worker
+    python benchmarks/bench_workers.py --model vgg --skip [--workers 1 2 4 8]
+"""
+def measure(backbone, skip, workers, batch_size, height, width, num_steps):
+    """ Training steps/sec with workers towers """
+    rng = np.random.RandomState(0)
+    with tf.Graph().as_default():
+        batches = []
+        for _ in range(workers):
+            images = rng.uniform(0, 255, size=(batch_size, height, width, 3)).astype(np.float32)
+            labels = rng.randint(0, NUM_OF_CLASSES + 1, size=(batch_size, height, width)).astype(np.uint8)
+            batches.append(tf.data.Dataset.from_tensors((images, labels)).repeat().make_one_shot_iterator().get_next())
+        img, ann = batches[0]
+        loss, pixel_acc, train_op, global_step, confusion = build_model(img, ann, 0.85, backbone, skip, sparse=True, replicas=batches[1:])
+        with tf.Session() as sess:
+            sess.run(tf.global_variables_initializer())
+            for _ in range(2):
+                sess.run(train_op)
+            start = time.time()
+            for _ in range(num_steps):
+                sess.run(train_op)
+            return num_steps / (time.time() - start)
+
+
+def main(backbone, skip, workers, batch_size, height, width, num_steps):
+    print("%s %s %dx%d, %d images per worker, %d CPUs" % (BACKBONES[backbone].name, "skip" if skip else "non-skip", height, width,
+                                                          batch_size, os.sysconf('SC_NPROCESSORS_ONLN')))
+    print("%8s %10s %11s %9s %11s" % ("workers", "steps/sec", "images/sec", "speedup", "efficiency"))
+    base = None
+    for n in workers:
+        ips = measure(backbone, skip, n, batch_size, height, width, num_steps) * n * batch_size
+        base = base or ips / n
+        print("%8d %10.3f %11.2f %8.2fx %10.0f%%" % (n, ips / (n * batch_size), ips, ips / base, 100 * ips / (base * n)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Data-parallel training scaling benchmark')
+    parser.add_argument('--model', type=str, default='vgg', choices=sorted(BACKBONES), help='Backbone network')
+    parser.add_argument('--skip', dest='skip', action='store_true', help='Decoder with skip connections')
+    parser.add_argument('--noskip', dest='skip', action='store_false', help='Decoder without skip connections')
+    parser.set_defaults(skip=True)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8], help='Numbers of workers to measure')
+    parser.add_argument('--batch', type=int, default=BATCH_SIZE, help='Images per worker and step')
+    parser.add_argument('--height', type=int, default=IMSIZE_X, help='Image height')
+    parser.add_argument('--width', type=int, default=IMSIZE_Y, help='Image width')
+    parser.add_argument('--steps', type=int, default=10, help='Timed training steps')
+    args = parser.parse_args()
+    main(args.model, args.skip, args.workers, args.batch, args.height, args.width, args.steps)
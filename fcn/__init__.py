@@ -0,0 +1,21 @@
+"""
+Fully convolutional networks for urban scene segmentation.
+    fcn.models      backbone and fc6/fc7 head registries and the skip/non-skip FCN decoder
+    fcn.data        Cityscapes file lists and tf.data input pipeline
+    fcn.pairing     image/label pairing by frame id
+    fcn.labelstore  compact uint8 label store
+    fcn.scan        parallel dataset integrity scanner and manifest
+    fcn.stats       class frequency statistics, loss weights and repeat factor sampling
+    fcn.precision   float16/bfloat16 compute, loss scaling and reduced precision export
+    fcn.checkpoint  asynchronous rotating checkpoint writer and restore
+    fcn.warmstart   partial restore by name and shape, ImageNet weights
+    fcn.train       training loop
+    fcn.profiler    traced steps, Chrome timelines and per-layer timing summary
+    fcn.visualize   segmentation overlays for single images and folders
+    fcn.tiling      overlapping tile inference at the native resolution
+    fcn.stream      video and frame sequence segmentation with bounded queues
+    fcn.serve       HTTP inference server with dynamic request batching
+    fcn.export      reduced precision, frozen and inference graph exports
+    fcn.quantize    int8 post-training quantization and the TFLite runtime
+    fcn.cli         command line entry point used by sceneSeg.py
+"""
@@ -0,0 +1,195 @@
+from __future__ import print_function
+from concurrent.futures import ThreadPoolExecutor
+import tensorflow as tf
+import numpy as np
+import glob
+import json
+import time
+import os
+
+"""
+Checkpoints of the training loop. CheckpointManager copies the variables into host memory
+(a fast in-graph copy) and writes them on a background thread while training continues, saves
+on a step and/or time policy and keeps the most recent and the best (validation mIoU) ones.
+Checkpoints are TensorFlow checkpoints (checkpoint_format 'tf') or numpy archives
+(checkpoint_format 'npz', optionally compressed and split over checkpoint_shards files);
+both are listed in the usual LOG_DIR/checkpoint state file and restored by restore_latest.
+"""
+INDEX_NAME = 'checkpoints.json'
+FORMATS = ['tf', 'npz']
+
+
+def _npz_files(path):
+    return sorted(glob.glob(path + '.npz') + glob.glob(path + '-*-of-*.npz'))
+
+
+def latest_checkpoint(log_dir):
+    """ Path of the latest checkpoint in log_dir, None when there is none """
+    ckpt = tf.train.get_checkpoint_state(log_dir)
+    return ckpt.model_checkpoint_path if ckpt and ckpt.model_checkpoint_path else None
+
+
+def restore_checkpoint(sess, saver, path):
+    """ Restore a TensorFlow or npz checkpoint, npz values are loaded into the global variables of the same name """
+    files = _npz_files(path)
+    if not files:
+        saver.restore(sess, path)
+        return
+    variables = dict((v.op.name, v) for v in tf.global_variables())
+    for fname in files:
+        with np.load(fname) as archive:
+            for name in archive.files:
+                if name in variables:
+                    variables[name].load(archive[name], sess)
+
+
+def restore_latest(sess, saver, log_dir):
+    """ Restore the latest checkpoint in log_dir, returns False when there is none """
+    path = latest_checkpoint(log_dir)
+    if path:
+        restore_checkpoint(sess, saver, path)
+        print("Model restored...")
+        return True
+    return False
+
+
+class CheckpointManager(object):
+    """
+    Asynchronous, rotating checkpoint writer. Build it before the variables are initialized,
+    its snapshot buffers are local variables. They double the host memory of the variables
+    (optimizer slots included, about 1.7 GB for VGG): with async_write=False there is no copy
+    and save writes from the variables themselves before returning.
+    :param every_steps: save when step is a multiple of every_steps (None: no step policy)
+    :param every_secs: save when every_secs seconds passed since the last save (None: no time policy)
+    :param keep_last: number of most recent checkpoints kept
+    :param keep_best: number of checkpoints with the highest metric kept on top of them
+    :param fmt: 'tf' or 'npz'
+    :param shards: npz files per checkpoint, written in parallel
+    :param compress: zip-deflate the npz files
+    :param summary_writer: FileWriter receiving the snapshot and write latencies
+    :param async_write: snapshot the variables and write on a background thread
+    """
+
+    def __init__(self, log_dir, every_steps=100, every_secs=None, keep_last=5, keep_best=0, fmt='tf', shards=1,
+                 compress=False, summary_writer=None, var_list=None, async_write=True):
+        if fmt not in FORMATS:
+            raise ValueError("Unknown checkpoint format '%s', expected %s" % (fmt, ' or '.join(FORMATS)))
+        self.log_dir = log_dir
+        self.every_steps, self.every_secs = every_steps, every_secs
+        self.keep_last, self.keep_best = keep_last, keep_best
+        self.fmt, self.shards, self.compress = fmt, max(1, shards), compress
+        self.summary_writer = summary_writer
+        self.variables = var_list if var_list is not None else tf.global_variables()
+        self.async_write = async_write
+        if async_write:
+            # Host copies of the variables, written while the next steps update the originals
+            with tf.device('/cpu:0'), tf.name_scope('checkpoint_snapshot'):
+                self.snapshots = [tf.Variable(tf.zeros(v.shape, v.dtype.base_dtype), trainable=False, name=v.op.name.replace('/', '_'),
+                                              collections=[tf.GraphKeys.LOCAL_VARIABLES]) for v in self.variables]
+                self.snapshot_op = tf.group(*[tf.assign(s, v) for s, v in zip(self.snapshots, self.variables)])
+        else:
+            self.snapshots, self.snapshot_op = list(self.variables), tf.no_op()
+        self.saver = tf.train.Saver(var_list=dict((v.op.name, s) for v, s in zip(self.variables, self.snapshots)),
+                                    max_to_keep=None)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending = None
+        self.last_time = time.time()
+        self.index = self._load_index()
+
+    def _load_index(self):
+        path = os.path.join(self.log_dir, INDEX_NAME)
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return [entry for entry in json.load(f) if self._files(entry['path'])]
+
+    def _files(self, path):
+        return _npz_files(path) + glob.glob(path + '.index') + glob.glob(path + '.data-*') + glob.glob(path + '.meta')
+
+    def due(self, step):
+        """ Whether the step or time policy asks for a checkpoint at step """
+        if self.every_steps and step % self.every_steps == 0:
+            return True
+        return bool(self.every_secs) and time.time() - self.last_time >= self.every_secs
+
+    def save(self, sess, step, metric=None):
+        """
+        Snapshot the variables and queue the write of LOG_DIR/model.ckpt-<step>, blocks only while
+        the previous checkpoint is still being written (or until this one is, without async_write)
+        :param metric: validation mIoU of the checkpoint, ranks it for keep_best
+        """
+        self.wait()
+        start = time.time()
+        sess.run(self.snapshot_op)
+        snapshot_secs = time.time() - start
+        self.last_time = time.time()
+        if self.async_write:
+            self.pending = self.executor.submit(self._write, sess, int(step), metric, snapshot_secs)
+        else:
+            self._write(sess, int(step), metric, snapshot_secs)
+
+    def wait(self):
+        """ Block until the queued checkpoint is written, errors of the write are raised here """
+        if self.pending is not None:
+            pending, self.pending = self.pending, None
+            pending.result()
+
+    def close(self):
+        self.wait()
+        self.executor.shutdown()
+
+    def _write(self, sess, step, metric, snapshot_secs):
+        start = time.time()
+        path = os.path.join(self.log_dir, 'model.ckpt-%d' % step)
+        if self.fmt == 'tf':
+            self.saver.save(sess, path, write_meta_graph=False, write_state=False)
+        else:
+            self._write_npz(sess, path)
+        write_secs = time.time() - start
+        self.index = [entry for entry in self.index if entry['path'] != path]
+        self.index.append({'path': path, 'step': step, 'metric': metric, 'write_ms': 1000 * write_secs})
+        self._rotate()
+        print("Checkpoint %d: snapshot %.0f ms, written %sin %.0f ms" % (step, 1000 * snapshot_secs, 'in background ' if self.async_write else '',
+                                                                     1000 * write_secs))
+        if self.summary_writer is not None:
+            self.summary_writer.add_summary(tf.Summary(value=[
+                tf.Summary.Value(tag='checkpoint/snapshot_ms', simple_value=1000 * snapshot_secs),
+                tf.Summary.Value(tag='checkpoint/write_ms', simple_value=1000 * write_secs)]), step)
+
+    def _write_npz(self, sess, path):
+        values = sess.run(dict((v.op.name, s) for v, s in zip(self.variables, self.snapshots)))
+        # Balance the shards by size, largest variables first
+        shards = [{} for _ in range(self.shards)]
+        sizes = [0] * self.shards
+        for name in sorted(values, key=lambda n: -values[n].nbytes):
+            i = sizes.index(min(sizes))
+            shards[i][name] = values[name]
+            sizes[i] += values[name].nbytes
+        save = np.savez_compressed if self.compress else np.savez
+        names = [path + '.npz'] if self.shards == 1 else [path + '-%05d-of-%05d.npz' % (i, self.shards) for i in range(self.shards)]
+        with ThreadPoolExecutor(max_workers=self.shards) as pool:
+            for result in [pool.submit(save, name, **shard) for name, shard in zip(names, shards)]:
+                result.result()
+
+    def _rotate(self):
+        """ Delete the checkpoints that are neither among the keep_last latest nor the keep_best best """
+        by_step = sorted(self.index, key=lambda entry: entry['step'])
+        keep = set(entry['path'] for entry in by_step[-self.keep_last:]) if self.keep_last else set()
+        if self.keep_best:
+            ranked = sorted([entry for entry in self.index if entry['metric'] is not None], key=lambda entry: -entry['metric'])
+            keep.update(entry['path'] for entry in ranked[:self.keep_best])
+        keep.add(by_step[-1]['path'])
+        for entry in by_step:
+            if entry['path'] not in keep:
+                for fname in self._files(entry['path']):
+                    os.remove(fname)
+        self.index = [entry for entry in by_step if entry['path'] in keep]
+        tf.train.update_checkpoint_state(self.log_dir, by_step[-1]['path'], [entry['path'] for entry in self.index])
+        with open(os.path.join(self.log_dir, INDEX_NAME + '.tmp'), 'w') as f:
+            json.dump(self.index, f, indent=2)
+        os.rename(os.path.join(self.log_dir, INDEX_NAME + '.tmp'), os.path.join(self.log_dir, INDEX_NAME))
+
+    def best(self):
+        """ Index entry of the checkpoint with the highest metric, None when no metric was given """
+        ranked = [entry for entry in self.index if entry['metric'] is not None]
+        return max(ranked, key=lambda entry: entry['metric']) if ranked else None
@@ -0,0 +1,118 @@
+from __future__ import print_function
+import argparse
+from fcn.config import PIPELINE_CONFIGS, load_config, parse_value
+from fcn.models import BACKBONES, HEADS
+from fcn import train, visualize, evaluate, export, quantize, stream, serve
+from fcn.colorize import make_palette
+from fcn.profiler import PROFILE_STEPS
+from fcn.writers import OverlayWriter
+
+"""
+Reference: https://github.com/shekkizh/FCN.tensorflow
+Training:
+    python sceneSeg.py --mode train --dataset DATASET_DIR [--model vgg|alexnet] [--noskip]
+Evaluation on the whole val split (--watch keeps evaluating new checkpoints while training runs):
+    python sceneSeg.py --mode evaluate --dataset DATASET_DIR [--watch]
+Visualization:
+    python sceneSeg.py --mode visualize --image IMAGE_PATH
+    python sceneSeg.py --mode visualize --imagedir IMAGE_FOLDER_DIR
+Reduced precision weights for inference (see fcn/precision.py):
+    python sceneSeg.py --mode export --set precision=float16
+int8 model for CPU inference, calibrated on val images (see fcn/quantize.py):
+    python sceneSeg.py --mode quantize --dataset DATASET_DIR
+Data-parallel training on 4 shards of the training set, gradients averaged every step:
+    python sceneSeg.py --mode train --dataset DATASET_DIR --workers 4
+Start a new run from the matching weights of another run or of ImageNet (see fcn/warmstart.py):
+    python sceneSeg.py --mode train --dataset DATASET_DIR --warmstart vgg19.npy
+Video or frame sequence segmentation (see fcn/stream.py):
+    python sceneSeg.py --mode stream --video VIDEO_PATH [--output OUT.mp4]
+Chrome traces and a per-layer timing summary of training steps 10-12 in LOG_DIR/profile/ (see fcn/profiler.py):
+    python sceneSeg.py --mode train --dataset DATASET_DIR --profile [10 11 12]
+HTTP inference server batching concurrent requests (see fcn/serve.py):
+    python sceneSeg.py --mode serve [--port 8000 | --socket PATH]
+Settings (see fcn/config.py DEFAULTS) come from the defaults, then --config FILE (.yaml/.json), then the flags and --set:
+    python sceneSeg.py --mode train --dataset DATASET_DIR --config run.yaml --set batch_size=4 --set image_size=[512,1024]
+"""
+MODES = ['train', 'evaluate', 'visualize', 'export', 'quantize', 'stream', 'serve']
+# command line flag -> config key
+FLAG_SETTINGS = [('model', 'model'), ('skip', 'skip'), ('head', 'head'), ('pipeline', 'pipeline'), ('cache', 'cache'), ('labels', 'labels'),
+                 ('warmstart', 'warm_start'), ('workers', 'workers'), ('batch', 'inference_batch_size'), ('writers', 'writer_threads'), ('compression', 'png_compress_level')]
+
+
+def _setting(text):
+    if '=' not in text:
+        raise argparse.ArgumentTypeError("expected KEY=VALUE, got '%s'" % text)
+    key, value = text.split('=', 1)
+    return key.strip(), parse_value(value)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Scene Segmentation')
+    parser.add_argument('--mode',type=str,required=True,choices=MODES,help='Specify the mode (%s)' % ', '.join(MODES))
+    parser.add_argument('--dataset',type=str,help='Specify the directory of dataset')
+    parser.add_argument('--image',type=str,help='Path to the image file')
+    parser.add_argument('--imagedir',type=str,help='Directory to the image folder')
+    parser.add_argument('--video',type=str,help='Video file to segment in the stream mode')
+    parser.add_argument('--output',type=str,help='Annotated video file or result folder of the stream mode')
+    parser.add_argument('--host',type=str,default='127.0.0.1',help='Address the serve mode listens on')
+    parser.add_argument('--port',type=int,default=8000,help='Port the serve mode listens on')
+    parser.add_argument('--socket',type=str,help='Unix socket the serve mode listens on instead of host:port')
+    parser.add_argument('--config',type=str,help='YAML or JSON file of settings')
+    parser.add_argument('--set',dest='settings',type=_setting,action='append',default=[],metavar='KEY=VALUE',help='Override one setting, can be repeated')
+    parser.add_argument('--model',type=str,choices=sorted(BACKBONES),help='Backbone network')
+    parser.add_argument('--skip',dest='skip',action='store_true',default=None,help='Decoder with skip connections')
+    parser.add_argument('--noskip',dest='skip',action='store_false',help='Decoder without skip connections')
+    parser.add_argument('--head',type=str,choices=sorted(HEADS),help='fc6/fc7 layers: the original fc convolutions or a lighter variant')
+    parser.add_argument('--workers',type=int,help='Data-parallel training workers, each on its shard of the training set')
+    parser.add_argument('--warmstart',type=str,help='Start a new training run from the matching weights of a LOG_DIR, checkpoint or ImageNet .npy file')
+    parser.add_argument('--pipeline',type=str,choices=sorted(PIPELINE_CONFIGS),help='Input pipeline configuration')
+    parser.add_argument('--cache',type=str,help='Cache decoded samples in "memory" or in the given directory')
+    parser.add_argument('--labels',type=str,choices=['dense','sparse'],help='Dense one-hot labels with sigmoid loss or sparse class indices with softmax loss')
+    parser.add_argument('--batch',type=int,help='Images per batch in the evaluate, visualize, stream and serve modes')
+    parser.add_argument('--watch',action='store_true',help='Evaluate every new checkpoint until interrupted')
+    parser.add_argument('--interval',type=int,default=60,help='Seconds between checkpoint polls with --watch')
+    parser.add_argument('--writers',type=int,help='Threads saving results in the visualize mode')
+    parser.add_argument('--compression',type=int,help='PNG compression level of the results (0-9)')
+    parser.add_argument('--profile',type=int,nargs='*',metavar='STEP',help='Trace these training steps or visualize batches (default %s)' % ' '.join(map(str, PROFILE_STEPS)))
+    parser.add_argument('--colormask',action='store_true',help='Also save the color mask of each result')
+    parser.add_argument('--pretty',action='store_true',help='Render the overlays with matplotlib (slow)')
+    args = parser.parse_args(argv)
+    if (args.mode in ['train', 'evaluate', 'quantize']) and (args.dataset is None):
+        parser.error('--%s requires --dataset' % args.mode)
+    if (args.mode == 'visualize') and ((args.image is None) and (args.imagedir is None)):
+        parser.error('--visualize requires --image/--imagedir')
+    if (args.mode == 'stream') and ((args.video is None) == (args.imagedir is None)):
+        parser.error('--stream requires either --video or --imagedir')
+    return args
+
+
+def run(argv=None, backbone='vgg', skip=True):
+    """ Command line entry point, backbone and skip are the defaults of --model and --skip/--noskip """
+    args = parse_args(argv)
+    overrides = dict(args.settings)
+    for flag, key in FLAG_SETTINGS:
+        if getattr(args, flag) is not None:
+            overrides[key] = getattr(args, flag)
+    if args.profile is not None:
+        overrides['profile_steps'] = args.profile or list(PROFILE_STEPS)
+    try:
+        config = load_config(args.config, overrides, defaults={'model': backbone, 'skip': skip})
+    except ValueError as e:
+        raise SystemExit(str(e))
+    if args.mode == 'train':
+        train.main(args.dataset, config)
+    elif args.mode == 'evaluate':
+        evaluate.main(args.dataset, config, watch=args.watch, interval=args.interval)
+    elif args.mode in ['visualize', 'stream']:
+        writer = OverlayWriter(compress_level=config.png_compress_level, color_mask=args.colormask, pretty=args.pretty,
+                               palette=make_palette(config.train_classes))
+        if args.mode == 'visualize':
+            visualize.main(args.image, args.imagedir, config, writer=writer)
+        else:
+            stream.main(args.video, args.imagedir, args.output, config, writer=writer)
+    elif args.mode == 'export':
+        export.main(config)
+    elif args.mode == 'quantize':
+        quantize.main(args.dataset, config)
+    elif args.mode == 'serve':
+        serve.main(config, args.host, args.port, args.socket, palette=make_palette(config.train_classes))
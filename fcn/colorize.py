@@ -0,0 +1,23 @@
+import numpy as np
+from fcn.config import TRAIN_CLASSES, RGB_OF_CLASSES
+
+
+def make_palette(train_classes=TRAIN_CLASSES, rgb_of_classes=RGB_OF_CLASSES):
+    """ uint8 [256,3] lookup table from a predicted index to the color of TRAIN_CLASSES[index], "other" stays black """
+    palette = np.zeros((256, 3), dtype=np.uint8)
+    for i, c in enumerate(train_classes):
+        palette[i] = rgb_of_classes[c]
+    return palette
+
+PALETTE = make_palette()
+
+
+def colorize(pred, palette=PALETTE):
+    """ Color mask [...,3] (uint8) of a prediction or a batch of predictions [...] with one gather """
+    return palette[pred]
+
+
+def blend(image, mask, alpha=0.5):
+    """ uint8 alpha blending of a color mask over an image of the same shape """
+    a = np.uint16(round(alpha * 256))
+    return ((image.astype(np.uint16) * (256 - a) + mask.astype(np.uint16) * a) >> 8).astype(np.uint8)
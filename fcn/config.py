@@ -0,0 +1,175 @@
+from os.path import dirname, abspath
+import collections
+import json
+from fcn.pairing import ANNOTATIONS
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+# ==========================================================================================
+LEARNING_RATE = 0.0001
+REGULARIZATION_SCALE = 0.00001
+BATCH_SIZE = 2
+TRAIN_CLASSES = range(19) # max: range(19)
+NUM_OF_CLASSES = len(TRAIN_CLASSES)
+# ..........................................................................................
+ROOT_DIR = dirname(dirname(abspath(__file__)))
+# ==========================================================================================
+NUM_OF_EPOCH = 30
+KEEP_PROB = 0.85
+IMSIZE_X = 256
+IMSIZE_Y = 512
+# Input pipeline settings selected with --pipeline ("serial" is the original sequential reader)
+PIPELINE_CONFIGS = {'serial':   {'num_parallel_calls': None, 'shuffle_buffer': 0,   'prefetch_buffer': 0},
+                    'parallel': {'num_parallel_calls': 4,    'shuffle_buffer': 256, 'prefetch_buffer': 2}}
+# Visualize mode: images per sess.run and threads saving the results
+INFERENCE_BATCH_SIZE = 8
+WRITER_THREADS = 4
+PNG_COMPRESS_LEVEL = 1
+RGB_OF_CLASSES = {0:(128,54,128),1:(244,35,232),2:(70,70,70),3:(102,102,156),4:(190,153,153),
+                5:(153,153,153),6:(250,170,30),7:(220,220,0),8:(107,142,35),9:(152,251,152),
+                10:(70,130,180),11:(220,20,60),12:(255,0,0),13:(0,0,142),14:(0,0,70),
+                15:(0,60,100),16:(0,80,100),17:(0,0,230),18:(119,11,32),19:(0,0,0)}
+
+CLASS_NAMES = ['road', 'sidewalk', 'building', 'wall', 'fence', 'pole', 'traffic light', 'traffic sign', 'vegetation', 'terrain',
+               'sky', 'person', 'rider', 'car', 'truck', 'bus', 'train', 'motorcycle', 'bicycle']
+
+""" Cityscapes Dataset : https://www.cityscapes-dataset.com/
+    0: road   1: sidewalk        2: building       3: wall         4: fence
+    5: pole   6: traffic light   7: traffic sign   8: vegetation   9: terrain
+    10: sky   11: person         12: rider         13: car         14: trunck
+    15: bus   16: train          17: motorcycle    18: bicycle                  """
+
+
+# Run settings: the constants above are the defaults, a YAML/JSON file (--config) and
+# command line options override them
+DEFAULTS = collections.OrderedDict([
+    ('model', 'vgg'),                   # backbone, see fcn/models.py
+    ('skip', True),                     # decoder with skip connections
+    ('head', 'fc'),                     # fc6/fc7 layers, see fcn/models.py
+    ('labels', 'dense'),                # one-hot labels with sigmoid loss or sparse class indices with softmax loss
+    ('pipeline', 'parallel'),           # key of PIPELINE_CONFIGS
+    ('cache', None),                    # cache decoded samples in "memory" or in this directory
+    ('annotation', 'gtCoarse'),         # label folder, see fcn/pairing.py
+    ('learning_rate', LEARNING_RATE),
+    ('regularization_scale', REGULARIZATION_SCALE),
+    ('batch_size', BATCH_SIZE),
+    ('keep_prob', KEEP_PROB),
+    ('train_classes', list(TRAIN_CLASSES)),
+    ('image_size', [IMSIZE_X, IMSIZE_Y]),
+    ('num_of_epoch', NUM_OF_EPOCH),
+    ('max_iteration', None),            # None: num_of_epoch passes over the training set found on disk
+    ('log_every', 10),
+    ('validate_every', 100),
+    ('precision', 'float32'),           # compute dtype, see fcn/precision.py
+    ('loss_scale', 'dynamic'),          # 'dynamic' or a fixed loss scale of reduced precision training
+    ('weights_dtype', 'float32'),       # dtype of the stored weights, see fcn/precision.py
+    ('export_format', 'checkpoint'),    # output of the export mode, see fcn/export.py
+    ('tile_size', None),                # [h,w]: visualize at native resolution in overlapping tiles, see fcn/tiling.py
+    ('tile_overlap', 128),              # pixels shared by neighbouring tiles
+    ('stream_queue', 16),               # frames buffered by each stage of the stream mode, see fcn/stream.py
+    ('batch_window_ms', 10),            # serve mode wait for requests to batch with the first one, see fcn/serve.py
+    ('serve_random_weights', False),    # let the serve mode start without a checkpoint, /health then reports random_weights
+    ('runtime', 'tf'),                  # model run by the visualize and serve modes: checkpoint or exported graph, int8 tflite (visualize only)
+    ('calibration_images', 100),        # val images calibrating the int8 model, see fcn/quantize.py
+    ('quantize_eval_images', None),     # val images comparing the int8 and float32 models, None: all
+    ('warm_start', None),               # run or ImageNet weights initializing a new run, see fcn/warmstart.py
+    ('checkpoint_steps', 100),          # checkpoint every checkpoint_steps steps and/or checkpoint_secs seconds
+    ('checkpoint_secs', None),
+    ('keep_checkpoints', 5),            # latest checkpoints kept
+    ('keep_best_checkpoints', 0),       # best checkpoints by validation mIoU kept
+    ('checkpoint_eval_batches', 10),    # validation batches ranking a checkpoint
+    ('checkpoint_format', 'tf'),        # TensorFlow checkpoint or numpy archive, see fcn/checkpoint.py
+    ('checkpoint_shards', 1),           # files of an npz checkpoint
+    ('checkpoint_compress', False),     # compressed npz checkpoints
+    ('checkpoint_async', True),         # write checkpoints on a background thread from a host copy of the variables
+    ('profile_steps', None),            # steps (visualize batches) traced by fcn/profiler.py, None: no profiling
+    ('workers', 1),                     # data-parallel workers, each on its shard of the training set
+    ('class_weighting', None),          # None, 'inverse' or 'median' class weights of the loss, see fcn/stats.py
+    ('sampler', None),                  # None or 'repeat': class-aware repeat factor sampling, see fcn/stats.py
+    ('sampler_threshold', 0.1),
+    ('inference_batch_size', INFERENCE_BATCH_SIZE),
+    ('writer_threads', WRITER_THREADS),
+    ('png_compress_level', PNG_COMPRESS_LEVEL)])
+# Allowed values of the enumerated settings
+SETTING_CHOICES = {
+    'model': ['alexnet', 'vgg'],
+    'head': ['fc', 'atrous', 'lowrank', 'separable'],
+    'labels': ['dense', 'sparse'],
+    'pipeline': sorted(PIPELINE_CONFIGS),
+    'annotation': sorted(ANNOTATIONS),
+    'precision': ['float32', 'float16', 'bfloat16'],
+    'weights_dtype': ['float32', 'float16', 'bfloat16'],
+    'export_format': ['checkpoint', 'frozen', 'inference'],
+    'runtime': ['tf', 'tflite', 'frozen', 'inference'],
+    'checkpoint_format': ['tf', 'npz'],
+    'class_weighting': [None, 'inverse', 'median'],
+    'sampler': [None, 'repeat'],
+}
+
+
+class Config(object):
+    """ Resolved run settings, one attribute per key of DEFAULTS """
+
+    def __init__(self, **values):
+        self.__dict__.update(values)
+
+    @property
+    def num_classes(self):
+        return len(self.train_classes)
+
+    def as_dict(self):
+        return collections.OrderedDict((key, getattr(self, key)) for key in DEFAULTS)
+
+
+def _read_config_file(path):
+    with open(path) as f:
+        if path.endswith('.json'):
+            return json.load(f)
+        if yaml is None:
+            raise ImportError("PyYAML is required to read " + path + ", use a .json file instead")
+        return yaml.safe_load(f) or {}
+
+
+def parse_value(text):
+    """ Value of a --set KEY=VALUE option, e.g. 4 -> int, [256,512] -> list, sparse -> str """
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def load_config(path=None, overrides=None, defaults=None):
+    """
+    Resolve the run settings
+    :param path: YAML (.yaml/.yml) or JSON (.json) file
+    :param overrides: dict applied after the file, e.g. from the command line
+    :param defaults: dict applied before the file, e.g. the model of a sceneSeg_*.py shortcut
+    :return: Config
+    """
+    values = collections.OrderedDict(DEFAULTS)
+    for source in [defaults, _read_config_file(path) if path else None, overrides]:
+        for key, value in (source or {}).items():
+            if key not in DEFAULTS:
+                raise ValueError("Unknown setting '%s', expected one of: %s" % (key, ', '.join(DEFAULTS)))
+            values[key] = value
+    for key, choices in SETTING_CHOICES.items():
+        if values[key] not in choices:
+            raise ValueError("Invalid %s '%s', expected one of: %s" % (key, values[key], ', '.join('null' if c is None else c for c in choices)))
+    return Config(**values)
+
+
+def save_config(config, path):
+    with open(path, 'w') as f:
+        json.dump(config.as_dict(), f, indent=2)
+
+
+def log_dir(variant, num_classes=NUM_OF_CLASSES):
+    """ Checkpoint and summary directory of a model variant, e.g. logs/VGG_skip_c19/ """
+    return ROOT_DIR+'/logs/'+variant+'_c'+str(num_classes)+'/'
+
+
+def result_dir(variant, num_classes=NUM_OF_CLASSES):
+    """ Output folder of the visualize mode, relative to the repository or the image folder """
+    return '/Results/'+variant+'_c'+str(num_classes)+'/'
@@ -0,0 +1,114 @@
+import scipy.io as spio
+import tensorflow as tf
+import numpy as np
+import os
+from fcn.pairing import pair_files
+from fcn.scan import load_manifest
+from fcn.config import TRAIN_CLASSES, NUM_OF_CLASSES, BATCH_SIZE, IMSIZE_X, IMSIZE_Y
+
+
+def _read_py_function(im, lb_fpath, train_classes=TRAIN_CLASSES):
+    lab = np.array(spio.loadmat(lb_fpath)['label']).astype(np.float32)
+    lab_other = (np.sum(lab[:,:,np.array(train_classes)], axis=2)==0).astype(np.float32)
+    label = np.concatenate((lab[:,:,np.array(train_classes)],np.expand_dims(lab_other, axis=2)),axis=2)
+    return im, label
+
+def _read_sparse_py_function(im, lb_fpath, train_classes=TRAIN_CLASSES):
+    lab = np.array(spio.loadmat(lb_fpath)['label'])[:,:,np.array(train_classes)]
+    label = np.argmax(lab, axis=2).astype(np.uint8)
+    label[np.sum(lab, axis=2)==0] = len(train_classes)
+    return im, label
+
+def _parse_function(im_fpath, lab_fpath, image_size=(IMSIZE_X, IMSIZE_Y)):
+    image_string = tf.read_file(im_fpath)
+    image_decoded = tf.cast(tf.image.decode_image(image_string, channels=3), tf.float32)
+    image_decoded.set_shape([None, None, None])
+    image = tf.image.resize_images(image_decoded, list(image_size))
+    return image, lab_fpath
+
+def _read_store_function(label_store, im, lb_fpath, sparse, num_classes=NUM_OF_CLASSES):
+    label = tf.py_func(label_store.read, [lb_fpath], tf.uint8)
+    label.set_shape([None, None])
+    if sparse:
+        return im, label
+    return im, tf.one_hot(label, num_classes+1, dtype=tf.float32)
+
+def _resize_label(im, label, image_size, sparse):
+    # Nearest neighbour keeps class indices and one-hot vectors valid
+    label = tf.expand_dims(tf.expand_dims(label, 2) if sparse else label, 0)
+    label = tf.image.resize_nearest_neighbor(label, list(image_size))[0]
+    return im, label[:,:,0] if sparse else label
+
+def setup_dataset(im_fpath, lab_fpath, label_store=None, num_parallel_calls=None, shuffle_buffer=0, prefetch_buffer=0, cache=None, sparse=False,
+                  batch_size=BATCH_SIZE, repeat=True, train_classes=TRAIN_CLASSES, image_size=(IMSIZE_X, IMSIZE_Y), repeat_factors=None,
+                  shard=None):
+    """
+    Input pipeline of (image, label) batches
+    :param sparse: yield [B,H,W] uint8 class-index labels instead of [B,H,W,NUM_OF_CLASSES+1] one-hot labels
+    :param num_parallel_calls: number of samples decoded in parallel, None decodes sequentially
+    :param shuffle_buffer: shuffle buffer size, 0 keeps the file order
+    :param prefetch_buffer: number of batches prepared ahead of the training step, 0 disables prefetching
+    :param cache: None, '' to cache decoded samples in memory or a file prefix to cache them on disk
+    :param repeat: repeat forever, otherwise stop after one pass
+    :param train_classes: label channels kept as classes, the others become "other"
+    :param image_size: (height, width) the images are resized to, labels (stored at IMSIZE_X x IMSIZE_Y) follow
+    :param repeat_factors: class-aware sampling, sample i appears floor(r_i) or floor(r_i)+1 times per epoch
+                           with mean r_i (see fcn.stats.repeat_factors). With cache the first epoch's draw is replayed
+    :param shard: (number of shards, index), keep samples index, index+number, ... of the data-parallel worker index,
+                  taken before the repeat factors so the workers' shards stay disjoint
+    :return: dataset of batches
+    """
+    dataset = tf.data.Dataset.from_tensor_slices((im_fpath, lab_fpath))
+    if repeat_factors is not None:
+        dataset = tf.data.Dataset.zip((dataset, tf.data.Dataset.from_tensor_slices(repeat_factors)))
+    if shard is not None:
+        dataset = dataset.shard(*shard)
+    if repeat_factors is not None:
+        # Drawn again on every pass, only the file names are repeated so this costs no decoding
+        dataset = dataset.flat_map(lambda files, r: tf.data.Dataset.from_tensors(files).repeat(
+            tf.cast(tf.floor(r + tf.random_uniform([])), tf.int64)))
+    if shuffle_buffer and cache is None:
+        dataset = dataset.shuffle(shuffle_buffer)
+    dataset = dataset.map(lambda im_fpath, lb_fpath: _parse_function(im_fpath, lb_fpath, image_size), num_parallel_calls=num_parallel_calls)
+    if label_store is not None:
+        dataset = dataset.map(lambda im, lb_fpath: _read_store_function(label_store, im, lb_fpath, sparse, len(train_classes)), num_parallel_calls=num_parallel_calls)
+    elif sparse:
+        read_function = lambda im, lb_fpath: _read_sparse_py_function(im, lb_fpath, train_classes)
+        dataset = dataset.map(lambda im, lb_fpath: tuple(tf.py_func(read_function, [im, lb_fpath], [tf.float32, tf.uint8])), num_parallel_calls=num_parallel_calls)
+    else:
+        read_function = lambda im, lb_fpath: _read_py_function(im, lb_fpath, train_classes)
+        dataset = dataset.map(lambda im, lb_fpath: tuple(tf.py_func(read_function, [im, lb_fpath], [tf.float32, tf.float32])), num_parallel_calls=num_parallel_calls)
+    if tuple(image_size) != (IMSIZE_X, IMSIZE_Y):
+        dataset = dataset.map(lambda im, label: _resize_label(im, label, image_size, sparse), num_parallel_calls=num_parallel_calls)
+    if cache is not None:
+        # Shuffle after the cache, otherwise every epoch replays the first epoch's order
+        dataset = dataset.cache(cache)
+        if shuffle_buffer:
+            dataset = dataset.shuffle(shuffle_buffer)
+    dataset = dataset.batch(batch_size)
+    if repeat:
+        dataset = dataset.repeat()
+    if prefetch_buffer:
+        dataset = dataset.prefetch(prefetch_buffer)
+    return dataset
+
+def dataset_cache(cache, dataset_mode):
+    """ Translate --cache (None, "memory" or a directory) into the cache argument of setup_dataset """
+    if cache is None:
+        return None
+    if cache == "memory":
+        return ""
+    if not os.path.exists(cache):
+        os.makedirs(cache)
+    return os.path.join(cache, dataset_mode)
+
+def setup_dataset_dir(data_dir, dataset_mode, annotation='gtCoarse'):
+    """ (image paths, label paths) of a split, from its manifest when up to date, otherwise paired by frame id """
+    data_mode_dir = data_dir+"/"+dataset_mode
+    manifest = load_manifest(data_mode_dir, annotation)
+    if manifest is not None:
+        return manifest
+    im_fpath, lab_fpath, unmatched = pair_files(data_mode_dir, annotation)
+    if unmatched:
+        print("%s: %d unmatched files skipped, e.g. %s (run checkDataset.py for the full list)" % (data_mode_dir, len(unmatched), unmatched[0]))
+    return im_fpath, lab_fpath
@@ -0,0 +1,86 @@
+from __future__ import print_function
+import tensorflow as tf
+import numpy as np
+import json
+import time
+import os
+from fcn.config import TRAIN_CLASSES, CLASS_NAMES, NUM_OF_CLASSES
+from fcn.data import setup_dataset, setup_dataset_dir
+from fcn.labelstore import open_label_store
+from fcn.checkpoint import latest_checkpoint, restore_checkpoint
+from fcn.metrics import ConfusionMatrix, confusion_matrix_op
+from fcn.models import inference, model_log_dir
+from fcn.precision import checkpoint_dir
+
+
+def evaluate(sess, val_itr, confusion, num_classes=NUM_OF_CLASSES):
+    """ One pass over the validation iterator, returns the accumulated ConfusionMatrix """
+    sess.run(val_itr.initializer)
+    matrix = ConfusionMatrix(num_classes)
+    while True:
+        try:
+            matrix.add(sess.run(confusion))
+        except tf.errors.OutOfRangeError:
+            return matrix
+
+
+def report(matrix, step, train_classes=TRAIN_CLASSES):
+    """ Print the per-class IoU table, returns the metrics as a dict """
+    iou = matrix.iou()
+    print("\n==================== Evaluation at step %d ====================" % step)
+    for c, value in zip(train_classes, iou):
+        print("%-15s %8.4f" % (CLASS_NAMES[c], value))
+    metrics = {'step': step, 'mean_iou': matrix.mean_iou(), 'frequency_weighted_iou': matrix.frequency_weighted_iou(),
+               'pixel_accuracy': matrix.pixel_accuracy(), 'class_iou': dict((CLASS_NAMES[c], None if np.isnan(value) else value) for c, value in zip(train_classes, iou))}
+    print("mIoU: %g, fwIoU: %g, Pixel_acc: %g" % (metrics['mean_iou'], metrics['frequency_weighted_iou'], metrics['pixel_accuracy']))
+    return metrics
+
+
+def main(data_dir, config, watch=False, interval=60):
+    """
+    Evaluate the latest checkpoint on the whole val split
+    :param config: fcn.config.Config, the batch size is config.inference_batch_size
+    :param watch: keep polling LOG_DIR and evaluate every new checkpoint, e.g. next to a running training
+    :param interval: seconds between polls
+    """
+    LOG_DIR = checkpoint_dir(model_log_dir(config), config.weights_dtype)
+    EVAL_DIR = LOG_DIR + ('eval' if config.precision == 'float32' else 'eval_' + config.precision)
+    val_im_fn, val_lab_fn = setup_dataset_dir(data_dir, "val", config.annotation)
+    dataset = setup_dataset(val_im_fn, val_lab_fn, open_label_store(data_dir, "val", config.train_classes, config.annotation, val_lab_fn), num_parallel_calls=4,
+                            prefetch_buffer=2, sparse=True, batch_size=config.inference_batch_size, repeat=False,
+                            train_classes=config.train_classes, image_size=config.image_size)
+    val_itr = dataset.make_initializable_iterator()
+    img, ann = val_itr.get_next()
+    pred_label, logits, regularization_loss = inference(img, 1.0, config.model, config.skip, config.num_classes,
+                                                        config.precision, config.weights_dtype, config.head)
+    confusion = confusion_matrix_op(ann, tf.squeeze(pred_label, axis=3), config.num_classes)
+
+    saver = tf.train.Saver()
+    # Do not take the whole GPU when running next to the training process
+    session_config = tf.ConfigProto()
+    session_config.gpu_options.allow_growth = True
+    sess = tf.Session(config=session_config)
+    writer = tf.summary.FileWriter(EVAL_DIR)
+    if not os.path.exists(EVAL_DIR):
+        os.makedirs(EVAL_DIR)
+
+    last_path = None
+    while True:
+        path = latest_checkpoint(LOG_DIR)
+        if path and path != last_path:
+            last_path = path
+            restore_checkpoint(sess, saver, last_path)
+            step = int(last_path.rsplit('-', 1)[-1]) if '-' in os.path.basename(last_path) else 0
+            start = time.time()
+            metrics = report(evaluate(sess, val_itr, confusion, config.num_classes), step, config.train_classes)
+            print("Evaluated %d images in %.1f s" % (len(val_im_fn), time.time() - start))
+            writer.add_summary(tf.Summary(value=[tf.Summary.Value(tag='mean_iou', simple_value=metrics['mean_iou']),
+                                                 tf.Summary.Value(tag='frequency_weighted_iou', simple_value=metrics['frequency_weighted_iou'])]), step)
+            writer.flush()
+            with open(EVAL_DIR+'/metrics-%d.json' % step, 'w') as f:
+                json.dump(metrics, f, indent=2)
+        elif last_path is None and not watch:
+            print("No checkpoint found in " + LOG_DIR)
+        if not watch:
+            break
+        time.sleep(interval)
@@ -0,0 +1,151 @@
+from __future__ import print_function
+import tensorflow as tf
+import json
+import time
+import os
+from fcn.checkpoint import latest_checkpoint, restore_checkpoint
+from fcn.models import inference, model_log_dir, variant_name
+from fcn.precision import checkpoint_dir, export_checkpoint
+
+"""
+Inference exports of the latest checkpoint:
+    checkpoint  weights stored as float16/bfloat16 in LOG_DIR/<precision>/ (see fcn/precision.py)
+    frozen      LOG_DIR/frozen/model.pb, one self-contained GraphDef with the weights as constants
+    inference   LOG_DIR/inference/, the pruned graph (model.meta) next to the inference weights only
+                (optimizer slots dropped), restored straight into the variables
+Both graphs are built with a constant keep_prob, so without dropout, hold no training or summary
+op and run no initializer when loaded: input_image [None,H,W,3] float32 in, pred_label [None,H,W]
+uint8 and logits out. Large models (VGG) load faster from the inference export, protobuf
+constants being slow to parse and copy.
+    python sceneSeg.py --mode export --set export_format=inference
+    python sceneSeg.py --mode visualize --imagedir DIR --set runtime=inference
+"""
+FORMATS = ['checkpoint', 'frozen', 'inference']
+FROZEN_NAME = 'model.pb'
+META_NAME = 'model.meta'
+WEIGHTS_NAME = 'model'
+INPUT_NAME = 'input_image'
+OUTPUT_NAMES = ['pred_label', 'logits']
+
+
+def export_dir(config, export_format):
+    """ Folder of the frozen or inference export of the configured model and precision """
+    return model_log_dir(config) + export_format + ('/' if config.precision == 'float32' else '_%s/' % config.precision)
+
+
+def _inference_graph(config):
+    """ Inference graph with named input and outputs in the default graph """
+    image = tf.placeholder(tf.float32, shape=[None] + list(config.image_size) + [3], name=INPUT_NAME)
+    # keep_prob 1.0 as a Python number: the graph is built without dropout
+    pred_label, logits, regularization_loss = inference(image, 1.0, config.model, config.skip, config.num_classes,
+                                                        config.precision, config.weights_dtype, config.head)
+    tf.cast(tf.squeeze(pred_label, axis=3), tf.uint8, name=OUTPUT_NAMES[0])
+    tf.identity(logits, name=OUTPUT_NAMES[1])
+
+
+def _write_description(config, out_dir, checkpoint):
+    with open(out_dir + 'model.json', 'w') as f:
+        json.dump({'model': variant_name(config.model, config.skip, config.head), 'checkpoint': checkpoint,
+                   'image_size': list(config.image_size), 'num_classes': config.num_classes, 'precision': config.precision,
+                   'input': INPUT_NAME, 'outputs': OUTPUT_NAMES}, f, indent=2)
+
+
+def freeze(config, export_format='frozen'):
+    """ Write the frozen or inference export of the latest checkpoint, returns its folder or None when there is no checkpoint """
+    LOG_DIR = checkpoint_dir(model_log_dir(config), config.weights_dtype)
+    checkpoint = latest_checkpoint(LOG_DIR)
+    if checkpoint is None:
+        return None
+    out_dir = export_dir(config, export_format)
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+    with tf.Graph().as_default() as graph:
+        _inference_graph(config)
+        saver = tf.train.Saver()
+        with tf.Session() as sess:
+            # Every variable is restored, no initializer needed
+            restore_checkpoint(sess, saver, checkpoint)
+            if export_format == 'frozen':
+                graph_def = tf.graph_util.convert_variables_to_constants(sess, graph.as_graph_def(), OUTPUT_NAMES)
+            else:
+                saver.save(sess, out_dir + WEIGHTS_NAME, write_meta_graph=False, write_state=False)
+                graph_def = graph.as_graph_def()
+    if export_format == 'frozen':
+        # Only what the outputs depend on (the regularization loss goes), without Identity/CheckNumerics nodes
+        graph_def = tf.graph_util.remove_training_nodes(graph_def, protected_nodes=OUTPUT_NAMES + [INPUT_NAME])
+        graph_def = tf.graph_util.extract_sub_graph(graph_def, OUTPUT_NAMES)
+        with open(out_dir + FROZEN_NAME, 'wb') as f:
+            f.write(graph_def.SerializeToString())
+    else:
+        # Outputs and the restore ops: the initializers and the regularization loss go
+        restore_op = saver.as_saver_def().restore_op_name
+        graph_def = tf.graph_util.extract_sub_graph(graph_def, OUTPUT_NAMES + [restore_op, saver.as_saver_def().save_tensor_name.split(':')[0]])
+        tf.train.export_meta_graph(out_dir + META_NAME, graph_def=graph_def, saver_def=saver.as_saver_def(), collection_list=[],
+                                   clear_devices=True)
+    _write_description(config, out_dir, checkpoint)
+    return out_dir
+
+
+def frozen_session_config():
+    """
+    Session config for frozen graphs: they are pruned already, and Grappler's pass over a graph
+    holding every weight as a constant copies them and dominates the first run
+    """
+    session_config = tf.ConfigProto()
+    session_config.graph_options.rewrite_options.disable_meta_optimizer = True
+    return session_config
+
+
+def load_export(sess, out_dir, export_format, input_map=None):
+    """
+    Import a frozen or inference export into the default graph and restore its weights, sess should
+    use frozen_session_config() for a frozen graph
+    :param input_map: replaces the input_image placeholder, e.g. {'input_image': images of a tf.data pipeline}
+    :return: (input_image, pred_label, logits) tensors, input_image being the mapped tensor when given
+    """
+    mapping = dict((name + ':0', tensor) for name, tensor in (input_map or {}).items())
+    if export_format == 'frozen':
+        graph_def = tf.GraphDef()
+        with open(out_dir + FROZEN_NAME, 'rb') as f:
+            graph_def.ParseFromString(f.read())
+        tf.import_graph_def(graph_def, input_map=mapping, name=export_format)
+    else:
+        saver = tf.train.import_meta_graph(out_dir + META_NAME, input_map=mapping, import_scope=export_format, clear_devices=True)
+        saver.restore(sess, out_dir + WEIGHTS_NAME)
+    graph = tf.get_default_graph()
+    pred_label, logits = [graph.get_tensor_by_name('%s/%s:0' % (export_format, name)) for name in OUTPUT_NAMES]
+    image = (input_map or {}).get(INPUT_NAME)
+    if image is None:
+        image = graph.get_tensor_by_name('%s/%s:0' % (export_format, INPUT_NAME))
+    return image, pred_label, logits
+
+
+def main(config):
+    """
+    Export the latest checkpoint for inference, as config.export_format: 'checkpoint' with config.precision
+    weights to LOG_DIR/<precision>/, 'frozen' to LOG_DIR/frozen/ or 'inference' to LOG_DIR/inference/
+    :param config: fcn.config.Config
+    """
+    LOG_DIR = model_log_dir(config)
+    if config.export_format not in FORMATS:
+        raise ValueError("Unknown export format '%s', expected %s" % (config.export_format, ', '.join(FORMATS)))
+    if config.export_format != 'checkpoint':
+        start = time.time()
+        out_dir = freeze(config, config.export_format)
+        if out_dir is None:
+            print("No checkpoint found in " + checkpoint_dir(LOG_DIR, config.weights_dtype))
+            return
+        size = sum(os.path.getsize(out_dir + f) for f in os.listdir(out_dir))
+        print("Exported the %s graph to %s in %.1f s: %.1f MB" % (config.export_format, out_dir, time.time() - start, size / 1e6))
+        return
+    if config.precision == 'float32':
+        raise ValueError("Nothing to export for float32, use --set precision=float16 or bfloat16 (or --set export_format=inference)")
+    ckpt = tf.train.get_checkpoint_state(LOG_DIR)
+    if not (ckpt and ckpt.model_checkpoint_path):
+        print("No checkpoint found in " + LOG_DIR)
+        return
+    if not tf.train.checkpoint_exists(ckpt.model_checkpoint_path):
+        raise ValueError("%s is not a TensorFlow checkpoint, train with --set checkpoint_format=tf to export" % ckpt.model_checkpoint_path)
+    out_dir = checkpoint_dir(LOG_DIR, config.precision)
+    size_in, size_out = export_checkpoint(ckpt.model_checkpoint_path, out_dir, config.precision)
+    print("Exported %s to %s: %.1f MB -> %.1f MB of weights" % (ckpt.model_checkpoint_path, out_dir, size_in / 1e6, size_out / 1e6))
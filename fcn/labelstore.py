@@ -0,0 +1,115 @@
+from __future__ import print_function
+from multiprocessing import Pool
+import scipy.io as spio
+import numpy as np
+import json
+import os
+from fcn.pairing import ANNOTATIONS, frame_id, list_files
+
+"""
+Compact uint8 label store for the Cityscapes coarse annotations.
+Converts every <split>/gtCoarse/*_gtCoarse_color.mat file into one memory-mapped
+class-index array (<split>/gtCoarse_labels.npy) plus an index keyed by the frame id
+(<split>/gtCoarse_labels.json), so training reads labels by slicing instead of
+decoding a .mat file per sample. gtFine labels get their own gtFine_labels store.
+    python labelStore.py --dataset DATASET_DIR
+"""
+STORE_SUFFIX = '_labels'
+NO_CLASS = 255
+
+
+def label_key(fpath):
+    """ Frame id shared by an image and its label, e.g. aachen_000000_000019 """
+    if isinstance(fpath, bytes):
+        fpath = fpath.decode('utf-8')
+    return frame_id(fpath) or os.path.splitext(os.path.basename(fpath))[0]
+
+
+def store_paths(data_mode_dir, annotation='gtCoarse'):
+    return (os.path.join(data_mode_dir, annotation + STORE_SUFFIX + '.npy'),
+            os.path.join(data_mode_dir, annotation + STORE_SUFFIX + '.json'))
+
+
+def _mat_to_index(lb_fpath):
+    lab = spio.loadmat(lb_fpath)['label']
+    index = np.argmax(lab, axis=2).astype(np.uint8)
+    index[np.max(lab, axis=2) == 0] = NO_CLASS
+    return index
+
+
+def build_label_store(data_mode_dir, workers=4, annotation='gtCoarse'):
+    """
+    Write all labels of one split into the store
+    :param data_mode_dir: split directory, e.g. DATASET_DIR/train
+    :param workers: number of processes decoding .mat files
+    :param annotation: label folder, gtCoarse or gtFine
+    :return: number of labels written
+    """
+    labels_by_id = list_files(os.path.join(data_mode_dir, annotation), ANNOTATIONS[annotation])[0]
+    lab_fpath = [labels_by_id[k] for k in sorted(labels_by_id)]
+    if len(lab_fpath) == 0:
+        print("no label found in " + data_mode_dir)
+        return 0
+    npy_path, json_path = store_paths(data_mode_dir, annotation)
+    height, width = _mat_to_index(lab_fpath[0]).shape
+    labels = np.lib.format.open_memmap(npy_path + '.tmp', mode='w+', dtype=np.uint8,
+                                       shape=(len(lab_fpath), height, width))
+    pool = Pool(workers)
+    try:
+        for row, index in enumerate(pool.imap(_mat_to_index, lab_fpath, chunksize=16)):
+            labels[row] = index
+    finally:
+        pool.close()
+        pool.join()
+    labels.flush()
+    del labels
+    os.rename(npy_path + '.tmp', npy_path)
+    with open(json_path, 'w') as f:
+        json.dump({'shape': [len(lab_fpath), height, width],
+                   'keys': dict((label_key(p), row) for row, p in enumerate(lab_fpath))}, f)
+    return len(lab_fpath)
+
+
+class LabelStore(object):
+    """ Read-only view of a label store with class indices remapped to TRAIN_CLASSES """
+
+    def __init__(self, data_mode_dir, train_classes, annotation='gtCoarse'):
+        npy_path, json_path = store_paths(data_mode_dir, annotation)
+        with open(json_path) as f:
+            self.keys = json.load(f)['keys']
+        self.labels = np.load(npy_path, mmap_mode='r')
+        # Stored class c -> position in TRAIN_CLASSES, anything else -> "other"
+        self.lut = np.full(256, len(train_classes), dtype=np.uint8)
+        self.lut[np.array(train_classes)] = np.arange(len(train_classes))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def missing(self, lab_fpath):
+        """ Label paths of lab_fpath whose frame is not in the store """
+        return [p for p in lab_fpath if label_key(p) not in self.keys]
+
+    def read(self, lb_fpath):
+        """ Class-index map [H,W] (uint8) for the label path or image path of one sample """
+        return self.lut[self.labels[self.keys[label_key(lb_fpath)]]]
+
+
+def open_label_store(data_dir, dataset_mode, train_classes, annotation='gtCoarse', lab_fpath=None):
+    """
+    LabelStore of a split, or None when labelStore.py has not been run on it
+    :param lab_fpath: label paths the store is read for, a store built before some of them were added
+                      is not used (None when it misses any) so the pipeline decodes the .mat labels instead
+    """
+    data_mode_dir = data_dir + "/" + dataset_mode
+    if not all(os.path.exists(p) for p in store_paths(data_mode_dir, annotation)):
+        print("No %s label store in %s, decoding .mat labels" % (annotation, data_mode_dir))
+        return None
+    store = LabelStore(data_mode_dir, train_classes, annotation)
+    missing = store.missing(lab_fpath) if lab_fpath is not None else []
+    if missing:
+        print("The %s label store in %s is stale, it misses %d of %d labels (e.g. %s), decoding .mat labels. "
+              "Rebuild it with: python labelStore.py --dataset %s --annotation %s"
+              % (annotation, data_mode_dir, len(missing), len(lab_fpath), missing[0], data_dir, annotation))
+        return None
+    print("Using label store in %s (%d labels)" % (data_mode_dir, len(store)))
+    return store
@@ -0,0 +1,55 @@
+import tensorflow as tf
+import numpy as np
+from fcn.config import NUM_OF_CLASSES
+
+
+class ConfusionMatrix(object):
+    """
+    Streaming confusion matrix of the NUM_OF_CLASSES training classes. Rows are ground truth,
+    columns are predictions; the extra last column counts pixels predicted as "other".
+    Ground truth "other" pixels are ignored.
+    """
+
+    def __init__(self, num_classes=NUM_OF_CLASSES):
+        self.num_classes = num_classes
+        self.matrix = np.zeros((num_classes, num_classes+1), dtype=np.int64)
+
+    def add(self, batch_matrix):
+        """ Accumulate a [(n+1),(n+1)] matrix computed on the device, e.g. by confusion_matrix_op """
+        self.matrix += batch_matrix[:self.num_classes]
+
+    def update(self, gt, pred):
+        """ Accumulate class-index maps of any (matching) shape with a single bincount """
+        n = self.num_classes
+        gt = np.asarray(gt, dtype=np.int64).ravel()
+        pred = np.asarray(pred, dtype=np.int64).ravel()
+        valid = gt < n
+        counts = np.bincount(gt[valid] * (n+1) + np.minimum(pred[valid], n), minlength=n*(n+1))
+        self.matrix += counts.reshape(n, n+1)
+
+    def iou(self):
+        """ Per-class IoU, nan for classes absent from both ground truth and prediction """
+        tp = np.diag(self.matrix[:, :self.num_classes]).astype(np.float64)
+        union = self.matrix.sum(axis=1) + self.matrix[:, :self.num_classes].sum(axis=0) - tp
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return tp / union
+
+    def mean_iou(self):
+        return np.nanmean(self.iou())
+
+    def frequency_weighted_iou(self):
+        freq = self.matrix.sum(axis=1) / float(max(self.matrix.sum(), 1))
+        iou = self.iou()
+        valid = ~np.isnan(iou)
+        return np.sum(freq[valid] * iou[valid])
+
+    def pixel_accuracy(self):
+        return np.trace(self.matrix[:, :self.num_classes]) / float(max(self.matrix.sum(), 1))
+
+
+def confusion_matrix_op(gt_label, pred_label, num_classes=NUM_OF_CLASSES):
+    """ [(n+1),(n+1)] int64 confusion matrix of a batch, computed in the graph so only the counts are fetched """
+    gt = tf.reshape(tf.cast(gt_label, tf.int32), [-1])
+    pred = tf.reshape(tf.cast(pred_label, tf.int32), [-1])
+    weights = tf.cast(tf.not_equal(gt, num_classes), tf.int64)
+    return tf.confusion_matrix(gt, pred, num_classes=num_classes+1, weights=weights, dtype=tf.int64)
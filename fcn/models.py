@@ -0,0 +1,214 @@
+from __future__ import print_function
+import collections
+import tensorflow as tf
+from fcn.config import NUM_OF_CLASSES, log_dir
+from fcn.precision import DTYPES, precision_getter
+
+"""
+FCN model zoo. Every variant is a backbone from BACKBONES (AlexNet or VGG) followed by the
+fc6-fc8 convolutions and an upsampling decoder with or without skip connections.
+Variable names (W1_1, W6, W_t1, ...) match the original per-model scripts, so their
+checkpoints in logs/ restore unchanged.
+fc6/fc7 hold most of the weights (VGG's W6 is 7x7x512x4096), HEADS has lighter replacements.
+"""
+# name:         prefix of the log/result folders
+# description:  printed when the graph is built
+# encoder:      function(image, keep_prob) -> (pool5, [(feature, depth), ...], weights) with the
+#               skip features ordered from the coarsest to the finest resolution
+# head:         [(kernel, in_depth, out_depth)] of conv6 and conv7
+# deconv_sizes: kernel sizes of the three transposed convolutions
+# fused_skips:  number of skip features added in the skip variant (the AlexNet model upsamples
+#               the second transposed convolution's output without adding pool1 back)
+Backbone = collections.namedtuple('Backbone', ['name', 'description', 'encoder', 'head', 'deconv_sizes', 'fused_skips'])
+
+
+def _conv_layer(x, name, shape, keep_prob, stride=1, rate=1):
+    """ conv + relu + dropout, returns the activation and the weight for regularization """
+    with tf.name_scope('conv' + name):
+        W = tf.get_variable(name='W' + name, initializer=tf.truncated_normal(shape=shape, stddev=0.02))
+        b = tf.get_variable(name='b' + name, initializer=tf.constant(0.0, shape=[shape[3]]))
+        if rate > 1:
+            conv = tf.nn.atrous_conv2d(x, W, rate, padding="SAME")
+        else:
+            conv = tf.nn.conv2d(x, W, strides=[1, stride, stride, 1], padding="SAME")
+        return _relu_dropout(tf.nn.bias_add(conv, b), name, keep_prob), W
+
+
+def _relu_dropout(x, name, keep_prob):
+    x = tf.nn.relu(x, name="relu" + name)
+    if isinstance(keep_prob, (int, float)) and keep_prob == 1:
+        # Inference graphs with a constant keep_prob get no dropout ops at all
+        return x
+    return tf.nn.dropout(x, keep_prob=tf.cast(keep_prob, x.dtype))
+
+
+def _max_pool(x, name):
+    return tf.nn.max_pool(x, ksize=[1, 2, 2, 1], strides=[1, 2, 2, 1], padding="SAME", name=name)
+
+
+def _deconv_layer(x, name, shape, output_shape, stride):
+    with tf.name_scope('conv_' + name):
+        W = tf.get_variable(name='W_' + name, initializer=tf.truncated_normal(shape=shape, stddev=0.02))
+        b = tf.get_variable(name='b_' + name, initializer=tf.constant(0.0, shape=[shape[2]]))
+        return tf.nn.bias_add(tf.nn.conv2d_transpose(x, W, output_shape=output_shape, strides=[1, stride, stride, 1], padding="SAME"), b)
+
+
+def vgg_encoder(image, keep_prob):
+    x, depth, weights, pools = image, 3, [], []
+    for stage, (out_depth, num_conv) in enumerate([(64, 2), (128, 2), (256, 4), (512, 4), (512, 4)], 1):
+        for i in range(1, num_conv + 1):
+            x, W = _conv_layer(x, '%d_%d' % (stage, i), [3, 3, depth, out_depth], keep_prob)
+            depth = out_depth
+            weights.append(W)
+        x = _max_pool(x, 'pool%d' % stage)
+        pools.append((x, depth))
+    return x, [pools[3], pools[2]], weights
+
+
+def alexnet_encoder(image, keep_prob):
+    x, W1 = _conv_layer(image, '1', [11, 11, 3, 96], keep_prob, stride=4)
+    pool1 = _max_pool(x, 'pool1')
+    x, W2 = _conv_layer(pool1, '2', [5, 5, 96, 256], keep_prob)
+    pool2 = _max_pool(x, 'pool2')
+    x, W3 = _conv_layer(pool2, '3', [3, 3, 256, 384], keep_prob)
+    x, W4 = _conv_layer(x, '4', [3, 3, 384, 384], keep_prob)
+    x, W5 = _conv_layer(x, '5', [3, 3, 384, 256], keep_prob)
+    pool5 = _max_pool(x, 'pool5')
+    return pool5, [(pool2, 256), (pool1, 96)], [W1, W2, W3, W4, W5]
+
+
+# --------------------------------------- fc6/fc7 heads ---------------------------------------
+# function(x, spec, keep_prob) -> (activation, depth, weights), spec.head gives the fc6/fc7 shapes
+HEAD_WIDTH = 1024
+HEAD_RANK = 256
+
+
+def fc_head(x, spec, keep_prob):
+    """ The original dense fc6/fc7 convolutions """
+    weights = []
+    for name, (kernel, in_depth, out_depth) in zip(['6', '7'], spec.head):
+        x, W = _conv_layer(x, name, [kernel, kernel, in_depth, out_depth], keep_prob)
+        weights.append(W)
+    return x, spec.head[-1][2], weights
+
+
+def atrous_head(x, spec, keep_prob):
+    """ DeepLab-LargeFOV style: 3x3 dilated fc6 covering fc6's field of view, both HEAD_WIDTH wide """
+    kernel, in_depth = spec.head[0][:2]
+    x, W6 = _conv_layer(x, '6_atrous', [3, 3, in_depth, HEAD_WIDTH], keep_prob, rate=max(1, (kernel - 1) // 2))
+    x, W7 = _conv_layer(x, '7_atrous', [1, 1, HEAD_WIDTH, HEAD_WIDTH], keep_prob)
+    return x, HEAD_WIDTH, [W6, W7]
+
+
+def lowrank_head(x, spec, keep_prob):
+    """ fc6/fc7 factorized into a HEAD_RANK deep linear conv followed by a 1x1 conv, same output depth """
+    weights = []
+    for name, (kernel, in_depth, out_depth) in zip(['6', '7'], spec.head):
+        with tf.name_scope('conv%s_lowrank' % name):
+            U = tf.get_variable(name='W%s_u' % name, initializer=tf.truncated_normal(shape=[kernel, kernel, in_depth, HEAD_RANK], stddev=0.02))
+            x = tf.nn.conv2d(x, U, strides=[1, 1, 1, 1], padding="SAME")
+        x, V = _conv_layer(x, '%s_v' % name, [1, 1, HEAD_RANK, out_depth], keep_prob)
+        weights += [U, V]
+    return x, spec.head[-1][2], weights
+
+
+def separable_head(x, spec, keep_prob):
+    """ Depthwise fc6 (at least 3x3) + 1x1 pointwise to HEAD_WIDTH, then a HEAD_WIDTH 1x1 fc7 """
+    kernel, in_depth = spec.head[0][:2]
+    kernel = max(3, kernel)
+    with tf.name_scope('conv6_separable'):
+        D = tf.get_variable(name='W6_dw', initializer=tf.truncated_normal(shape=[kernel, kernel, in_depth, 1], stddev=0.02))
+        P = tf.get_variable(name='W6_pw', initializer=tf.truncated_normal(shape=[1, 1, in_depth, HEAD_WIDTH], stddev=0.02))
+        b = tf.get_variable(name='b6_pw', initializer=tf.constant(0.0, shape=[HEAD_WIDTH]))
+        x = tf.nn.bias_add(tf.nn.separable_conv2d(x, D, P, strides=[1, 1, 1, 1], padding="SAME"), b)
+        x = _relu_dropout(x, '6', keep_prob)
+    x, W7 = _conv_layer(x, '7_separable', [1, 1, HEAD_WIDTH, HEAD_WIDTH], keep_prob)
+    return x, HEAD_WIDTH, [D, P, W7]
+
+
+HEADS = {'fc': fc_head, 'atrous': atrous_head, 'lowrank': lowrank_head, 'separable': separable_head}
+
+
+BACKBONES = {
+    'alexnet': Backbone(name='AlexNet', description='AlexNet', encoder=alexnet_encoder,
+                        head=[(1, 256, 2048), (1, 2048, 2048)], deconv_sizes=[3, 5, 11], fused_skips=1),
+    'vgg': Backbone(name='VGG', description='VGG net', encoder=vgg_encoder,
+                    head=[(7, 512, 4096), (1, 4096, 4096)], deconv_sizes=[4, 4, 16], fused_skips=2),
+}
+
+
+def variant_name(backbone, skip, head='fc'):
+    """ e.g. VGG_skip, AlexNet, VGG_skip_atrous """
+    return BACKBONES[backbone].name + ('_skip' if skip else '') + ('' if head == 'fc' else '_' + head)
+
+
+def variants():
+    """ (backbone, skip) of every model in the zoo """
+    return [(backbone, skip) for backbone in sorted(BACKBONES) for skip in [True, False]]
+
+
+def model_log_dir(config):
+    """ log_dir of the model selected by a fcn.config.Config """
+    return log_dir(variant_name(config.model, config.skip, config.head), config.num_classes)
+
+
+def inference(image, keep_prob, backbone='vgg', skip=True, num_classes=NUM_OF_CLASSES, precision='float32', weights_dtype='float32',
+              head='fc'):
+    """
+    Semantic segmentation network definition
+    :param image: input image. Should have values in range 0-255
+    :param keep_prob:
+    :param backbone: key of BACKBONES
+    :param skip: add the pooled encoder features back while upsampling
+    :param num_classes: number of training classes, the logits have one more channel for "other"
+    :param precision: compute dtype of the convolutions and activations, a key of fcn.precision.DTYPES
+    :param weights_dtype: dtype the variables are stored in, float32 master weights or an exported reduced type
+    :param head: key of HEADS, the fc6/fc7 layers
+    :return: prediction [B,H,W,1], float32 logits [B,H,W,num_classes+1], L2 loss of the encoder and fc weights
+    """
+    spec = BACKBONES[backbone]
+    print("setting up %s %s skip connection%s..." % (spec.description, "with" if skip else "without", "" if head == 'fc' else ", %s head" % head))
+
+    custom_getter = None
+    if precision != 'float32' or weights_dtype != 'float32':
+        print("computing in %s with %s weights" % (precision, weights_dtype))
+        custom_getter = precision_getter(DTYPES[precision], DTYPES[weights_dtype])
+    with tf.variable_scope("inference", custom_getter=custom_getter):
+        # ---------------------------------------- DOWNSAMPLING ----------------------------------------
+        x, features, weights = spec.encoder(tf.cast(image, DTYPES[precision]), keep_prob)
+
+        # Convolutional Layer 6, 7
+        x, head_depth, head_weights = HEADS[head](x, spec, keep_prob)
+        weights += head_weights
+
+        # Convolutional Layer 8
+        with tf.name_scope('conv8'):
+            W8 = tf.get_variable(name='W8', initializer=tf.truncated_normal(shape=[1, 1, head_depth, num_classes+1], stddev=0.02))
+            b8 = tf.get_variable(name='b8', initializer=tf.constant(0.0, shape=[num_classes+1]))
+            x = tf.nn.bias_add(tf.nn.conv2d(x, W8, strides=[1, 1, 1, 1], padding="SAME"), b8)
+        weights.append(W8)
+
+        # ---------------------------------------- UPSAMPLING ----------------------------------------
+        # Deconvolution Layer 1, 2: x2 each, to the resolution of the skip features
+        depth = num_classes+1
+        for i, ((feature, feature_depth), size) in enumerate(zip(features, spec.deconv_sizes), 1):
+            if skip:
+                x = _deconv_layer(x, 't%d' % i, [size, size, feature_depth, depth], tf.shape(feature), 2)
+                if i <= spec.fused_skips:
+                    x = tf.add(x, feature, name="skip_%d" % i)
+                depth = feature_depth
+            else:
+                output_shape = tf.stack([tf.shape(feature)[0], tf.shape(feature)[1], tf.shape(feature)[2], num_classes+1])
+                x = _deconv_layer(x, 't%d' % i, [size, size, num_classes+1, num_classes+1], output_shape, 2)
+
+        # Deconvolution Layer 3: x8 to the input resolution
+        shape = tf.shape(image)
+        deconv_shape3 = tf.stack([shape[0], shape[1], shape[2], num_classes+1])
+        size = spec.deconv_sizes[2]
+        conv_t3 = _deconv_layer(x, 't3', [size, size, num_classes+1, depth], deconv_shape3, 8)
+
+        conv_t3 = tf.cast(conv_t3, tf.float32)
+        annotation_pred = tf.argmax(conv_t3, axis=3, name="prediction")
+        reg_loss = tf.add_n([tf.nn.l2_loss(tf.cast(W, tf.float32)) for W in weights])
+
+    return tf.expand_dims(annotation_pred, axis=3), conv_t3, reg_loss
@@ -0,0 +1,52 @@
+from __future__ import print_function
+import re
+import os
+
+"""
+Image/label pairing by Cityscapes frame id (<city>_<sequence>_<frame>, e.g. aachen_000000_000019).
+Both folders are listed once and joined through a dict, so startup stays linear in the number
+of files, with flat folders or per-city subfolders alike.
+"""
+IMAGE_DIR = 'leftImg8bit'
+IMAGE_SUFFIX = '_leftImg8bit.png'
+# annotation folder -> label file suffix
+ANNOTATIONS = {'gtCoarse': '_gtCoarse_color.mat', 'gtFine': '_gtFine_color.mat'}
+FRAME_ID = re.compile(r'^(.+_\d+_\d+)_')
+
+
+def frame_id(fname):
+    """ Frame id of an image or label file name, None when it does not follow the Cityscapes naming """
+    match = FRAME_ID.match(os.path.basename(fname))
+    return match.group(1) if match else None
+
+
+def list_files(root, suffix):
+    """ {frame id: path} of the files under root ending with suffix, plus the paths without a frame id """
+    files = {}
+    unnamed = []
+    for dirpath, dirnames, fnames in os.walk(root):
+        dirnames.sort()
+        for fname in fnames:
+            if not fname.endswith(suffix):
+                continue
+            key = frame_id(fname)
+            if key is None:
+                unnamed.append(os.path.join(dirpath, fname))
+            else:
+                files[key] = os.path.join(dirpath, fname)
+    return files, unnamed
+
+
+def pair_files(data_mode_dir, annotation='gtCoarse'):
+    """
+    Pair the images and labels of one split
+    :param data_mode_dir: split directory, e.g. DATASET_DIR/train
+    :param annotation: label folder, a key of ANNOTATIONS
+    :return: (image paths, label paths, unmatched paths), pairs sorted by frame id
+    """
+    images, unnamed_images = list_files(os.path.join(data_mode_dir, IMAGE_DIR), IMAGE_SUFFIX)
+    labels, unnamed_labels = list_files(os.path.join(data_mode_dir, annotation), ANNOTATIONS[annotation])
+    keys = sorted(set(images) & set(labels))
+    unmatched = sorted([images[k] for k in set(images) - set(labels)] + [labels[k] for k in set(labels) - set(images)] +
+                       unnamed_images + unnamed_labels)
+    return [images[k] for k in keys], [labels[k] for k in keys], unmatched
@@ -0,0 +1,97 @@
+from __future__ import print_function
+import tensorflow as tf
+import os
+
+"""
+Reduced precision compute. The inference graph runs its convolutions and activations in
+float16 or bfloat16 (--set precision=float16) while the trainable variables stay float32
+master weights, cast on read. Training scales the loss (--set loss_scale=dynamic or a number)
+so float16 gradients do not underflow.
+An exported checkpoint stores the weights themselves in the reduced type for inference only:
+    python sceneSeg.py --mode export --set precision=float16
+    python sceneSeg.py --mode visualize --imagedir DIR --set precision=float16 --set weights_dtype=float16
+"""
+DTYPES = {'float32': tf.float32, 'float16': tf.float16, 'bfloat16': tf.bfloat16}
+LOSS_SCALE_INIT = 2.0 ** 15
+LOSS_SCALE_PERIOD = 2000
+
+
+def precision_getter(compute_dtype, variable_dtype=tf.float32):
+    """
+    custom_getter creating floating point variables as variable_dtype and returning them as compute_dtype
+    """
+    def getter(getter, *args, **kwargs):
+        initializer = kwargs.get('initializer')
+        if variable_dtype != tf.float32 and isinstance(initializer, tf.Tensor) and initializer.dtype == tf.float32:
+            kwargs['initializer'] = tf.cast(initializer, variable_dtype)
+            kwargs['dtype'] = variable_dtype
+        var = getter(*args, **kwargs)
+        if var.dtype.base_dtype.is_floating and var.dtype.base_dtype != compute_dtype:
+            return tf.cast(var, compute_dtype)
+        return var
+    return getter
+
+
+def checkpoint_dir(log_dir, weights_dtype='float32'):
+    """ Checkpoints of the training run, or of its export with weights_dtype weights """
+    return log_dir if weights_dtype == 'float32' else log_dir + weights_dtype + '/'
+
+
+def scaled_gradients(optimizer, loss_val, var_list, loss_scale):
+    """
+    Gradients of loss_val * scale unscaled again, with the ops of the dynamic scale
+    :param loss_scale: 'dynamic' or a fixed scale
+    :return: (grads_and_vars, all gradients finite, op updating the scale after a step)
+    """
+    if loss_scale == 'dynamic':
+        # Local variables: not checkpointed, so float32 and float16 runs resume each other's checkpoints
+        scale = tf.get_variable('loss_scale', initializer=LOSS_SCALE_INIT, trainable=False, collections=[tf.GraphKeys.LOCAL_VARIABLES])
+        good_steps = tf.get_variable('loss_scale_good_steps', initializer=0, trainable=False, collections=[tf.GraphKeys.LOCAL_VARIABLES])
+    else:
+        scale = tf.constant(float(loss_scale))
+    grads = [(g / scale, v) for g, v in optimizer.compute_gradients(loss_val * scale, var_list=var_list) if g is not None]
+    finite = tf.reduce_all([tf.reduce_all(tf.is_finite(g)) for g, v in grads])
+    if loss_scale != 'dynamic':
+        return grads, finite, tf.no_op()
+
+    # Halve the scale on overflow, double it after LOSS_SCALE_PERIOD steps without one
+    def grow():
+        grown = tf.equal(good_steps + 1, LOSS_SCALE_PERIOD)
+        return tf.group(tf.assign(scale, tf.where(grown, scale * 2.0, scale)),
+                        tf.assign(good_steps, tf.where(grown, 0, good_steps + 1)))
+
+    def shrink():
+        return tf.group(tf.assign(scale, tf.maximum(scale / 2.0, 1.0)), tf.assign(good_steps, 0))
+    return grads, finite, tf.cond(finite, grow, shrink)
+
+
+def export_checkpoint(ckpt_path, out_dir, dtype):
+    """
+    Write the inference variables of a float32 checkpoint as dtype, optimizer slots are dropped
+    :return: (bytes before, bytes after) of the exported variables
+    """
+    reader = tf.train.NewCheckpointReader(ckpt_path)
+    shapes = reader.get_variable_to_dtype_map()
+    names = sorted(n for n in shapes if n.startswith('inference/') and 'Adam' not in n)
+    size_in, size_out = 0, 0
+    with tf.Graph().as_default():
+        variables = {}
+        for name in names:
+            var_dtype = DTYPES[dtype] if shapes[name].is_floating else shapes[name]
+            variables[name] = tf.get_variable(name, shape=reader.get_variable_to_shape_map()[name], dtype=var_dtype,
+                                              initializer=tf.zeros_initializer())
+        global_step = tf.get_variable('global_step', initializer=0, trainable=False)
+        saver = tf.train.Saver()
+        with tf.Session() as sess:
+            for name in names:
+                # One tensor at a time, VGG's W6 alone is 400 MB
+                value = reader.get_tensor(name)
+                size_in += value.nbytes
+                variables[name].load(value.astype(variables[name].dtype.base_dtype.as_numpy_dtype), sess)
+                size_out += value.size * variables[name].dtype.base_dtype.size
+            step = int(ckpt_path.rsplit('-', 1)[-1]) if '-' in os.path.basename(ckpt_path) else 0
+            global_step.load(step, sess)
+            if not os.path.exists(out_dir):
+                os.makedirs(out_dir)
+            saver.save(sess, out_dir + 'model.ckpt', global_step=step)
+    return size_in, size_out
@@ -0,0 +1,164 @@
+from __future__ import print_function
+from tensorflow.python.client import timeline
+import tensorflow as tf
+import numpy as np
+import collections
+import json
+import time
+import re
+import os
+
+"""
+Step profiler of the train and visualize modes. The chosen steps (counted from the start of the
+run, batches in the visualize mode) run with a full trace:
+    LOG_DIR/profile/timeline_<mode>_<step>.json   Chrome trace (chrome://tracing or ui.perfetto.dev)
+    LOG_DIR/profile/summary_<mode>.md               wall, input wait and compute time of each traced step,
+                                                    time and output memory per layer and per op type
+The traced steps also show up in TensorBoard's graph tab (compute time and memory per node).
+Input wait is the time IteratorGetNext blocks on the tf.data pipeline; a large share means the
+label loading and decoding, not the network, bound the step (see benchmarks/bench_pipeline.py).
+    python sceneSeg.py --mode train --dataset DATASET_DIR --profile [10 11 12]
+"""
+PROFILE_STEPS = [10, 11, 12]
+INPUT_OPS = ('IteratorGetNext', 'IteratorGetNextSync', 'IteratorGetNextAsOptional')
+# Rows of the op type table
+TOP_OPS = 15
+# Name scopes and op names of the layers of fcn.models.inference
+LAYER_PATTERN = re.compile(r'^(conv|pool|skip|prediction)')
+
+
+def op_type(node_stats):
+    """ Op type of a node from its timeline label '[alloc] name = Type(inputs)' """
+    label = node_stats.timeline_label
+    if ' = ' not in label:
+        return node_stats.node_name.split(':')[0]
+    return label.split(' = ', 1)[1].split('(', 1)[0]
+
+
+def layer_name(node_name):
+    """ (layer of the inference graph or input/loss/optimizer/regularization, whether the node belongs to the backward pass) """
+    parts = node_name.split('/')
+    backward = parts[0] == 'gradients'
+    if parts[0] in ('Adam', 'beta1_power', 'beta2_power') or parts[0].startswith('Adam'):
+        return 'optimizer', False
+    if 'inference' in parts[:-1]:
+        layer = re.sub(r'_grad$', '', parts[parts.index('inference') + 1])
+        if layer.startswith('L2Loss'):
+            return 'regularization', backward
+        # Variable reads and the decoder's shape arithmetic
+        return layer if LAYER_PATTERN.match(layer) else 'inference (other)', backward
+    return 'other', backward
+
+
+def _node_stats(run_metadata):
+    """ Node stats of a traced run, without the per-stream duplicates of GPU kernels """
+    for device in run_metadata.step_stats.dev_stats:
+        if '/stream:' in device.device and not device.device.endswith('/stream:all'):
+            continue
+        for node_stats in device.node_stats:
+            yield node_stats
+
+
+class Profiler(object):
+    """
+    Runs the traced steps of a loop with a full trace, the others untouched
+    :param log_dir: LOG_DIR, the traces and summary go to LOG_DIR/profile/
+    :param steps: steps to trace, none disables the profiler
+    :param mode: 'train' or 'visualize', names the output files
+    :param summary_writer: FileWriter receiving the run metadata of the traced steps
+    """
+
+    def __init__(self, log_dir, steps, mode, summary_writer=None):
+        self.out_dir = os.path.join(log_dir, 'profile')
+        self.steps, self.mode = set(steps or []), mode
+        self.summary_writer = summary_writer
+        self.walls = []
+        self.traced = collections.OrderedDict()
+        # layer -> [forward ms, backward ms, output bytes], op type -> [ms, count]
+        self.layers = collections.defaultdict(lambda: [0.0, 0.0, 0])
+        self.ops = collections.defaultdict(lambda: [0.0, 0])
+
+    def run(self, sess, fetches, feed_dict=None, step=0):
+        """ sess.run(fetches, feed_dict), traced when step is one of the chosen steps """
+        if not self.steps:
+            return sess.run(fetches, feed_dict=feed_dict)
+        if step not in self.steps:
+            start = time.time()
+            results = sess.run(fetches, feed_dict=feed_dict)
+            self.walls.append(time.time() - start)
+            return results
+        run_metadata = tf.RunMetadata()
+        start = time.time()
+        results = sess.run(fetches, feed_dict=feed_dict, options=tf.RunOptions(trace_level=tf.RunOptions.FULL_TRACE),
+                           run_metadata=run_metadata)
+        self._record(step, time.time() - start, run_metadata)
+        return results
+
+    def _record(self, step, wall, run_metadata):
+        if not os.path.exists(self.out_dir):
+            os.makedirs(self.out_dir)
+        path = os.path.join(self.out_dir, 'timeline_%s_%d.json' % (self.mode, step))
+        with open(path, 'w') as f:
+            f.write(timeline.Timeline(run_metadata.step_stats).generate_chrome_trace_format(show_memory=True))
+        if self.summary_writer is not None:
+            self.summary_writer.add_run_metadata(run_metadata, '%s_step_%d' % (self.mode, step), step)
+        input_wait, first, last = 0.0, None, None
+        for node_stats in _node_stats(run_metadata):
+            ms = node_stats.all_end_rel_micros / 1000.0
+            start = node_stats.all_start_micros
+            first = start if first is None else min(first, start)
+            last = max(last or 0, start + node_stats.all_end_rel_micros)
+            kind = op_type(node_stats)
+            if kind in INPUT_OPS:
+                input_wait += ms
+                layer, backward = 'input', False
+            else:
+                layer, backward = layer_name(node_stats.node_name)
+            self.layers[layer][1 if backward else 0] += ms
+            self.layers[layer][2] += sum(output.tensor_description.allocation_description.allocated_bytes for output in node_stats.output)
+            self.ops[kind][0] += ms
+            self.ops[kind][1] += 1
+        span = (last - first) / 1000.0 if first is not None else 0.0
+        self.traced[step] = {'wall_ms': 1000 * wall, 'traced_ms': span, 'input_wait_ms': input_wait, 'compute_ms': span - input_wait}
+        print("Profiled %s step %d: %.0f ms, input wait %.0f ms, compute %.0f ms -> %s" % (
+            self.mode, step, 1000 * wall, input_wait, span - input_wait, path))
+
+    def summary(self):
+        """ Markdown tables of the traced steps, layers and op types """
+        n = float(max(len(self.traced), 1))
+        lines = ["# %s profile" % self.mode, ""]
+        if self.walls:
+            lines += ["Untraced steps: median %.1f ms over %d steps" % (1000 * np.median(self.walls), len(self.walls)), ""]
+        lines += ["| step | wall (ms) | traced (ms) | input wait (ms) | compute (ms) | input wait |", "|---|---|---|---|---|---|"]
+        for step, row in self.traced.items():
+            lines.append("| %d | %.1f | %.1f | %.1f | %.1f | %.0f%% |" % (step, row['wall_ms'], row['traced_ms'], row['input_wait_ms'],
+                                                                      row['compute_ms'], 100 * row['input_wait_ms'] / max(row['traced_ms'], 1e-9)))
+        total = sum(forward + backward for forward, backward, _ in self.layers.values()) or 1.0
+        lines += ["", "Per layer, mean over the traced steps (op time, summed over parallel ops):", "",
+                  "| layer | forward (ms) | backward (ms) | share | outputs (MB) |", "|---|---|---|---|---|"]
+        for layer, (forward, backward, nbytes) in sorted(self.layers.items(), key=lambda item: -(item[1][0] + item[1][1])):
+            lines.append("| %s | %.2f | %.2f | %.1f%% | %.1f |" % (layer, forward / n, backward / n, 100 * (forward + backward) / total,
+                                                                  nbytes / n / 1e6))
+        lines += ["", "Top %d op types, mean over the traced steps:" % TOP_OPS, "", "| op | ms | count | share |", "|---|---|---|---|"]
+        for kind, (ms, count) in sorted(self.ops.items(), key=lambda item: -item[1][0])[:TOP_OPS]:
+            lines.append("| %s | %.2f | %.1f | %.1f%% |" % (kind, ms / n, count / n, 100 * ms / total))
+        return '\n'.join(lines) + '\n'
+
+    def close(self):
+        """ Write and print the summary, returns its path or None when no step was traced """
+        if not self.traced:
+            if self.steps:
+                print("No profiled step ran, the run ended before step %d" % min(self.steps))
+            return None
+        text = self.summary()
+        path = os.path.join(self.out_dir, 'summary_%s.md' % self.mode)
+        with open(path, 'w') as f:
+            f.write(text)
+        with open(os.path.join(self.out_dir, 'summary_%s.json' % self.mode), 'w') as f:
+            json.dump({'steps': self.traced, 'untraced_median_ms': 1000 * np.median(self.walls) if self.walls else None,
+                       'layers': dict((layer, {'forward_ms': v[0] / len(self.traced), 'backward_ms': v[1] / len(self.traced),
+                                               'output_mb': v[2] / len(self.traced) / 1e6}) for layer, v in self.layers.items())},
+                      f, indent=2)
+        print(text)
+        print("Profile summary: " + path)
+        return path
@@ -0,0 +1,182 @@
+from __future__ import print_function
+from PIL import Image
+import tensorflow as tf
+import numpy as np
+import subprocess
+import resource
+import random
+import json
+import time
+import sys
+import os
+from fcn.checkpoint import restore_latest
+from fcn.config import ROOT_DIR, load_config
+from fcn.data import setup_dataset, setup_dataset_dir
+from fcn.labelstore import open_label_store
+from fcn.metrics import ConfusionMatrix
+from fcn.models import inference, model_log_dir
+
+"""
+Post-training int8 quantization for CPU inference. The inference graph of the latest checkpoint
+is converted with TFLite: int8 weights (per output channel) and activations (per tensor), the
+activation ranges calibrated on a sample of val/leftImg8bit. The model is written to
+LOG_DIR/int8/model.tflite and its mIoU, latency and peak memory are compared with the float32
+checkpoint on the val split, each model evaluated in a fresh process.
+    python sceneSeg.py --mode quantize --dataset DATASET_DIR [--set calibration_images=100]
+    python sceneSeg.py --mode visualize --imagedir DIR --set runtime=tflite
+"""
+TFLITE_NAME = 'int8/model.tflite'
+
+
+def tflite_path(config):
+    return model_log_dir(config) + TFLITE_NAME
+
+
+def calibration_images(data_dir, num_images, image_size, seed=0, annotation='gtCoarse'):
+    """ Generator of [1,H,W,3] float32 images sampled from the paired val/leftImg8bit images, the representative dataset """
+    im_fpath, lab_fpath = setup_dataset_dir(data_dir, "val", annotation)
+    if not im_fpath:
+        raise ValueError("No val image with a %s label in %s/val, nothing to calibrate the int8 model with" % (annotation, data_dir))
+    sample = random.Random(seed).sample(sorted(im_fpath), min(num_images, len(im_fpath)))
+
+    def generator():
+        for i, path in enumerate(sample):
+            image = Image.open(path).convert('RGB').resize((image_size[1], image_size[0]), Image.BILINEAR)
+            if i % 20 == 0:
+                print("Calibrating %d/%d" % (i, len(sample)))
+            yield [np.asarray(image, dtype=np.float32)[np.newaxis]]
+    return generator
+
+
+def convert(config, representative_dataset):
+    """ int8 TFLite flatbuffer of the latest checkpoint, None when there is no checkpoint """
+    with tf.Graph().as_default():
+        image = tf.placeholder(tf.float32, shape=[1] + list(config.image_size) + [3], name="input_image")
+        pred_label, logits, regularization_loss = inference(image, 1.0, config.model, config.skip, config.num_classes, head=config.head)
+        pred = tf.cast(tf.squeeze(pred_label, axis=[0, 3]), tf.int32, name="pred_label")
+        with tf.Session() as sess:
+            if not restore_latest(sess, tf.train.Saver(), model_log_dir(config)):
+                return None
+            converter = tf.lite.TFLiteConverter.from_session(sess, [image], [pred])
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            converter.representative_dataset = representative_dataset
+            # Integer kernels only, the float input is quantized by the first op
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+            return converter.convert()
+
+
+class TFLiteSegmenter(object):
+    """ Runs an int8 model on one [H,W,3] float32 image at a time """
+
+    def __init__(self, model_path, num_threads=None):
+        self.interpreter = tf.lite.Interpreter(model_path=model_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self.input_index = self.interpreter.get_input_details()[0]['index']
+        self.output_index = self.interpreter.get_output_details()[0]['index']
+        self.image_size = tuple(self.interpreter.get_input_details()[0]['shape'][1:3])
+
+    def __call__(self, image):
+        """ Class-index map [H,W] (uint8) """
+        self.interpreter.set_tensor(self.input_index, image[np.newaxis].astype(np.float32))
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output_index).astype(np.uint8)
+
+
+def evaluate_model(data_dir, config, checkpoint_dir, model_path=None, max_images=None):
+    """
+    Confusion matrix and per-image latencies (s) of one model on the val split, one image at a time
+    :param checkpoint_dir: LOG_DIR of the float32 checkpoint, evaluated when model_path is None
+    :param model_path: int8 TFLite model
+    """
+    im_fpath, lab_fpath = setup_dataset_dir(data_dir, "val", config.annotation)
+    if max_images:
+        im_fpath, lab_fpath = im_fpath[:max_images], lab_fpath[:max_images]
+    matrix, latency = ConfusionMatrix(config.num_classes), []
+    with tf.Graph().as_default():
+        dataset = setup_dataset(im_fpath, lab_fpath, open_label_store(data_dir, "val", config.train_classes, config.annotation, lab_fpath),
+                                num_parallel_calls=4, prefetch_buffer=2, sparse=True, batch_size=1, repeat=False,
+                                train_classes=config.train_classes, image_size=config.image_size)
+        img, ann = dataset.make_one_shot_iterator().get_next()
+        if model_path is None:
+            image = tf.placeholder(tf.float32, shape=[1] + list(config.image_size) + [3])
+            pred_label, logits, regularization_loss = inference(image, 1.0, config.model, config.skip, config.num_classes, head=config.head)
+        with tf.Session() as sess:
+            if model_path is None:
+                restore_latest(sess, tf.train.Saver(), checkpoint_dir)
+                segment = lambda image_np: sess.run(pred_label, feed_dict={image: image_np[np.newaxis]})[0, :, :, 0]
+            else:
+                segment = TFLiteSegmenter(model_path)
+            while True:
+                try:
+                    image_np, gt = sess.run([img, ann])
+                except tf.errors.OutOfRangeError:
+                    break
+                start = time.time()
+                pred = segment(image_np[0])
+                latency.append(time.time() - start)
+                matrix.update(gt[0], pred)
+    return matrix, latency
+
+
+def _peak_rss_mb():
+    """ Peak RSS of this process; ru_maxrss carries over the parent's across fork and exec on Linux, VmHWM does not """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024.0
+    except IOError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _evaluate_child(settings):
+    """ evaluate_model in this process, JSON-able with the process' peak RSS """
+    matrix, latency = evaluate_model(settings['data_dir'], load_config(overrides=settings['config']), settings['checkpoint_dir'],
+                                     settings['model_path'], settings['max_images'])
+    return {'matrix': matrix.matrix.tolist(), 'latency': latency,
+            'peak_rss_mb': _peak_rss_mb()}
+
+
+def compare(data_dir, config, model_path, max_images=None):
+    """
+    mIoU, median latency (ms) and peak RSS (MB) of the float32 checkpoint and the int8 model on the val split,
+    each evaluated in a fresh process so the peak memory of one does not hide the other's
+    """
+    results = {}
+    for name, path in [('float32', None), ('int8', model_path)]:
+        settings = {'data_dir': data_dir, 'config': config.as_dict(), 'checkpoint_dir': model_log_dir(config),
+                    'model_path': path, 'max_images': max_images}
+        out = subprocess.check_output([sys.executable, '-m', 'fcn.quantize', json.dumps(settings)], cwd=ROOT_DIR)
+        result = json.loads(out.decode('utf-8').strip().splitlines()[-1])
+        matrix = ConfusionMatrix(config.num_classes)
+        matrix.matrix += np.array(result['matrix'], dtype=np.int64)
+        results[name] = (matrix.mean_iou(), 1000 * np.median(result['latency']), result['peak_rss_mb'])
+    return results
+
+
+def main(data_dir, config):
+    """
+    Quantize the latest checkpoint of the configured model and report the mIoU drift
+    :param config: fcn.config.Config, config.calibration_images val images calibrate the activations
+    """
+    out_path = tflite_path(config)
+    model = convert(config, calibration_images(data_dir, config.calibration_images, config.image_size, annotation=config.annotation))
+    if model is None:
+        print("No checkpoint found in " + os.path.dirname(os.path.dirname(out_path)))
+        return
+    if not os.path.exists(os.path.dirname(out_path)):
+        os.makedirs(os.path.dirname(out_path))
+    with open(out_path, 'wb') as f:
+        f.write(model)
+    print("Saved %s (%.1f MB)" % (out_path, len(model) / 1e6))
+
+    results = compare(data_dir, config, out_path, config.quantize_eval_images)
+    print("%-8s %8s %14s %15s" % ("model", "mIoU", "latency (ms)", "peak RSS (MB)"))
+    for name in ['float32', 'int8']:
+        print("%-8s %8.4f %14.1f %15.0f" % ((name,) + results[name]))
+    print("mIoU drift: %+.4f, peak RSS: %.0f MB less" % (results['int8'][0] - results['float32'][0], results['float32'][2] - results['int8'][2]))
+
+
+if __name__ == "__main__":
+    print(json.dumps(_evaluate_child(json.loads(sys.argv[1]))))
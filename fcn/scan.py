@@ -0,0 +1,151 @@
+from __future__ import print_function
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+import scipy.io as spio
+import numpy as np
+import json
+import os
+from fcn.config import IMSIZE_X, IMSIZE_Y, CLASS_NAMES
+from fcn.pairing import IMAGE_DIR, pair_files
+
+"""
+Dataset integrity scanner.
+Checks every split on a thread pool (image/label pairing, image headers, label shape and
+class range), reports all problems and writes <split>/manifest.json with the paired paths,
+file sizes, dimensions and class pixel histogram. setup_dataset_dir reads the manifest
+instead of listing the folders when it is up to date.
+    python checkDataset.py --dataset DATASET_DIR
+"""
+MANIFEST_NAME = 'manifest.json'
+
+
+def _has_folders(data_mode_dir, annotation):
+    return all(os.path.isdir(os.path.join(data_mode_dir, d)) for d in (IMAGE_DIR, annotation))
+
+
+def _dir_mtimes(data_mode_dir, annotation):
+    """
+    {folder relative to the split: modification time} of the image and label folders and all their
+    subfolders (e.g. per city), a folder's time changes when files or subfolders are added to or removed from it
+    """
+    mtimes = {}
+    for d in (IMAGE_DIR, annotation):
+        for dirpath, dirnames, fnames in os.walk(os.path.join(data_mode_dir, d)):
+            mtimes[os.path.relpath(dirpath, data_mode_dir)] = os.stat(dirpath).st_mtime
+    return mtimes
+
+
+def _is_up_to_date(data_mode_dir, mtimes):
+    """ Whether the folders recorded by _dir_mtimes kept their times, one stat per folder and no listing """
+    try:
+        return all(os.stat(os.path.join(data_mode_dir, d)).st_mtime == t for d, t in mtimes.items())
+    except OSError:
+        return False
+
+
+def _check_pair(data_mode_dir, im_fpath, lb_fpath, num_labels):
+    """ Check one (image, label) pair, returns (entry, problems) """
+    problems = []
+    entry = {'image': os.path.relpath(im_fpath, data_mode_dir), 'label': os.path.relpath(lb_fpath, data_mode_dir),
+             'image_bytes': os.path.getsize(im_fpath), 'label_bytes': os.path.getsize(lb_fpath)}
+    try:
+        # Only the header is read, the pixels are decoded by the input pipeline
+        with Image.open(im_fpath) as im:
+            entry['image_size'] = [im.size[1], im.size[0]]
+            if im.mode not in ('RGB', 'RGBA', 'L', 'P'):
+                problems.append("%s: unexpected image mode %s" % (im_fpath, im.mode))
+    except (IOError, SyntaxError) as e:
+        problems.append("%s: unreadable image (%s)" % (im_fpath, e))
+    try:
+        lab = spio.loadmat(lb_fpath)['label']
+    except Exception as e:
+        problems.append("%s: unreadable label (%s)" % (lb_fpath, e))
+        return entry, problems
+    entry['label_shape'] = list(lab.shape)
+    if lab.ndim != 3 or lab.shape[:2] != (IMSIZE_X, IMSIZE_Y):
+        problems.append("%s: label shape %s, expected (%d, %d, C)" % (lb_fpath, lab.shape, IMSIZE_X, IMSIZE_Y))
+        return entry, problems
+    if lab.shape[2] < num_labels:
+        problems.append("%s: %d label channels, expected at least %d" % (lb_fpath, lab.shape[2], num_labels))
+        return entry, problems
+    if lab.min() < 0 or lab.max() > 1:
+        problems.append("%s: label values outside [0, 1]" % lb_fpath)
+    overlap = int(np.count_nonzero(np.sum(lab, axis=2) > 1))
+    if overlap:
+        problems.append("%s: %d pixels with more than one class" % (lb_fpath, overlap))
+    # Pixels per class, plus the unlabeled pixels last
+    entry['class_pixels'] = np.count_nonzero(lab[:,:,:num_labels], axis=(0, 1)).tolist() + [int(np.count_nonzero(np.max(lab, axis=2) == 0))]
+    return entry, problems
+
+
+def scan_split(data_mode_dir, workers=16, num_labels=len(CLASS_NAMES), annotation='gtCoarse'):
+    """
+    Check every file of one split
+    :param data_mode_dir: split directory, e.g. DATASET_DIR/train
+    :param workers: number of checking threads, most of the time is spent waiting on storage
+    :param num_labels: minimum number of label channels
+    :param annotation: label folder, gtCoarse or gtFine
+    :return: (manifest, problems), manifest['samples'] only lists the pairs without problems, manifest is None without the split folders
+    """
+    if not _has_folders(data_mode_dir, annotation):
+        return None, ["%s: missing %s or %s folder" % (data_mode_dir, IMAGE_DIR, annotation)]
+    # Taken before listing, files added during the scan make the manifest out of date
+    mtimes = _dir_mtimes(data_mode_dir, annotation)
+    im_fpath, lab_fpath, unmatched = pair_files(data_mode_dir, annotation)
+    problems = ["%s: unmatched" % f for f in unmatched]
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        results = list(pool.map(lambda pair: _check_pair(data_mode_dir, pair[0], pair[1], num_labels), zip(im_fpath, lab_fpath)))
+    finally:
+        pool.shutdown()
+
+    samples = []
+    class_pixels = np.zeros(num_labels + 1, dtype=np.int64)
+    for entry, entry_problems in results:
+        problems += entry_problems
+        if not entry_problems:
+            samples.append(entry)
+            class_pixels += entry['class_pixels']
+    manifest = {'annotation': annotation, 'samples': samples, 'num_problems': len(problems), 'class_pixels': class_pixels.tolist(),
+                'mtimes': mtimes}
+    return manifest, problems
+
+
+def write_manifest(data_mode_dir, manifest):
+    path = os.path.join(data_mode_dir, MANIFEST_NAME)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f)
+    os.rename(path + '.tmp', path)
+
+
+def load_manifest(data_mode_dir, annotation='gtCoarse'):
+    """ (image paths, label paths) of an up to date manifest, None when there is none or the folders changed since """
+    path = os.path.join(data_mode_dir, MANIFEST_NAME)
+    if not os.path.exists(path) or not _has_folders(data_mode_dir, annotation):
+        return None
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get('annotation', 'gtCoarse') != annotation:
+        return None
+    if not isinstance(manifest.get('mtimes'), dict) or not _is_up_to_date(data_mode_dir, manifest['mtimes']):
+        print("Manifest of %s is out of date, run checkDataset.py again" % data_mode_dir)
+        return None
+    return ([os.path.join(data_mode_dir, s['image']) for s in manifest['samples']],
+            [os.path.join(data_mode_dir, s['label']) for s in manifest['samples']])
+
+
+def scan_dataset(data_dir, workers=16, dataset_modes=('train', 'val'), annotation='gtCoarse'):
+    """ Scan and write the manifest of every split, prints all problems, returns the number of problems """
+    total = 0
+    for dataset_mode in dataset_modes:
+        data_mode_dir = data_dir + "/" + dataset_mode
+        manifest, problems = scan_split(data_mode_dir, workers, annotation=annotation)
+        for problem in problems:
+            print(problem)
+        total += len(problems)
+        if manifest is None:
+            continue
+        write_manifest(data_mode_dir, manifest)
+        print("%s sample : %d valid, %d problems" % (dataset_mode, len(manifest['samples']), len(problems)))
+    return total
@@ -0,0 +1,261 @@
+from __future__ import print_function
+from six.moves import BaseHTTPServer, socketserver, queue
+from six.moves.urllib.parse import urlparse, parse_qs
+from PIL import Image
+import tensorflow as tf
+import numpy as np
+import collections
+import threading
+import json
+import time
+import io
+import os
+from fcn.checkpoint import latest_checkpoint, restore_latest
+from fcn.colorize import PALETTE, colorize, blend
+from fcn.export import export_dir, frozen_session_config, load_export
+from fcn.models import inference, model_log_dir, variant_name
+from fcn.precision import checkpoint_dir
+
+"""
+Long-lived inference server. The graph is built and the checkpoint restored once; concurrent
+requests are coalesced into batches of up to --batch images, a batch leaving at the latest
+batch_window_ms after its first request arrived.
+    python sceneSeg.py --mode serve [--port 8000 | --socket /tmp/fcn.sock] [--batch 8] [--set batch_window_ms=10]
+    POST /segment?output=label|overlay|color   body: PNG/JPEG image, response: PNG at the image's size
+    GET  /health                               model and checkpoint, status "random_weights" (HTTP 503) without a checkpoint
+    GET  /metrics                              request, batch and latency counters (JSON)
+"""
+OUTPUTS = ['label', 'overlay', 'color']
+# Requests whose latency /metrics summarizes
+LATENCY_WINDOW = 1000
+
+
+class _Request(object):
+    def __init__(self, image):
+        self.image, self.arrival = image, time.time()
+        self.done = threading.Event()
+        self.result, self.error, self.batch_size = None, None, 0
+
+
+class Batcher(object):
+    """
+    Runs the inference graph on batches of queued images from one thread
+    :param image: float32 input placeholder [None,H,W,3], pred: class-index tensor [None,H,W]
+    :param batch_size: images per sess.run at most
+    :param window: seconds a batch waits for more requests after its first one
+    """
+
+    def __init__(self, sess, image, pred, batch_size=8, window=0.01):
+        self.sess, self.image, self.pred = sess, image, pred
+        self.batch_size, self.window = batch_size, window
+        self.requests = queue.Queue()
+        self.lock = threading.Lock()
+        self.latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self.counters = collections.OrderedDict([('requests', 0), ('errors', 0), ('batches', 0), ('images_in_batches', 0)])
+        self.started = time.time()
+        self.thread = threading.Thread(target=self._loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def __call__(self, image):
+        """ Class-index map [H,W] (uint8) of a float32 [H,W,3] image, blocks until its batch ran """
+        request = _Request(image)
+        self.requests.put(request)
+        request.done.wait()
+        with self.lock:
+            self.counters['requests'] += 1
+            self.counters['errors'] += request.error is not None
+            self.latencies.append(time.time() - request.arrival)
+        if request.error is not None:
+            raise request.error
+        return request.result, request.batch_size
+
+    def _collect(self):
+        batch = [self.requests.get()]
+        if batch[0] is None:
+            return None
+        deadline = batch[0].arrival + self.window
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.time()
+            try:
+                request = self.requests.get(timeout=remaining) if remaining > 0 else self.requests.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                self.requests.put(None)
+                break
+            batch.append(request)
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            try:
+                preds = self.sess.run(self.pred, feed_dict={self.image: np.stack([r.image for r in batch])})
+                for request, pred in zip(batch, preds):
+                    request.result = pred
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+            with self.lock:
+                self.counters['batches'] += 1
+                self.counters['images_in_batches'] += len(batch)
+            for request in batch:
+                request.batch_size = len(batch)
+                request.done.set()
+
+    def close(self):
+        self.requests.put(None)
+        self.thread.join()
+
+    def metrics(self):
+        with self.lock:
+            metrics = collections.OrderedDict(self.counters)
+            latencies = list(self.latencies)
+        metrics['uptime_secs'] = time.time() - self.started
+        metrics['queued'] = self.requests.qsize()
+        metrics['mean_batch_size'] = metrics['images_in_batches'] / float(max(metrics['batches'], 1))
+        for p in [50, 90, 99]:
+            metrics['latency_p%d_ms' % p] = 1000 * np.percentile(latencies, p) if latencies else None
+        return metrics
+
+
+def _handler(batcher, image_size, health, palette=PALETTE, compress_level=1):
+    """ Request handler class bound to a Batcher """
+
+    class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def address_string(self):
+            # Unix socket clients have no address
+            return self.client_address[0] if self.client_address else 'unix'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, code, body, content_type='application/json', headers=()):
+            self.send_response(code)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for key, value in headers:
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_json(self, code, value):
+            self._send(code, json.dumps(value).encode('utf-8'))
+
+        def do_GET(self):
+            path = urlparse(self.path).path
+            if path == '/health':
+                self._send_json(200 if health.get('status') == 'ok' else 503, health)
+            elif path == '/metrics':
+                self._send_json(200, batcher.metrics())
+            else:
+                self._send_json(404, {'error': 'unknown path ' + path})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path != '/segment':
+                self._send_json(404, {'error': 'unknown path ' + url.path})
+                return
+            output = parse_qs(url.query).get('output', ['label'])[0]
+            if output not in OUTPUTS:
+                self._send_json(400, {'error': 'output should be one of ' + ', '.join(OUTPUTS)})
+                return
+            try:
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                original = Image.open(io.BytesIO(body)).convert('RGB')
+            except Exception as e:
+                self._send_json(400, {'error': 'cannot decode the image: %s' % e})
+                return
+            resized = np.asarray(original.resize((image_size[1], image_size[0]), Image.BILINEAR), dtype=np.float32)
+            try:
+                pred, batch_size = batcher(resized)
+            except Exception as e:
+                self._send_json(500, {'error': str(e)})
+                return
+            # Back to the size of the request's image
+            pred = np.asarray(Image.fromarray(pred).resize(original.size, Image.NEAREST))
+            if output == 'label':
+                result = pred
+            elif output == 'color':
+                result = colorize(pred, palette)
+            else:
+                result = blend(np.asarray(original), colorize(pred, palette))
+            png = io.BytesIO()
+            Image.fromarray(result).save(png, format='PNG', compress_level=compress_level)
+            self._send(200, png.getvalue(), 'image/png', [('X-Batch-Size', str(batch_size))])
+    return Handler
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(batcher, config, host='127.0.0.1', port=8000, socket_path=None, health=None, palette=PALETTE):
+    """ HTTP server on host:port, or on the Unix socket socket_path when given """
+    handler = _handler(batcher, config.image_size, health or {'status': 'ok'}, palette, config.png_compress_level)
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        return ThreadingUnixHTTPServer(socket_path, handler)
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def build(sess, config):
+    """
+    Inference graph of the configured model with the latest checkpoint restored, or the export of
+    config.runtime 'frozen' or 'inference', returns (image, pred, checkpoint or export path)
+    Without a checkpoint the weights stay random, only allowed with config.serve_random_weights (the path is then None)
+    """
+    if config.runtime == 'tflite':
+        raise ValueError("The serve mode batches requests through a TensorFlow graph, runtime 'tflite' is only supported by the "
+                         "visualize mode; use --set runtime=tf, frozen or inference")
+    if config.runtime in ['frozen', 'inference']:
+        out_dir = export_dir(config, config.runtime)
+        image, pred, logits = load_export(sess, out_dir, config.runtime)
+        return image, pred, out_dir
+    image = tf.placeholder(tf.float32, shape=[None] + list(config.image_size) + [3])
+    pred_label, logits, regularization_loss = inference(image, 1.0, config.model, config.skip, config.num_classes,
+                                                        config.precision, config.weights_dtype, config.head)
+    pred = tf.cast(tf.squeeze(pred_label, axis=3), tf.uint8)
+    sess.run(tf.global_variables_initializer())
+    LOG_DIR = checkpoint_dir(model_log_dir(config), config.weights_dtype)
+    if not restore_latest(sess, tf.train.Saver(), LOG_DIR):
+        if not config.serve_random_weights:
+            raise ValueError("No checkpoint found in %s, train the model first (--set serve_random_weights=true serves random weights)" % LOG_DIR)
+        print("No checkpoint found in %s, serving random weights" % LOG_DIR)
+    return image, pred, latest_checkpoint(LOG_DIR)
+
+
+def main(config, host='127.0.0.1', port=8000, socket_path=None, palette=PALETTE):
+    """
+    Serve the configured model until interrupted
+    :param config: fcn.config.Config, batches of config.inference_batch_size images at most,
+                   waiting config.batch_window_ms for more requests
+    """
+    with tf.Session(config=frozen_session_config() if config.runtime == 'frozen' else None) as sess:
+        try:
+            image, pred, checkpoint = build(sess, config)
+        except ValueError as e:
+            raise SystemExit(str(e))
+        batcher = Batcher(sess, image, pred, config.inference_batch_size, config.batch_window_ms / 1000.0)
+        health = {'status': 'ok' if checkpoint else 'random_weights', 'model': variant_name(config.model, config.skip, config.head), 'checkpoint': checkpoint,
+                  'image_size': list(config.image_size), 'num_classes': config.num_classes}
+        server = make_server(batcher, config, host, port, socket_path, health, palette)
+        print("Serving on %s (batch %d, window %g ms)" % (socket_path or 'http://%s:%d' % (host, port),
+                                                          config.inference_batch_size, config.batch_window_ms))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            batcher.close()
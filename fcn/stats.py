@@ -0,0 +1,127 @@
+from __future__ import print_function
+from multiprocessing import Pool
+import numpy as np
+import hashlib
+import json
+import os
+from fcn.labelstore import NO_CLASS, label_key, _mat_to_index
+
+"""
+Class frequency statistics of a split, computed in one parallel pass over the labels and
+cached in <split>/class_stats_<fingerprint>.json, where the fingerprint covers the label
+file names, sizes and modification times. They drive the class-weighted losses
+(--set class_weighting=inverse|median) and the repeat factor sampler (--set sampler=repeat).
+"""
+STATS_PREFIX = 'class_stats_'
+# classes are stored label indices, NO_CLASS (unlabeled) included
+NUM_BINS = 256
+
+
+def fingerprint(lab_fpath):
+    """ Hash of the label file names, sizes and modification times """
+    digest = hashlib.sha1()
+    for p in sorted(lab_fpath):
+        st = os.stat(p)
+        digest.update(('%s %d %d\n' % (os.path.basename(p), st.st_size, int(st.st_mtime))).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def _label_histogram(lb_fpath):
+    return np.bincount(_mat_to_index(lb_fpath).ravel(), minlength=NUM_BINS)
+
+
+def compute_stats(lab_fpath, label_store=None, workers=4):
+    """
+    Pixel and image counts of every stored class index
+    :param label_store: LabelStore read instead of the .mat files when given
+    :param workers: number of processes decoding .mat files
+    :return: dict with 'pixels' and 'images' (per class), 'num_images' and 'image_classes' (frame id -> classes present)
+    """
+    if label_store is not None:
+        stored = label_store.labels
+        histograms = (np.bincount(stored[label_store.keys[label_key(p)]].ravel(), minlength=NUM_BINS) for p in lab_fpath)
+        return _reduce(lab_fpath, histograms)
+    pool = Pool(workers)
+    try:
+        return _reduce(lab_fpath, pool.imap(_label_histogram, lab_fpath, chunksize=16))
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _reduce(lab_fpath, histograms):
+    pixels = np.zeros(NUM_BINS, dtype=np.int64)
+    images = np.zeros(NUM_BINS, dtype=np.int64)
+    image_classes = {}
+    for p, histogram in zip(lab_fpath, histograms):
+        pixels += histogram
+        images += histogram > 0
+        image_classes[label_key(p)] = [int(c) for c in np.nonzero(histogram)[0] if c != NO_CLASS]
+    return {'pixels': pixels.tolist(), 'images': images.tolist(), 'num_images': len(lab_fpath), 'image_classes': image_classes}
+
+
+def load_stats(data_mode_dir, lab_fpath, label_store=None, workers=4):
+    """ Cached statistics of the labels, computed and cached when the labels changed """
+    path = os.path.join(data_mode_dir, STATS_PREFIX + fingerprint(lab_fpath) + '.json')
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    print("Computing class statistics of %d labels in %s" % (len(lab_fpath), data_mode_dir))
+    stats = compute_stats(lab_fpath, label_store, workers)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(stats, f)
+    os.rename(path + '.tmp', path)
+    return stats
+
+
+def class_frequencies(stats, train_classes):
+    """ (pixel counts, image counts) of the training classes plus "other" last """
+    pixels = np.array(stats['pixels'], dtype=np.float64)
+    images = np.array(stats['images'], dtype=np.float64)
+    others = np.ones(NUM_BINS, dtype=bool)
+    others[np.array(train_classes)] = False
+    return (np.append(pixels[np.array(train_classes)], pixels[others].sum()),
+            np.append(images[np.array(train_classes)], stats['num_images']))
+
+
+def class_weights(stats, train_classes, method='median', max_weight=10.0):
+    """
+    Loss weight of the training classes plus "other" last, classes without pixels get 0
+    :param method: 'inverse' (1 / pixel frequency, normalized to a mean of 1) or 'median'
+                   (median frequency balancing, frequency counted over the images containing the class)
+    :param max_weight: upper bound, keeps a handful of pixels from dominating the loss
+    """
+    pixels, images = class_frequencies(stats, train_classes)
+    present = pixels > 0
+    weights = np.zeros(len(pixels))
+    if method == 'inverse':
+        weights[present] = pixels.sum() / pixels[present]
+        weights[present] /= weights[present].mean()
+    elif method == 'median':
+        # Pixel share of the class in the images where it appears, images of 256x512 or any other size
+        pixels_per_image = float(np.sum(stats['pixels'])) / max(stats['num_images'], 1)
+        frequency = pixels[present] / (images[present] * pixels_per_image)
+        weights[present] = np.median(frequency) / frequency
+    else:
+        raise ValueError("Unknown class weighting '%s', expected inverse or median" % method)
+    return np.minimum(weights, max_weight).astype(np.float32)
+
+
+def repeat_factors(stats, lab_fpath, train_classes, threshold=0.1):
+    """
+    Repeat factor of each image for class-aware sampling: an image is drawn
+    max(1, sqrt(threshold / f)) times per epoch on average, f being the fraction of images
+    containing its rarest training class
+    """
+    images = np.array(stats['images'], dtype=np.float64)
+    factor = np.ones(NUM_BINS)
+    fraction = images / max(stats['num_images'], 1)
+    seen = fraction > 0
+    factor[seen] = np.maximum(1.0, np.sqrt(threshold / fraction[seen]))
+    keep = np.zeros(NUM_BINS, dtype=bool)
+    keep[np.array(train_classes)] = True
+    factors = []
+    for p in lab_fpath:
+        classes = [c for c in stats['image_classes'].get(label_key(p), []) if keep[c]]
+        factors.append(max([factor[c] for c in classes] + [1.0]))
+    return np.array(factors, dtype=np.float32)
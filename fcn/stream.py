@@ -0,0 +1,250 @@
+from __future__ import print_function
+from six.moves import queue
+from PIL import Image
+import tensorflow as tf
+import numpy as np
+import threading
+import time
+import os
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+from fcn.checkpoint import restore_latest
+from fcn.colorize import PALETTE, colorize, blend
+from fcn.models import inference, model_log_dir
+from fcn.precision import checkpoint_dir
+from fcn.writers import OverlayWriter
+
+"""
+Streaming segmentation of a video file or an ordered folder of frames. A reader thread decodes
+and resizes frames into a bounded queue, the main thread segments them in batches of whatever
+is queued (up to the batch size) and a writer thread encodes an annotated video or saves
+per-frame results from a second bounded queue. A slow disk or encoder fills the queues and
+blocks the stages before it, so memory stays bounded. Reports the sustained FPS and the
+read-to-written latency percentiles of the frames. Video input and output need OpenCV (cv2).
+    python sceneSeg.py --mode stream --video dashcam.mp4 [--output dashcam_seg.mp4]
+    python sceneSeg.py --mode stream --imagedir FRAME_DIR [--output MASK_DIR]
+"""
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv')
+FRAME_EXTENSIONS = ('.jpg', '.png')
+LATENCY_PERCENTILES = [50, 90, 99]
+# End of stream marker passed through the queues
+_END = None
+
+
+def _require_cv2(path):
+    if cv2 is None:
+        raise ImportError("OpenCV (cv2) is required to read and write videos such as " + path + ", use a frame folder instead")
+
+
+def video_frames(path):
+    """ (name, RGB uint8 frame) of a video file, plus its frame rate """
+    _require_cv2(path)
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise IOError("Cannot open video " + path)
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+
+    def frames():
+        index = 0
+        try:
+            while True:
+                ok, frame = capture.read()
+                if not ok:
+                    return
+                yield 'frame_%06d' % index, frame[:, :, ::-1]
+                index += 1
+        finally:
+            capture.release()
+    return frames(), fps
+
+
+def directory_frames(frame_dir):
+    """ (name, RGB uint8 frame) of the images of a folder in file name order """
+    names = sorted(f for f in os.listdir(frame_dir) if os.path.splitext(f)[-1].lower() in FRAME_EXTENSIONS)
+    for fname in names:
+        with Image.open(os.path.join(frame_dir, fname)) as im:
+            yield os.path.splitext(fname)[0], np.asarray(im.convert('RGB'))
+
+
+class VideoSink(object):
+    """ Writes the overlays as a video, sized by the first frame """
+
+    def __init__(self, path, fps, palette=PALETTE, alpha=0.5):
+        _require_cv2(path)
+        self.path, self.fps, self.palette, self.alpha = path, fps, palette, alpha
+        self.video = None
+
+    def __call__(self, name, image, pred):
+        if self.video is None:
+            fourcc = cv2.VideoWriter_fourcc(*('XVID' if self.path.endswith('.avi') else 'mp4v'))
+            self.video = cv2.VideoWriter(self.path, fourcc, self.fps, (image.shape[1], image.shape[0]))
+        self.video.write(blend(image, colorize(pred, self.palette), self.alpha)[:, :, ::-1])
+
+    def close(self):
+        if self.video is not None:
+            self.video.release()
+        print("Saved video : " + self.path)
+
+
+class FrameSink(object):
+    """ Saves the results of every frame with an OverlayWriter, as <out_dir>/<frame name>_seg.png etc. """
+
+    def __init__(self, out_dir, writer):
+        if not os.path.exists(out_dir):
+            os.makedirs(out_dir)
+        self.out_dir, self.writer = out_dir, writer
+
+    def __call__(self, name, image, pred):
+        self.writer(image, pred, os.path.join(self.out_dir, name))
+
+    def close(self):
+        pass
+
+
+class _Stage(threading.Thread):
+    """ Daemon thread keeping the exception that stopped it, setting stop to release the other stages """
+
+    def __init__(self, target, stop):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.target, self.stop, self.error = target, stop, None
+
+    def run(self):
+        try:
+            self.target()
+        except Exception as e:
+            self.error = e
+            self.stop.set()
+
+
+def _put(q, item, stop):
+    """ Blocking put that gives up once stop is set, so no stage hangs after another failed """
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _get(q, stop):
+    """ Blocking get that returns _END once stop is set and q is empty, so no stage waits on a stage that failed """
+    while True:
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            if stop.is_set():
+                return _END
+
+
+def stream(sess, frames, sink, image, pred, batch_size, image_size, queue_size=16):
+    """
+    Segment a frame iterator and pass the results to sink
+    :param frames: iterator of (name, RGB uint8 frame)
+    :param sink: callable(name, image, pred) with a close() method, e.g. VideoSink or FrameSink
+    :param image: float32 input placeholder [None,H,W,3], pred: class-index tensor [None,H,W]
+    :param queue_size: frames buffered between the stages, in each direction
+    :return: (number of frames, seconds, per-frame latencies in seconds)
+    """
+    inputs, outputs = queue.Queue(maxsize=queue_size), queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    latencies = []
+
+    def read():
+        try:
+            frame_iter = iter(frames)
+            while True:
+                # Latency from the start of the decode
+                start = time.time()
+                try:
+                    name, frame = next(frame_iter)
+                except StopIteration:
+                    return
+                if frame.shape[:2] != tuple(image_size):
+                    frame = np.asarray(Image.fromarray(frame).resize((image_size[1], image_size[0]), Image.BILINEAR))
+                if not _put(inputs, (name, frame, start), stop):
+                    return
+        finally:
+            _put(inputs, _END, stop)
+
+    def write():
+        try:
+            while True:
+                item = _get(outputs, stop)
+                if item is _END:
+                    return
+                name, frame, result, start = item
+                sink(name, frame, result)
+                latencies.append(time.time() - start)
+        finally:
+            sink.close()
+
+    reader, writer = _Stage(read, stop), _Stage(write, stop)
+    reader.start()
+    writer.start()
+    start = time.time()
+    try:
+        done = False
+        while not done:
+            # Block for one frame, then batch whatever else is already decoded
+            batch = [_get(inputs, stop)]
+            while batch[-1] is not _END and len(batch) < batch_size:
+                try:
+                    batch.append(inputs.get_nowait())
+                except queue.Empty:
+                    break
+            if batch[-1] is _END:
+                batch.pop()
+                done = True
+            if batch:
+                results = sess.run(pred, feed_dict={image: np.stack([frame for name, frame, t in batch]).astype(np.float32)})
+                for (name, frame, t), result in zip(batch, results):
+                    if not _put(outputs, (name, frame, result, t), stop):
+                        break
+            if writer.error is not None:
+                break
+        _put(outputs, _END, stop)
+        writer.join()
+    finally:
+        stop.set()
+    elapsed = time.time() - start
+    for stage in (reader, writer):
+        if stage.error is not None:
+            raise stage.error
+    return len(latencies), elapsed, latencies
+
+
+def main(video_path, frame_dir, output, config, writer=None):
+    """
+    Segment a video or a frame folder
+    :param output: video file (VIDEO_EXTENSIONS) for an annotated video, otherwise a folder for
+                   per-frame results saved by writer; defaults to <video>_seg.mp4 or FRAME_DIR/Results_stream/
+    :param config: fcn.config.Config, config.inference_batch_size frames per batch at most, config.stream_queue frames buffered
+    """
+    if video_path is not None:
+        frames, fps = video_frames(video_path)
+        output = output or os.path.splitext(video_path)[0] + '_seg.mp4'
+    else:
+        frames, fps = directory_frames(frame_dir), 30.0
+        output = output or os.path.join(frame_dir, 'Results_stream')
+    if os.path.splitext(output)[-1].lower() in VIDEO_EXTENSIONS:
+        sink = VideoSink(output, fps, writer.palette if writer else PALETTE)
+    else:
+        sink = FrameSink(output, writer or OverlayWriter())
+
+    image = tf.placeholder(tf.float32, shape=[None] + list(config.image_size) + [3])
+    pred_label, logits, regularization_loss = inference(image, 1.0, config.model, config.skip, config.num_classes,
+                                                        config.precision, config.weights_dtype, config.head)
+    pred = tf.cast(tf.squeeze(pred_label, axis=3), tf.uint8)
+    with tf.Session() as sess:
+        sess.run(tf.global_variables_initializer())
+        restore_latest(sess, tf.train.Saver(), checkpoint_dir(model_log_dir(config), config.weights_dtype))
+        num_frames, elapsed, latencies = stream(sess, frames, sink, image, pred, config.inference_batch_size,
+                                                config.image_size, config.stream_queue)
+    if num_frames:
+        print("%d frames in %.1f s: %.1f FPS sustained, latency %s" % (
+            num_frames, elapsed, num_frames / elapsed,
+            ', '.join('p%d %.0f ms' % (p, 1000 * np.percentile(latencies, p)) for p in LATENCY_PERCENTILES)))
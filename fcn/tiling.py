@@ -0,0 +1,76 @@
+from __future__ import print_function
+import numpy as np
+
+"""
+Tiled inference at the native image resolution (e.g. 1024x2048 Cityscapes frames) instead of
+resizing to IMSIZE_X x IMSIZE_Y. The image is covered by overlapping tiles, run through the
+inference graph a batch at a time, and the logits are blended with weights ramping down over
+the overlap. Only one row of tiles is accumulated at a time, so memory is bounded by the tile
+size and the image width, not the image area.
+    python sceneSeg.py --mode visualize --imagedir DIR --set tile_size=[512,1024] --set tile_overlap=128
+"""
+# Pooling and the x8/x2 transposed convolutions need tiles divisible by the total stride
+TILE_MULTIPLE = 32
+
+
+def tile_offsets(length, tile, overlap):
+    """ Start offsets of tiles of size tile covering [0, length), the last one flush with the end """
+    if length <= tile:
+        return [0]
+    return list(range(0, length - tile, tile - overlap)) + [length - tile]
+
+
+def blend_weights(tile_size, overlap):
+    """ [h,w] weights of one tile, 1 in the middle and ramping linearly towards 0 over the overlap """
+    def ramp(n):
+        r = np.ones(n, dtype=np.float32)
+        m = min(overlap, n // 2)
+        if m > 0:
+            edge = (np.arange(m, dtype=np.float32) + 0.5) / m
+            r[:m] = edge
+            r[-m:] = edge[::-1]
+        return r
+    return np.outer(ramp(tile_size[0]), ramp(tile_size[1]))
+
+
+class TiledSegmenter(object):
+    """
+    Segments [H,W,3] images of any size with an inference graph built for tiles
+    :param image: float32 input placeholder [None,tile_h,tile_w,3] (or with unknown sizes)
+    :param logits: logits tensor of the inference graph on image
+    :param tile_size: (height, width), multiples of TILE_MULTIPLE
+    :param overlap: pixels shared by neighbouring tiles, less than the tile size
+    :param batch_size: tiles per sess.run
+    """
+
+    def __init__(self, sess, image, logits, tile_size, overlap=128, batch_size=4):
+        if any(t % TILE_MULTIPLE for t in tile_size) or not 0 <= overlap < min(tile_size):
+            raise ValueError("Tiles must be multiples of %d larger than the overlap, got %s with overlap %d" % (TILE_MULTIPLE, list(tile_size), overlap))
+        self.sess, self.image, self.logits = sess, image, logits
+        self.tile_size, self.overlap, self.batch_size = tuple(tile_size), overlap, batch_size
+        self.weights = blend_weights(self.tile_size, overlap)[:, :, np.newaxis]
+
+    def __call__(self, image):
+        """ Class-index map [H,W] (uint8) of a float32 [H,W,3] image """
+        height, width = image.shape[:2]
+        th, tw = self.tile_size
+        if height < th or width < tw:
+            image = np.pad(image, ((0, max(0, th - height)), (0, max(0, tw - width)), (0, 0)), mode='edge')
+        rows, cols = tile_offsets(image.shape[0], th, self.overlap), tile_offsets(image.shape[1], tw, self.overlap)
+        pred = np.empty(image.shape[:2], dtype=np.uint8)
+        # Weighted logits of image rows [y, y+th); the weights sum need not be divided out before the argmax
+        band = None
+        for r, y in enumerate(rows):
+            for i in range(0, len(cols), self.batch_size):
+                xs = cols[i:i+self.batch_size]
+                logits = self.sess.run(self.logits, feed_dict={self.image: np.stack([image[y:y+th, x:x+tw] for x in xs])})
+                if band is None:
+                    band = np.zeros((th, image.shape[1], logits.shape[3]), dtype=np.float32)
+                for x, tile_logits in zip(xs, logits):
+                    band[:, x:x+tw] += tile_logits * self.weights
+            # Rows above the next row of tiles are final
+            done = (rows[r+1] if r + 1 < len(rows) else image.shape[0]) - y
+            pred[y:y+done] = np.argmax(band[:done], axis=2)
+            band[:th-done] = band[done:]
+            band[th-done:] = 0
+        return pred[:height, :width]
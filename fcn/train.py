@@ -0,0 +1,233 @@
+from __future__ import print_function
+from six.moves import xrange
+import tensorflow as tf
+import datetime
+import os
+from fcn.config import LEARNING_RATE, REGULARIZATION_SCALE, NUM_OF_CLASSES, PIPELINE_CONFIGS, save_config
+from fcn.data import setup_dataset, setup_dataset_dir, dataset_cache
+from fcn.labelstore import open_label_store
+from fcn.models import inference, model_log_dir
+from fcn.checkpoint import CheckpointManager, restore_latest
+from fcn.metrics import ConfusionMatrix, confusion_matrix_op
+from fcn.warmstart import warm_start
+from fcn.stats import load_stats, class_weights, repeat_factors
+from fcn.precision import scaled_gradients
+from fcn.profiler import Profiler
+
+
+def train(loss_val, var_list, g_step, learning_rate=LEARNING_RATE, loss_scale=None):
+    """ Adam step, with loss_scale ('dynamic' or a number) steps with non-finite gradients are skipped """
+    optimizer = tf.train.AdamOptimizer(learning_rate)
+    if loss_scale is None:
+        grads = optimizer.compute_gradients(loss_val, var_list=var_list)
+        return optimizer.apply_gradients(grads, global_step=g_step)
+    grads, finite, update_scale = scaled_gradients(optimizer, loss_val, var_list, loss_scale)
+    # Unused update outside the cond: Adam creates its accumulators here, under the names of an unscaled run
+    optimizer.apply_gradients(grads)
+    apply_op = tf.cond(finite, lambda: optimizer.apply_gradients(grads, global_step=g_step), tf.no_op)
+    return tf.group(apply_op, update_scale)
+
+
+def entropy_loss(logits, ann, sparse=False, num_classes=NUM_OF_CLASSES, class_weights=None):
+    """
+    Cross-entropy of a batch: softmax over the classes of sparse [B,H,W] labels, "other" pixels ignored,
+    or sigmoid per channel of dense one-hot [B,H,W,num_classes+1] labels. With class weights the loss is
+    the weighted mean (divided by the total weight), so the weights only shift the balance between classes
+    """
+    if sparse:
+        # "other" pixels (label num_classes) are ignored
+        weights = tf.cast(tf.not_equal(ann, num_classes), tf.float32)
+        if class_weights is not None:
+            weights = weights * tf.gather(tf.constant(class_weights, tf.float32), tf.cast(ann, tf.int32))
+        entropy = tf.losses.sparse_softmax_cross_entropy(labels=tf.cast(ann, tf.int32), logits=logits, weights=weights,
+                                                         reduction=tf.losses.Reduction.SUM)
+        return entropy / tf.maximum(tf.reduce_sum(weights), 1e-6)
+    if class_weights is not None:
+        # Every channel of a pixel is weighed by the weight of the pixel's class
+        pixel_weights = tf.reduce_sum(ann * tf.constant(class_weights, tf.float32), axis=3, keepdims=True)
+        entropy = pixel_weights * tf.nn.sigmoid_cross_entropy_with_logits(logits=logits,labels=ann,name="entropy")
+        return tf.reduce_sum(entropy) / tf.maximum(tf.reduce_sum(pixel_weights) * tf.cast(tf.shape(ann)[3], tf.float32), 1e-6)
+    return tf.reduce_mean(tf.nn.sigmoid_cross_entropy_with_logits(logits=logits,labels=ann,name="entropy"))
+
+
+def tower(img, ann, keep_probability, backbone='vgg', skip=True, sparse=False, num_classes=NUM_OF_CLASSES,
+          regularization_scale=REGULARIZATION_SCALE, class_weights=None, precision='float32', head='fc', summaries=True):
+    """ Inference graph, loss and pixel accuracy of one batch, returns (loss, pixel_acc, confusion) """
+    pred_label, logits, regularization_loss = inference(img, keep_probability, backbone, skip, num_classes, precision, head=head)
+
+    if sparse:
+        gt_label = tf.expand_dims(tf.cast(ann, tf.int64), axis=3)
+    else:
+        gt_label = tf.expand_dims(tf.argmax(ann, axis=3), axis=3)
+    if summaries:
+        tf.summary.image("input_image", img, max_outputs=2)
+        tf.summary.image("ground_truth", tf.cast(gt_label*255/num_classes, tf.uint8), max_outputs=2)
+        tf.summary.image("pred_label", tf.cast(pred_label*255/num_classes, tf.uint8), max_outputs=2)
+
+    loss = tf.add(entropy_loss(logits, ann, sparse, num_classes, class_weights), regularization_scale*regularization_loss)
+
+    # Compute accuracy
+    mask = tf.cast(tf.not_equal(gt_label,num_classes), tf.float32)
+    pixel_acc = tf.div(tf.reduce_sum(tf.multiply(tf.cast(tf.equal(gt_label, pred_label), tf.float32), mask)), tf.cast(tf.reduce_sum(mask), tf.float32))
+    if summaries:
+        tf.summary.scalar("entropy_loss", loss)
+        tf.summary.scalar("pixel_accuracy", pixel_acc)
+    confusion = confusion_matrix_op(gt_label, pred_label, num_classes)
+    return loss, pixel_acc, confusion
+
+
+def build_model(img, ann, keep_probability, backbone='vgg', skip=True, sparse=False, num_classes=NUM_OF_CLASSES,
+                learning_rate=LEARNING_RATE, regularization_scale=REGULARIZATION_SCALE, class_weights=None,
+                precision='float32', loss_scale='dynamic', head='fc', replicas=()):
+    """
+    Inference graph, loss, pixel accuracy and Adam train_op
+    :return: (loss, pixel_acc, train_op, global_step, confusion), confusion being the batch's confusion matrix (see fcn.metrics)
+    :param class_weights: loss weight of each class plus "other" last (see fcn.stats.class_weights), None weighs all pixels equally
+    :param precision: compute dtype, float16 scales the loss by loss_scale ('dynamic' or a number)
+    :param replicas: (img, ann) batches of the other data-parallel workers, each gets a tower sharing the variables and
+                     train_op averages the gradients of all towers; loss, pixel_acc and confusion are those of img
+    """
+    loss, pixel_acc, confusion = tower(img, ann, keep_probability, backbone, skip, sparse, num_classes, regularization_scale,
+                                       class_weights, precision, head)
+    losses = [loss]
+    for i, (replica_img, replica_ann) in enumerate(replicas):
+        with tf.name_scope('worker_%d' % (i + 1)), tf.variable_scope(tf.get_variable_scope(), reuse=True):
+            losses.append(tower(replica_img, replica_ann, keep_probability, backbone, skip, sparse, num_classes, regularization_scale,
+                                class_weights, precision, head, summaries=False)[0])
+
+    trainable_var = tf.trainable_variables()
+    global_step = tf.Variable(0, name='global_step', trainable=False)
+    # Synchronous data parallelism: the gradient of the mean loss is the mean of the towers' gradients
+    total_loss = tf.add_n(losses) / len(losses) if replicas else loss
+    train_op = train(total_loss, trainable_var, global_step, learning_rate, loss_scale if precision == 'float16' else None)
+
+    return loss, pixel_acc, train_op, global_step, confusion
+
+
+def main(data_dir, config):
+    """
+    Train the model selected by config.model/config.skip, resuming from the latest checkpoint
+    :param config: fcn.config.Config
+    """
+    LOG_DIR = model_log_dir(config)
+    if config.weights_dtype != 'float32':
+        raise ValueError("Training needs float32 weights, use --set precision=%s for reduced precision compute" % config.weights_dtype)
+    keep_probability = tf.placeholder(tf.float32, name="keep_probabilty")
+    print("Setting up dataset reader (%s pipeline, %s labels)" % (config.pipeline, config.labels))
+    pipeline_config = PIPELINE_CONFIGS[config.pipeline]
+    sparse = (config.labels == 'sparse')
+    dataset_config = dict(sparse=sparse, batch_size=config.batch_size, train_classes=config.train_classes, image_size=config.image_size)
+    # training set
+    train_im_fn, train_lab_fn = setup_dataset_dir(data_dir, "train", config.annotation)
+    train_label_store = open_label_store(data_dir, "train", config.train_classes, config.annotation, train_lab_fn)
+    weights, factors = None, None
+    if config.class_weighting or config.sampler:
+        stats = load_stats(data_dir+"/train", train_lab_fn, train_label_store)
+        if config.class_weighting:
+            weights = class_weights(stats, config.train_classes, config.class_weighting)
+            print("Class weights (%s): %s" % (config.class_weighting, ' '.join('%.2f' % w for w in weights)))
+        if config.sampler == 'repeat':
+            factors = repeat_factors(stats, train_lab_fn, config.train_classes, config.sampler_threshold)
+            print("Repeat factor sampling: %.1f samples per epoch instead of %d" % (factors.sum(), len(factors)))
+    if config.workers < 1:
+        raise ValueError("workers should be at least 1, got %d" % config.workers)
+    if len(train_im_fn) < config.workers:
+        raise ValueError("%d workers need at least as many training images, found %d" % (config.workers, len(train_im_fn)))
+    # One shard of the training set per data-parallel worker, each with its own cache
+    training_datasets = [setup_dataset(train_im_fn, train_lab_fn, train_label_store, repeat_factors=factors,
+                                       cache=dataset_cache(config.cache, "train" if config.workers == 1 else "train_%d_of_%d" % (i, config.workers)),
+                                       shard=(config.workers, i) if config.workers > 1 else None, **dict(dataset_config, **pipeline_config))
+                         for i in xrange(config.workers)]
+    training_dataset = training_datasets[0]
+    # validationset
+    val_im_fn, val_lab_fn = setup_dataset_dir(data_dir, "val", config.annotation)
+    validation_dataset = setup_dataset(val_im_fn, val_lab_fn, open_label_store(data_dir, "val", config.train_classes, config.annotation, val_lab_fn),
+                                       num_parallel_calls=pipeline_config['num_parallel_calls'],
+                                       prefetch_buffer=pipeline_config['prefetch_buffer'],
+                                       cache=dataset_cache(config.cache, "val"), **dataset_config)
+
+    if config.max_iteration is None:
+        config.max_iteration = int(config.num_of_epoch*len(train_im_fn)/(config.batch_size*config.workers))
+    print("\n============ Max iteration : %d / Number of epoch: %d / Training samples: %d ============\n" % (config.max_iteration, config.num_of_epoch, len(train_im_fn)))
+    if config.workers > 1:
+        print("%d data-parallel workers of %d images per step" % (config.workers, config.batch_size))
+    if not os.path.exists(LOG_DIR):
+        os.makedirs(LOG_DIR)
+    save_config(config, LOG_DIR+'config.json')
+
+    train_itr = training_dataset.make_one_shot_iterator()
+    train_itr_handle = train_itr.string_handle()
+    val_itr = validation_dataset.make_initializable_iterator()
+    val_itr_handle = val_itr.string_handle()
+
+    handle = tf.placeholder(tf.string, shape=[])
+    iterator = tf.data.Iterator.from_string_handle(handle, training_dataset.output_types, training_dataset.output_shapes)
+    img, ann = iterator.get_next()
+    # Worker 0 reads through the handle, so validation runs on its tower alone
+    replicas = [dataset.make_one_shot_iterator().get_next() for dataset in training_datasets[1:]]
+
+    loss, pixel_acc, train_op, global_step, confusion = build_model(img, ann, keep_probability, config.model, config.skip, sparse, config.num_classes,
+                                                                    config.learning_rate, config.regularization_scale, weights,
+                                                                    config.precision, config.loss_scale, config.head, replicas)
+
+    print("Setting up summary op...")
+    summary_op = tf.summary.merge_all()
+
+    sess = tf.Session()
+    print("Setting up Saver...")
+    saver = tf.train.Saver()
+    writer_valid = tf.summary.FileWriter(LOG_DIR+'valid', sess.graph)
+    writer_train = tf.summary.FileWriter(LOG_DIR+'train', sess.graph)
+    checkpoints = CheckpointManager(LOG_DIR, config.checkpoint_steps, config.checkpoint_secs, config.keep_checkpoints,
+                                    config.keep_best_checkpoints, config.checkpoint_format, config.checkpoint_shards,
+                                    config.checkpoint_compress, writer_train, async_write=config.checkpoint_async)
+    profiler = Profiler(LOG_DIR, config.profile_steps, 'train', writer_train)
+
+    def validation_miou():
+        # Ranks the checkpoints kept by keep_best_checkpoints
+        matrix = ConfusionMatrix(config.num_classes)
+        for _ in xrange(config.checkpoint_eval_batches):
+            matrix.add(sess.run(confusion, feed_dict={keep_probability: 1.0, handle: val_handle}))
+        print("Validation_mIoU:%g over %d batches" % (matrix.mean_iou(), config.checkpoint_eval_batches))
+        return float(matrix.mean_iou())
+
+    def save_checkpoint(global_step_value):
+        checkpoints.save(sess, global_step_value, validation_miou() if config.keep_best_checkpoints else None)
+
+    sess.run([tf.global_variables_initializer(), tf.local_variables_initializer()])
+    if not restore_latest(sess, saver, LOG_DIR) and config.warm_start:
+        warm_start(sess, config.warm_start, config.model)
+
+    sess.run(val_itr.initializer)
+    train_handle, val_handle = sess.run([train_itr_handle, val_itr_handle])
+    # The step is tracked locally, the graph's global_step is only read once after restoring
+    step = sess.run(global_step)
+    # The final weights are saved unless the last step already was, due() depends on the time so it is not asked twice
+    last_saved = step
+    for itr in xrange(config.max_iteration):
+        feed_dict = {keep_probability: config.keep_prob, handle: train_handle}
+        if step % config.log_every == 0:
+            # Loss and accuracy of the batch the step trains on, from the same forward pass
+            _, train_loss, train_acc, summary_str = profiler.run(sess, [train_op, loss, pixel_acc, summary_op], feed_dict, itr)
+            print("Step: %d, Train_loss:%g, Train_acc:%g" % (step, train_loss, train_acc))
+            writer_train.add_summary(summary_str, step)
+        else:
+            profiler.run(sess, train_op, feed_dict, itr)
+
+        if step % config.validate_every == 0:
+            valid_feed_dict = {keep_probability: 1.0, handle: val_handle}
+            valid_loss, valid_acc, summary_str = sess.run([loss, pixel_acc, summary_op], feed_dict=valid_feed_dict)
+            print("%s ---> Validation_loss:%g, Validation_acc:%g" % (datetime.datetime.now(), valid_loss, valid_acc))
+            writer_valid.add_summary(summary_str, step)
+        if checkpoints.due(step):
+            # Named after the global step, the step count once this step's update is applied
+            save_checkpoint(step+1)
+            last_saved = step+1
+        step += 1
+    if last_saved != step:
+        save_checkpoint(step)
+    checkpoints.close()
+    profiler.close()
+    best = checkpoints.best()
+    if best:
+        print("Best checkpoint: %s (validation mIoU %g)" % (best['path'], best['metric']))
@@ -0,0 +1,176 @@
+from __future__ import print_function
+from concurrent.futures import ThreadPoolExecutor
+import tensorflow as tf
+import numpy as np
+import collections
+import resource
+import time
+import os
+from fcn.config import ROOT_DIR, IMSIZE_X, IMSIZE_Y, NUM_OF_CLASSES, log_dir, result_dir
+from fcn.models import inference, variant_name
+from fcn.checkpoint import restore_latest
+from fcn.precision import checkpoint_dir
+from fcn.profiler import Profiler
+from fcn.export import INPUT_NAME, export_dir, frozen_session_config, load_export
+from fcn.quantize import TFLiteSegmenter, tflite_path
+from fcn.tiling import TiledSegmenter
+from fcn.writers import OverlayWriter
+
+IMAGE_EXTENSIONS = ('.jpg', '.png')
+
+
+def _decode_image(im_fpath, image_size=(IMSIZE_X, IMSIZE_Y)):
+    image_decoded = tf.cast(tf.image.decode_image(tf.read_file(im_fpath), channels=3), tf.float32)
+    image_decoded.set_shape([None, None, None])
+    if image_size is None:
+        return image_decoded
+    return tf.image.resize_images(image_decoded, list(image_size))
+
+
+def setup_image_dataset(im_fpath, batch_size, num_parallel_calls=4, image_size=(IMSIZE_X, IMSIZE_Y)):
+    """ (path, resized image) batches, decoded num_parallel_calls at a time and one batch ahead, image_size None keeps the native size """
+    dataset = tf.data.Dataset.from_tensor_slices(im_fpath)
+    dataset = dataset.map(lambda f: (f, _decode_image(f, image_size)), num_parallel_calls=num_parallel_calls)
+    return dataset.batch(batch_size).prefetch(1)
+
+
+def segment_files(sess, im_fpath, out_prefixes, batch_size, writers, backbone, skip, writer=None,
+                  num_classes=NUM_OF_CLASSES, image_size=(IMSIZE_X, IMSIZE_Y), precision='float32', weights_dtype='float32', head='fc',
+                  export=None, profile_steps=None):
+    """
+    Segment images in batches and save the results on a pool of writer threads
+    :param im_fpath: list of image paths
+    :param out_prefixes: dict from image path to output path without suffix
+    :param writer: OverlayWriter, defaults to the PNG overlay and class-index outputs
+    :param export: (folder, format) of a frozen or inference export of fcn.export to run instead of building the graph
+    :param profile_steps: batches to trace with fcn.profiler, the summary goes to the model's log folder
+    """
+    fpath, image = setup_image_dataset(im_fpath, batch_size, image_size=image_size).make_one_shot_iterator().get_next()
+    org_image = tf.cast(tf.clip_by_value(tf.round(image), 0, 255), tf.uint8)
+    if export:
+        print("Using %s" % export[0])
+        image, pred, logits = load_export(sess, export[0], export[1], {INPUT_NAME: image})
+    else:
+        pred_label, logits, regularization_loss = inference(image, 1.0, backbone, skip, num_classes, precision, weights_dtype, head)
+        pred = tf.cast(tf.squeeze(pred_label, axis=3), tf.uint8)
+        print("Setting up Saver...")
+        saver = tf.train.Saver()
+        sess.run(tf.global_variables_initializer())
+        restore_latest(sess, saver, checkpoint_dir(log_dir(variant_name(backbone, skip, head), num_classes), weights_dtype))
+
+    profiler = Profiler(log_dir(variant_name(backbone, skip, head), num_classes), profile_steps, 'visualize')
+
+    def batches():
+        step = 0
+        while True:
+            try:
+                yield profiler.run(sess, [fpath, org_image, pred], step=step)
+            except tf.errors.OutOfRangeError:
+                return
+            step += 1
+    write_results(batches(), out_prefixes, batch_size, writers, writer)
+    profiler.close()
+
+
+def segment_files_tflite(sess, im_fpath, out_prefixes, model_path, writers, writer=None):
+    """ segment_files on the int8 model of fcn.quantize, one image at a time """
+    segmenter = TFLiteSegmenter(model_path)
+    print("Using %s" % model_path)
+    fpath, image = setup_image_dataset(im_fpath, 1, image_size=segmenter.image_size).make_one_shot_iterator().get_next()
+    org_image = tf.cast(tf.clip_by_value(tf.round(image), 0, 255), tf.uint8)
+
+    def batches():
+        while True:
+            try:
+                paths, images, org_images = sess.run([fpath, image, org_image])
+            except tf.errors.OutOfRangeError:
+                return
+            yield paths, org_images, [segmenter(images[0])]
+    write_results(batches(), out_prefixes, 1, writers, writer)
+
+
+def segment_files_tiled(sess, im_fpath, out_prefixes, tile_size, overlap, batch_size, writers, backbone, skip, writer=None,
+                        num_classes=NUM_OF_CLASSES, precision='float32', weights_dtype='float32', head='fc'):
+    """ segment_files at the native resolution of each image, batch_size overlapping tiles at a time (see fcn.tiling) """
+    fpath, image = setup_image_dataset(im_fpath, 1, image_size=None).make_one_shot_iterator().get_next()
+    org_image = tf.cast(tf.clip_by_value(tf.round(image), 0, 255), tf.uint8)
+    tiles = tf.placeholder(tf.float32, shape=[None] + list(tile_size) + [3])
+    pred_label, logits, regularization_loss = inference(tiles, 1.0, backbone, skip, num_classes, precision, weights_dtype, head)
+    sess.run(tf.global_variables_initializer())
+    restore_latest(sess, tf.train.Saver(), checkpoint_dir(log_dir(variant_name(backbone, skip, head), num_classes), weights_dtype))
+    segmenter = TiledSegmenter(sess, tiles, logits, tile_size, overlap, batch_size)
+
+    def batches():
+        while True:
+            try:
+                paths, images, org_images = sess.run([fpath, image, org_image])
+            except tf.errors.OutOfRangeError:
+                return
+            yield paths, org_images, [segmenter(images[0])]
+    write_results(batches(), out_prefixes, 1, writers, writer)
+
+
+def write_results(batches, out_prefixes, batch_size, writers, writer=None):
+    """
+    Save (paths, images, preds) batches on a pool of writer threads, then print the inference
+    latency per image and the peak resident memory
+    """
+    writer = writer or OverlayWriter()
+    pool = ThreadPoolExecutor(max_workers=writers)
+    pending = collections.deque()
+    latency = []
+    try:
+        while True:
+            start = time.time()
+            try:
+                paths, images, preds = next(batches)
+            except StopIteration:
+                break
+            latency.append((time.time() - start) / len(paths))
+            for path, image_np, pred_np in zip(paths, images, preds):
+                pending.append(pool.submit(writer, image_np, pred_np, out_prefixes[path.decode('utf-8')]))
+            # Bound the number of results waiting for a writer
+            while len(pending) > 2 * batch_size * writers:
+                pending.popleft().result()
+        while pending:
+            pending.popleft().result()
+    finally:
+        pool.shutdown()
+    if latency:
+        print("%.1f ms per image (median over batches), peak RSS %.0f MB" % (1000 * np.median(latency),
+                                                                            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0))
+
+
+def main(image_path, image_dir, config, writer=None):
+    """
+    Segment one image and/or every image of a folder
+    :param config: fcn.config.Config, batches of config.inference_batch_size saved by config.writer_threads threads
+    """
+    RESULT_DIR = result_dir(variant_name(config.model, config.skip, config.head), config.num_classes)
+    out_prefixes = {}
+
+    if image_path is not None:
+        if not os.path.exists(ROOT_DIR + RESULT_DIR):
+            os.makedirs(ROOT_DIR + RESULT_DIR)
+        out_prefixes[image_path] = ROOT_DIR + RESULT_DIR + os.path.splitext(image_path.split('/')[-1])[0]
+
+    if image_dir is not None:
+        if not os.path.exists(image_dir+RESULT_DIR):
+            os.makedirs(image_dir+RESULT_DIR)
+        for fname in sorted(os.listdir(image_dir)):
+            if os.path.splitext(fname)[-1] in IMAGE_EXTENSIONS:
+                out_prefixes[os.path.join(image_dir,fname)] = image_dir + RESULT_DIR + os.path.splitext(fname)[0]
+
+    with tf.Session(config=frozen_session_config() if config.runtime == 'frozen' else None) as sess:
+        if config.runtime == 'tflite':
+            segment_files_tflite(sess, sorted(out_prefixes), out_prefixes, tflite_path(config), config.writer_threads, writer)
+            return
+        if config.tile_size:
+            segment_files_tiled(sess, sorted(out_prefixes), out_prefixes, config.tile_size, config.tile_overlap, config.inference_batch_size,
+                                config.writer_threads, config.model, config.skip, writer, config.num_classes, config.precision,
+                                config.weights_dtype, config.head)
+            return
+        segment_files(sess, sorted(out_prefixes), out_prefixes, config.inference_batch_size, config.writer_threads,
+                      config.model, config.skip, writer, config.num_classes, config.image_size, config.precision, config.weights_dtype,
+                      config.head, (export_dir(config, config.runtime), config.runtime) if config.runtime in ['frozen', 'inference'] else None,
+                      config.profile_steps)
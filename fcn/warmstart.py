@@ -0,0 +1,132 @@
+from __future__ import print_function
+import tensorflow as tf
+import numpy as np
+import time
+import os
+from fcn.checkpoint import latest_checkpoint, _npz_files
+
+"""
+Warm start: initialize a new run from the compatible subset of other weights. Variables are
+matched by name and shape, tensors are read one at a time and only when they match, and
+everything that was not loaded is reported. Sources are a LOG_DIR or checkpoint path of any
+variant (e.g. the encoder and fc6/fc7 of a run with other classes or without skips), or an
+ImageNet weight file:
+    vgg16.npy / vgg19.npy   {'conv1_1': [W, b], ..., 'fc6': [W, b], ...} as distributed with tensorflow-vgg
+    bvlc_alexnet.npy        {'conv1': [W, b], ..., 'fc6': [W, b], ...} converted from the Caffe model
+    python sceneSeg.py --mode train --dataset DATASET_DIR --warmstart vgg19.npy
+"""
+# ImageNet layer -> (weight, bias) variable of the FCN, per backbone. VGG16 lacks conv3_4 to
+# conv5_4 of the VGG19 encoder, those stay randomly initialized.
+IMAGENET_LAYERS = {
+    'vgg': dict([('conv%d_%d' % (stage, i), ('W%d_%d' % (stage, i), 'b%d_%d' % (stage, i)))
+                 for stage, num_conv in enumerate([2, 2, 4, 4, 4], 1) for i in range(1, num_conv + 1)] +
+                [('fc6', ('W6', 'b6')), ('fc7', ('W7', 'b7'))]),
+    'alexnet': dict([('conv%d' % i, ('W%d' % i, 'b%d' % i)) for i in range(1, 6)] + [('fc6', ('W6', 'b6')), ('fc7', ('W7', 'b7'))]),
+}
+SCOPE = 'inference/'
+
+
+def _ungroup(W, shape):
+    """ Block diagonal weights of a Caffe grouped convolution (AlexNet conv2, conv4, conv5) """
+    groups = shape[2] // W.shape[2]
+    full = np.zeros(shape, dtype=W.dtype)
+    in_depth, out_depth = W.shape[2], shape[3] // groups
+    for g in range(groups):
+        full[:, :, g*in_depth:(g+1)*in_depth, g*out_depth:(g+1)*out_depth] = W[:, :, :, g*out_depth:(g+1)*out_depth]
+    return full
+
+
+def _imagenet_tensor(value, shape, name):
+    """ value reshaped to the variable's shape, None when they are not compatible """
+    if value.shape == tuple(shape):
+        pass
+    elif value.ndim == 2 and value.size == np.prod(shape):
+        # Fully connected weights [in, out] as a convolution over the last feature map
+        value = value.reshape(shape)
+    elif value.ndim == 4 and value.shape[:2] == tuple(shape[:2]) and value.shape[3] == shape[3] and shape[2] % value.shape[2] == 0:
+        value = _ungroup(value, shape)
+    else:
+        return None
+    if name in ('W1_1', 'W1'):
+        # Trained on BGR input, the FCN reads RGB
+        value = value[:, :, ::-1, :]
+    return value
+
+
+class _Source(object):
+    """ Lazy name -> array lookup over a TensorFlow checkpoint, npz archive(s) or ImageNet .npy file """
+
+    def __init__(self, path, backbone):
+        self.imagenet = None
+        self.reader, self.archives = None, []
+        if os.path.isdir(path):
+            found = latest_checkpoint(path)
+            if not found:
+                raise ValueError("No checkpoint found in " + path)
+            path = found
+        if path.endswith('.npy'):
+            weights = np.load(path, allow_pickle=True, encoding='latin1').item()
+            self.imagenet = {}
+            for layer, names in IMAGENET_LAYERS[backbone].items():
+                for name, value in zip(names, weights.get(layer, [])):
+                    self.imagenet[SCOPE + name] = value
+        elif _npz_files(path) or path.endswith('.npz'):
+            # Members are decompressed on access only
+            self.archives = [np.load(f) for f in (_npz_files(path) or [path])]
+        else:
+            self.reader = tf.train.NewCheckpointReader(path)
+            self.shapes = self.reader.get_variable_to_shape_map()
+        self.path = path
+
+    def lookup(self, name, shape):
+        """ (array, None) for a compatible tensor, (None, reason) otherwise """
+        if self.imagenet is not None:
+            if name not in self.imagenet:
+                return None, "not in the ImageNet weights"
+            value = _imagenet_tensor(np.asarray(self.imagenet[name]), shape, name[len(SCOPE):])
+            return (value, None) if value is not None else (None, "shape %s != %s" % (self.imagenet[name].shape, tuple(shape)))
+        if self.reader is not None:
+            if name not in self.shapes:
+                return None, "not in the checkpoint"
+            if tuple(self.shapes[name]) != tuple(shape):
+                return None, "shape %s != %s" % (tuple(self.shapes[name]), tuple(shape))
+            return self.reader.get_tensor(name), None
+        for archive in self.archives:
+            if name in archive.files:
+                value = archive[name]
+                if value.shape != tuple(shape):
+                    return None, "shape %s != %s" % (value.shape, tuple(shape))
+                return value, None
+        return None, "not in the checkpoint"
+
+    def close(self):
+        for archive in self.archives:
+            archive.close()
+
+
+def warm_start(sess, path, backbone='vgg', var_list=None):
+    """
+    Load the variables of var_list (default: the trainable ones) found with the same name and shape in path
+    :param path: LOG_DIR, checkpoint path, npz archive or ImageNet .npy file
+    :param backbone: key of BACKBONES, maps the layers of an ImageNet file
+    :return: (loaded variable names, {skipped variable name: reason})
+    """
+    start = time.time()
+    source = _Source(path, backbone)
+    loaded, skipped, size = [], {}, 0
+    try:
+        for v in (var_list if var_list is not None else tf.trainable_variables()):
+            value, reason = source.lookup(v.op.name, v.shape.as_list())
+            if value is None:
+                skipped[v.op.name] = reason
+                continue
+            v.load(value.astype(v.dtype.base_dtype.as_numpy_dtype), sess)
+            loaded.append(v.op.name)
+            size += value.nbytes
+    finally:
+        source.close()
+    print("Warm start from %s: %d variables (%.1f MB) loaded in %.1f s, %d kept their initialization"
+          % (source.path, len(loaded), size / 1e6, time.time() - start, len(skipped)))
+    for name in sorted(skipped):
+        print("    %-30s %s" % (name, skipped[name]))
+    return loaded, skipped
@@ -0,0 +1,53 @@
+from __future__ import print_function
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from PIL import Image
+from fcn.colorize import PALETTE, colorize, blend
+
+
+class OverlayWriter(object):
+    """
+    Saves the results of one image as <prefix>_seg.png (overlay), <prefix>_label.png (class indices)
+    and optionally <prefix>_color.png (color mask), directly from uint8 arrays.
+    Instances hold no state between calls and can be shared by writer threads.
+    """
+
+    def __init__(self, compress_level=1, alpha=0.5, color_mask=False, pretty=False, palette=PALETTE):
+        """
+        :param compress_level: PNG zlib level, 0 (fastest) to 9 (smallest)
+        :param color_mask: also save the color mask
+        :param pretty: save the overlay with matplotlib as before instead of the three PNG files
+        :param palette: class index -> RGB lookup table, see fcn.colorize.make_palette
+        """
+        self.compress_level = compress_level
+        self.alpha = alpha
+        self.color_mask = color_mask
+        self.pretty = pretty
+        self.palette = palette
+
+    def _save(self, array, out_path):
+        Image.fromarray(array).save(out_path, compress_level=self.compress_level)
+
+    def __call__(self, image, pred, out_prefix):
+        if self.pretty:
+            save_pretty(image, pred, out_prefix + '_seg.png', self.alpha, self.palette)
+            return
+        mask = colorize(pred, self.palette)
+        self._save(blend(image, mask, self.alpha), out_prefix + '_seg.png')
+        self._save(pred, out_prefix + '_label.png')
+        if self.color_mask:
+            self._save(mask, out_prefix + '_color.png')
+        print("Saved image : " + out_prefix + '_seg.png')
+
+
+def save_pretty(image, pred, out_path, alpha=0.5, palette=PALETTE):
+    """ matplotlib rendering of the overlay """
+    # Figure without pyplot: safe on writer threads and released after saving
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(1, 1, 1)
+    ax.axis('off')
+    ax.imshow(image)
+    ax.imshow(colorize(pred, palette), alpha=alpha)
+    fig.savefig(out_path, dpi=200, transparent=True)
+    print("Saved image : " + out_path)
@@ -0,0 +1,18 @@
+from __future__ import print_function
+from fcn.labelstore import build_label_store
+from fcn.pairing import ANNOTATIONS
+import argparse
+
+"""
+Convert the .mat labels of the train/val folders into the compact label store
+    python labelStore.py --dataset DATASET_DIR
+"""
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build the label store')
+    parser.add_argument('--dataset', type=str, required=True, help='Specify the directory of dataset')
+    parser.add_argument('--workers', type=int, default=4, help='Number of decoding processes')
+    parser.add_argument('--annotation', type=str, default='gtCoarse', choices=sorted(ANNOTATIONS), help='Label folder')
+    args = parser.parse_args()
+    for dataset_mode in ['train', 'val']:
+        num = build_label_store(args.dataset + "/" + dataset_mode, args.workers, args.annotation)
+        print("%s labels : %d" % (dataset_mode, num))
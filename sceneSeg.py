@@ -0,0 +1,8 @@
+from fcn.cli import run
+
+"""
+Scene segmentation with any model of the zoo (see fcn/cli.py for the usage)
+    python sceneSeg.py --mode train --dataset DATASET_DIR --model vgg --skip
+"""
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,86 @@
+import json
+import os
+import pytest
+import tensorflow as tf
+import fcn.checkpoint
+from fcn.checkpoint import INDEX_NAME, CheckpointManager, latest_checkpoint, restore_latest
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(fcn.checkpoint, 'time', clock)
+    return clock
+
+
+def _steps(log_dir):
+    with open(os.path.join(log_dir, INDEX_NAME)) as f:
+        return sorted(entry['step'] for entry in json.load(f))
+
+
+def test_due_step_policy(clock):
+    with tf.Graph().as_default():
+        tf.Variable(1.0, name='w')
+        manager = CheckpointManager('unused', every_steps=10, async_write=False)
+    assert [step for step in range(31) if manager.due(step)] == [0, 10, 20, 30]
+    clock.now += 1e6
+    assert not manager.due(11)
+
+
+def test_due_time_policy(clock):
+    with tf.Graph().as_default():
+        tf.Variable(1.0, name='w')
+        manager = CheckpointManager('unused', every_steps=None, every_secs=60, async_write=False)
+    assert not manager.due(0)
+    clock.now += 59
+    assert not manager.due(1)
+    clock.now += 1
+    assert manager.due(2)
+
+
+@pytest.mark.parametrize('fmt, async_write', [('tf', True), ('tf', False), ('npz', True)])
+def test_keep_last_and_best(tmpdir, clock, fmt, async_write):
+    log_dir = str(tmpdir) + '/'
+    metrics = {1: 0.5, 2: 0.9, 3: 0.1, 4: 0.7, 5: 0.2, 6: 0.3}
+    with tf.Graph().as_default():
+        w = tf.Variable(0.0, name='w')
+        manager = CheckpointManager(log_dir, keep_last=2, keep_best=2, fmt=fmt, async_write=async_write)
+        with tf.Session() as sess:
+            sess.run([tf.global_variables_initializer(), tf.local_variables_initializer()])
+            for step in sorted(metrics):
+                sess.run(tf.assign(w, float(step)))
+                manager.save(sess, step, metrics[step])
+            manager.close()
+    # The 2 latest (5, 6) and the 2 best (2: 0.9, 4: 0.7)
+    assert _steps(log_dir) == [2, 4, 5, 6]
+    assert manager.best()['step'] == 2
+    assert latest_checkpoint(log_dir).endswith('model.ckpt-6')
+    leftovers = [f for f in os.listdir(log_dir) if 'ckpt-1' in f or 'ckpt-3' in f]
+    assert leftovers == []
+    with tf.Graph().as_default():
+        w = tf.Variable(0.0, name='w')
+        with tf.Session() as sess:
+            sess.run(tf.global_variables_initializer())
+            assert restore_latest(sess, tf.train.Saver(), log_dir)
+            assert sess.run(w) == 6.0
+
+
+def test_keep_last_without_metrics(tmpdir, clock):
+    log_dir = str(tmpdir) + '/'
+    with tf.Graph().as_default():
+        tf.Variable(0.0, name='w')
+        manager = CheckpointManager(log_dir, keep_last=3, keep_best=2, async_write=False)
+        with tf.Session() as sess:
+            sess.run(tf.global_variables_initializer())
+            for step in range(1, 7):
+                manager.save(sess, step)
+    assert _steps(log_dir) == [4, 5, 6]
+    assert manager.best() is None
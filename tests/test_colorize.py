@@ -0,0 +1,39 @@
+import numpy as np
+from fcn.colorize import blend, colorize, make_palette
+from fcn.config import RGB_OF_CLASSES
+
+TRAIN_CLASSES = [0, 2, 13]
+
+
+def _loop_colorize(pred, train_classes):
+    """ The per-class loop the palette lookup replaced, anything else stays black """
+    mask = np.zeros(pred.shape + (3,))
+    for i in range(len(train_classes)):
+        mask[pred == i] = RGB_OF_CLASSES[train_classes[i]]
+    return mask
+
+
+def test_colorize_matches_loop():
+    # 3 is "other", 19, 200 and 255 are out of range
+    pred = np.array([[0, 1, 2, 3], [19, 200, 255, 2]], dtype=np.uint8)
+    mask = colorize(pred, make_palette(TRAIN_CLASSES))
+    assert mask.dtype == np.uint8 and mask.shape == (2, 4, 3)
+    np.testing.assert_array_equal(mask, _loop_colorize(pred, TRAIN_CLASSES))
+    np.testing.assert_array_equal(mask[1, :3], 0)
+
+
+def test_colorize_batch():
+    pred = np.random.RandomState(0).randint(0, 256, size=(2, 3, 5)).astype(np.uint8)
+    palette = make_palette(TRAIN_CLASSES)
+    np.testing.assert_array_equal(colorize(pred, palette), np.stack([_loop_colorize(p, TRAIN_CLASSES) for p in pred]))
+
+
+def test_blend_matches_float_alpha():
+    state = np.random.RandomState(1)
+    image = state.randint(0, 256, size=(6, 7, 3)).astype(np.uint8)
+    mask = colorize(state.randint(0, 5, size=(6, 7)).astype(np.uint8), make_palette(TRAIN_CLASSES))
+    for alpha in [0.5, 0.3]:
+        reference = image * (1 - alpha) + mask * alpha
+        blended = blend(image, mask, alpha)
+        assert blended.dtype == np.uint8
+        assert np.abs(blended.astype(np.float64) - reference).max() <= 1.5
@@ -0,0 +1,63 @@
+import json
+import pytest
+from fcn.config import DEFAULTS, SETTING_CHOICES, load_config, parse_value
+
+
+def test_defaults():
+    config = load_config()
+    assert config.as_dict() == DEFAULTS
+
+
+def test_precedence(tmpdir):
+    path = str(tmpdir.join('run.json'))
+    with open(path, 'w') as f:
+        json.dump({'batch_size': 4, 'model': 'vgg', 'image_size': [128, 256]}, f)
+    # DEFAULTS < defaults (sceneSeg_*.py shortcut) < file < --set
+    config = load_config(path, overrides={'batch_size': parse_value('8')}, defaults={'model': 'alexnet', 'skip': False})
+    assert config.batch_size == 8
+    assert config.model == 'vgg'
+    assert config.skip is False
+    assert config.image_size == [128, 256]
+    assert config.learning_rate == DEFAULTS['learning_rate']
+
+
+def test_parse_value():
+    assert parse_value('4') == 4
+    assert parse_value('[256,512]') == [256, 512]
+    assert parse_value('null') is None
+    assert parse_value('sparse') == 'sparse'
+
+
+def test_unknown_key():
+    with pytest.raises(ValueError):
+        load_config(overrides={'batchsize': 4})
+
+
+@pytest.mark.parametrize('key, value', [('labels', 'onehot'), ('sampler', 'balanced'), ('pipeline', 'fast'), ('precision', 'int8'),
+                                        ('class_weighting', 'log'), ('runtime', 'onnx'), ('annotation', 'gtMedium')])
+def test_invalid_choice(key, value):
+    with pytest.raises(ValueError) as error:
+        load_config(overrides={key: value})
+    assert key in str(error.value)
+    for choice in SETTING_CHOICES[key]:
+        assert ('null' if choice is None else choice) in str(error.value)
+
+
+def test_choices_match_the_implementations():
+    from fcn.checkpoint import FORMATS as CHECKPOINT_FORMATS
+    from fcn.export import FORMATS as EXPORT_FORMATS
+    from fcn.models import BACKBONES, HEADS
+    from fcn.precision import DTYPES
+    assert sorted(SETTING_CHOICES['model']) == sorted(BACKBONES)
+    assert sorted(SETTING_CHOICES['head']) == sorted(HEADS)
+    assert sorted(SETTING_CHOICES['precision']) == sorted(SETTING_CHOICES['weights_dtype']) == sorted(DTYPES)
+    assert SETTING_CHOICES['export_format'] == EXPORT_FORMATS
+    assert SETTING_CHOICES['checkpoint_format'] == CHECKPOINT_FORMATS
+
+
+def test_mode_choices():
+    from fcn.cli import MODES, parse_args
+    assert parse_args(['--mode', 'serve']).mode == 'serve'
+    assert 'stream' in MODES
+    with pytest.raises(SystemExit):
+        parse_args(['--mode', 'tune'])
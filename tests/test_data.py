@@ -0,0 +1,51 @@
+import numpy as np
+import tensorflow as tf
+from fcn.data import setup_dataset
+
+
+def _file_names(dataset):
+    """ Image paths of one pass, the dataset stops before decoding """
+    names = []
+    with tf.Graph().as_default():
+        next_element = dataset().make_one_shot_iterator().get_next()
+        with tf.Session() as sess:
+            while True:
+                try:
+                    names.append(sess.run(next_element)[0].decode('utf-8'))
+                except tf.errors.OutOfRangeError:
+                    return names
+
+
+def _stop_after_file_names(monkeypatch):
+    monkeypatch.setattr(tf.data.Dataset, 'map', lambda self, *args, **kwargs: self)
+    monkeypatch.setattr(tf.data.Dataset, 'batch', lambda self, *args, **kwargs: self)
+
+
+def _shards(num_shards, factors):
+    im_fpath = ['im_%02d.png' % i for i in range(len(factors))]
+    lab_fpath = ['lab_%02d.mat' % i for i in range(len(factors))]
+    return im_fpath, [_file_names(lambda: setup_dataset(im_fpath, lab_fpath, repeat=False, repeat_factors=factors, shard=(num_shards, i)))
+                      for i in range(num_shards)]
+
+
+def test_shards_are_disjoint_with_repeat_factors(monkeypatch):
+    _stop_after_file_names(monkeypatch)
+    factors = np.array([1, 2, 3, 4, 1, 2, 3, 4, 1, 2, 3], dtype=np.float32)
+    im_fpath, shards = _shards(3, factors)
+    for i, shard in enumerate(shards):
+        # Worker i keeps files i, i+3, ... and nothing else
+        assert sorted(set(shard)) == im_fpath[i::3]
+    # Every file of the training set, each repeated by its own whole factor
+    names = sum(shards, [])
+    assert sorted(set(names)) == im_fpath
+    assert [names.count(name) for name in im_fpath] == [int(f) for f in factors]
+
+
+def test_fractional_repeat_factors_with_shards(monkeypatch):
+    _stop_after_file_names(monkeypatch)
+    factors = np.full(400, 1.5, dtype=np.float32)
+    im_fpath, shards = _shards(2, factors)
+    counts = [sum(shards, []).count(name) for name in im_fpath]
+    # floor(r) or floor(r)+1 copies, r on average
+    assert set(counts) == set([1, 2])
+    assert abs(np.mean(counts) - 1.5) < 0.1
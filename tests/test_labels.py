@@ -0,0 +1,69 @@
+import numpy as np
+import scipy.io as spio
+import tensorflow as tf
+from fcn.data import _read_py_function, _read_sparse_py_function
+from fcn.train import entropy_loss
+
+TRAIN_CLASSES = [0, 2, 5]
+
+
+def _label_file(tmpdir):
+    """ 4x5 one-hot .mat label of 19 classes, with unlabeled pixels and pixels of class 1 (not trained) """
+    classes = np.random.RandomState(0).choice([0, 1, 2, 5, -1], size=(4, 5))
+    label = np.zeros((4, 5, 19), dtype=np.uint8)
+    for c in [0, 1, 2, 5]:
+        label[:, :, c] = classes == c
+    path = str(tmpdir.join('aachen_000000_000000_gtCoarse_color.mat'))
+    spio.savemat(path, {'label': label})
+    return path, classes
+
+
+def test_sparse_labels_match_dense(tmpdir):
+    path, classes = _label_file(tmpdir)
+    dense = _read_py_function(None, path, TRAIN_CLASSES)[1]
+    sparse = _read_sparse_py_function(None, path, TRAIN_CLASSES)[1]
+    assert dense.shape == (4, 5, 4) and sparse.dtype == np.uint8
+    np.testing.assert_array_equal(dense.sum(axis=2), 1)
+    np.testing.assert_array_equal(sparse, np.argmax(dense, axis=2))
+    # Class 1 and unlabeled pixels are "other"
+    np.testing.assert_array_equal(sparse == 3, (classes == 1) | (classes == -1))
+
+
+def _softmax_entropy(logits, one_hot, class_weights=None):
+    """ Mean softmax cross-entropy over the pixels not labeled "other", from one-hot labels, weighted by class """
+    log_p = logits - np.log(np.sum(np.exp(logits), axis=-1, keepdims=True))
+    entropy = -np.sum(one_hot * log_p, axis=-1)
+    weights = 1.0 - one_hot[..., -1]
+    if class_weights is not None:
+        weights = weights * np.sum(one_hot * class_weights, axis=-1)
+    return np.sum(weights * entropy) / np.sum(weights)
+
+
+def test_sparse_loss_ignores_other_and_weighs_classes(tmpdir):
+    path, classes = _label_file(tmpdir)
+    dense = _read_py_function(None, path, TRAIN_CLASSES)[1][np.newaxis]
+    sparse = _read_sparse_py_function(None, path, TRAIN_CLASSES)[1][np.newaxis]
+    logits = np.random.RandomState(1).randn(1, 4, 5, 4).astype(np.float32)
+    class_weights = np.array([0.5, 2.0, 1.0, 0.0], dtype=np.float32)
+    with tf.Graph().as_default(), tf.Session() as sess:
+        unweighted, weighted, dense_loss = sess.run([
+            entropy_loss(tf.constant(logits), tf.constant(sparse), sparse=True, num_classes=3),
+            entropy_loss(tf.constant(logits), tf.constant(sparse), sparse=True, num_classes=3, class_weights=class_weights),
+            entropy_loss(tf.constant(logits), tf.constant(dense), sparse=False, num_classes=3)])
+        dense_weighted = sess.run(entropy_loss(tf.constant(logits), tf.constant(dense), num_classes=3, class_weights=class_weights))
+    np.testing.assert_allclose(unweighted, _softmax_entropy(logits, dense), rtol=1e-5)
+    np.testing.assert_allclose(weighted, _softmax_entropy(logits, dense, class_weights), rtol=1e-5)
+    # The one-hot path is a sigmoid per channel over every pixel, "other" included
+    sigmoid = np.maximum(logits, 0) - logits * dense + np.log1p(np.exp(-np.abs(logits)))
+    np.testing.assert_allclose(dense_loss, sigmoid.mean(), rtol=1e-5)
+    pixel_weights = np.sum(dense * class_weights, axis=-1, keepdims=True)
+    np.testing.assert_allclose(dense_weighted, np.sum(pixel_weights * sigmoid) / (pixel_weights.sum() * 4), rtol=1e-5)
+
+
+def test_weighted_loss_is_scale_invariant(tmpdir):
+    sparse = _read_sparse_py_function(None, _label_file(tmpdir)[0], TRAIN_CLASSES)[1][np.newaxis]
+    class_weights = np.array([0.5, 2.0, 1.0, 1.0], dtype=np.float32)
+    with tf.Graph().as_default(), tf.Session() as sess:
+        logits = tf.constant(np.random.RandomState(2).randn(1, 4, 5, 4).astype(np.float32))
+        losses = sess.run([entropy_loss(logits, tf.constant(sparse), True, 3, scale * class_weights) for scale in [1.0, 10.0]])
+    np.testing.assert_allclose(losses[0], losses[1], rtol=1e-5)
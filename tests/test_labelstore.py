@@ -0,0 +1,34 @@
+import numpy as np
+import scipy.io as spio
+import os
+from fcn.labelstore import build_label_store, open_label_store
+
+TRAIN_CLASSES = [0, 1, 2]
+
+
+def _write_label(split_dir, name, cls):
+    label = np.zeros((4, 6, 19), dtype=np.uint8)
+    label[:, :, cls] = 1
+    spio.savemat(os.path.join(split_dir, 'gtCoarse', name + '_gtCoarse_color.mat'), {'label': label})
+    return os.path.join(split_dir, 'gtCoarse', name + '_gtCoarse_color.mat')
+
+
+def test_store_reads_remapped_labels(tmpdir):
+    split_dir = str(tmpdir.mkdir('train'))
+    os.mkdir(os.path.join(split_dir, 'gtCoarse'))
+    lab_fpath = [_write_label(split_dir, 'aachen_000000_%06d' % i, i) for i in range(3)]
+    build_label_store(split_dir, workers=1)
+    store = open_label_store(str(tmpdir), 'train', [2, 0], lab_fpath=lab_fpath)
+    assert len(store) == 3
+    # Class 1 is not a train class and maps to "other"
+    assert [int(store.read(p)[0, 0]) for p in lab_fpath] == [1, 2, 0]
+
+
+def test_stale_store_is_not_used(tmpdir):
+    split_dir = str(tmpdir.mkdir('train'))
+    os.mkdir(os.path.join(split_dir, 'gtCoarse'))
+    lab_fpath = [_write_label(split_dir, 'aachen_000000_%06d' % i, 0) for i in range(2)]
+    build_label_store(split_dir, workers=1)
+    lab_fpath.append(_write_label(split_dir, 'aachen_000000_000002', 0))
+    assert open_label_store(str(tmpdir), 'train', TRAIN_CLASSES, lab_fpath=lab_fpath[:2]) is not None
+    assert open_label_store(str(tmpdir), 'train', TRAIN_CLASSES, lab_fpath=lab_fpath) is None
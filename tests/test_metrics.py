@@ -0,0 +1,37 @@
+import numpy as np
+import tensorflow as tf
+from fcn.metrics import ConfusionMatrix, confusion_matrix_op
+
+# 3 training classes, class index 3 is "other"
+GT = np.array([0, 0, 0, 1, 1, 2, 2, 2, 3, 3])
+PRED = np.array([0, 0, 1, 1, 3, 2, 2, 0, 0, 2])
+# Rows are ground truth 0..2, columns predictions 0..2 and "other"; the two ground truth "other" pixels are ignored
+EXPECTED = np.array([[2, 1, 0, 0],
+                     [0, 1, 0, 1],
+                     [1, 0, 2, 0]])
+
+
+def test_update_counts_and_ious():
+    matrix = ConfusionMatrix(3)
+    matrix.update(GT.reshape(2, 5), PRED.reshape(2, 5))
+    np.testing.assert_array_equal(matrix.matrix, EXPECTED)
+    # tp / (gt + pred - tp)
+    np.testing.assert_allclose(matrix.iou(), [2 / 4.0, 1 / 3.0, 2 / 3.0])
+    np.testing.assert_allclose(matrix.mean_iou(), (2 / 4.0 + 1 / 3.0 + 2 / 3.0) / 3)
+    np.testing.assert_allclose(matrix.pixel_accuracy(), 5 / 8.0)
+
+
+def test_absent_class_is_nan():
+    matrix = ConfusionMatrix(3)
+    matrix.update(np.array([0, 0, 1]), np.array([0, 0, 1]))
+    iou = matrix.iou()
+    assert np.isnan(iou[2])
+    np.testing.assert_allclose(matrix.mean_iou(), 1.0)
+
+
+def test_graph_op_matches_update():
+    with tf.Graph().as_default(), tf.Session() as sess:
+        batch_matrix = sess.run(confusion_matrix_op(tf.constant(GT), tf.constant(PRED), num_classes=3))
+    matrix = ConfusionMatrix(3)
+    matrix.add(batch_matrix)
+    np.testing.assert_array_equal(matrix.matrix, EXPECTED)
@@ -0,0 +1,31 @@
+import os
+from fcn.pairing import frame_id, pair_files
+
+
+def _touch(path):
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    open(path, 'w').close()
+    return path
+
+
+def test_frame_id():
+    assert frame_id('/data/train/leftImg8bit/aachen/aachen_000000_000019_leftImg8bit.png') == 'aachen_000000_000019'
+    assert frame_id('cover.png') is None
+
+
+def test_nested_city_layout(tmpdir):
+    split = str(tmpdir)
+    images = [_touch(os.path.join(split, 'leftImg8bit', city, '%s_000000_%06d_leftImg8bit.png' % (city, i)))
+              for city in ['bremen', 'aachen'] for i in range(2)]
+    labels = [_touch(os.path.join(split, 'gtCoarse', city, '%s_000000_%06d_gtCoarse_color.mat' % (city, i)))
+              for city in ['aachen', 'bremen'] for i in range(2)]
+    # A label without its image, an image without its label and a file without a frame id
+    orphan_label = _touch(os.path.join(split, 'gtCoarse', 'aachen', 'aachen_000000_000005_gtCoarse_color.mat'))
+    orphan_image = _touch(os.path.join(split, 'leftImg8bit', 'bremen', 'bremen_000001_000000_leftImg8bit.png'))
+    unnamed = _touch(os.path.join(split, 'leftImg8bit', 'bremen', 'x_leftImg8bit.png'))
+    im_fpath, lab_fpath, unmatched = pair_files(split)
+    assert im_fpath == sorted(images)
+    assert lab_fpath == sorted(labels)
+    assert [frame_id(p) for p in im_fpath] == [frame_id(p) for p in lab_fpath]
+    assert sorted(unmatched) == sorted([orphan_label, orphan_image, unnamed])
@@ -0,0 +1,71 @@
+import numpy as np
+import scipy.io as spio
+from PIL import Image
+import os
+from fcn.config import IMSIZE_X, IMSIZE_Y
+from fcn.scan import load_manifest, scan_split, write_manifest
+
+
+def _write_pair(split, city, i):
+    name = '%s_000000_%06d' % (city, i)
+    for folder in ['leftImg8bit/' + city, 'gtCoarse/' + city]:
+        if not os.path.isdir(os.path.join(split, folder)):
+            os.makedirs(os.path.join(split, folder))
+    Image.new('RGB', (16, 8)).save(os.path.join(split, 'leftImg8bit', city, name + '_leftImg8bit.png'))
+    label = np.zeros((IMSIZE_X, IMSIZE_Y, 19), dtype=np.uint8)
+    label[:, :, i % 19] = 1
+    spio.savemat(os.path.join(split, 'gtCoarse', city, name + '_gtCoarse_color.mat'), {'label': label})
+
+
+def _scan(split):
+    manifest, problems = scan_split(split, workers=2)
+    assert problems == []
+    write_manifest(split, manifest)
+    return manifest
+
+
+def test_manifest_lists_nested_pairs(tmpdir):
+    split = str(tmpdir)
+    for city, i in [('aachen', 0), ('aachen', 1), ('bremen', 2)]:
+        _write_pair(split, city, i)
+    manifest = _scan(split)
+    assert len(manifest['samples']) == 3
+    assert manifest['class_pixels'][:3] == [IMSIZE_X * IMSIZE_Y] * 3
+    im_fpath, lab_fpath = load_manifest(split)
+    assert [os.path.basename(os.path.dirname(p)) for p in im_fpath] == ['aachen', 'aachen', 'bremen']
+    assert all(os.path.exists(p) for p in im_fpath + lab_fpath)
+
+
+def test_file_added_to_city_folder_triggers_rescan(tmpdir):
+    split = str(tmpdir)
+    _write_pair(split, 'aachen', 0)
+    _write_pair(split, 'bremen', 1)
+    _scan(split)
+    assert load_manifest(split) is not None
+    # Only the city subfolders change, the top-level image and label folders keep their times
+    top = [os.stat(os.path.join(split, d)).st_mtime for d in ['leftImg8bit', 'gtCoarse']]
+    _write_pair(split, 'bremen', 2)
+    assert [os.stat(os.path.join(split, d)).st_mtime for d in ['leftImg8bit', 'gtCoarse']] == top
+    assert load_manifest(split) is None
+    _scan(split)
+    assert len(load_manifest(split)[0]) == 3
+
+
+def test_load_does_not_list_the_folders(tmpdir, monkeypatch):
+    split = str(tmpdir)
+    _write_pair(split, 'aachen', 0)
+    _scan(split)
+    monkeypatch.setattr(os, 'walk', None)
+    monkeypatch.setattr(os, 'listdir', None)
+    assert len(load_manifest(split)[0]) == 1
+
+
+def test_new_or_removed_city_folder_triggers_rescan(tmpdir):
+    split = str(tmpdir)
+    _write_pair(split, 'aachen', 0)
+    _scan(split)
+    os.makedirs(os.path.join(split, 'gtCoarse', 'bremen'))
+    assert load_manifest(split) is None
+    _scan(split)
+    os.rmdir(os.path.join(split, 'gtCoarse', 'bremen'))
+    assert load_manifest(split) is None
@@ -0,0 +1,58 @@
+import json
+import threading
+import pytest
+import tensorflow as tf
+from six.moves import http_client
+import fcn.models
+from fcn import serve
+from fcn.config import load_config
+
+
+def _config(**settings):
+    return load_config(overrides=dict({'model': 'alexnet', 'skip': False, 'image_size': [64, 128]}, **settings))
+
+
+def _get_health(health):
+    server = serve.make_server(None, _config(), port=0, health=health)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    try:
+        conn = http_client.HTTPConnection('127.0.0.1', server.server_address[1])
+        conn.request('GET', '/health')
+        response = conn.getresponse()
+        return response.status, json.loads(response.read().decode('utf-8'))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_health_status_code():
+    assert _get_health({'status': 'ok'})[0] == 200
+    assert _get_health({'status': 'random_weights'}) == (503, {'status': 'random_weights'})
+
+
+def test_build_refuses_random_weights(tmpdir, monkeypatch):
+    monkeypatch.setattr(fcn.models, 'log_dir', lambda variant, num_classes: str(tmpdir) + '/')
+    with tf.Graph().as_default(), tf.Session() as sess:
+        with pytest.raises(ValueError) as error:
+            serve.build(sess, _config())
+        assert 'serve_random_weights' in str(error.value)
+    with tf.Graph().as_default(), tf.Session() as sess:
+        image, pred, checkpoint = serve.build(sess, _config(serve_random_weights=True))
+        assert checkpoint is None
+
+
+def test_build_rejects_tflite():
+    with tf.Graph().as_default(), tf.Session() as sess:
+        with pytest.raises(ValueError) as error:
+            serve.build(sess, _config(runtime='tflite', serve_random_weights=True))
+    assert 'tflite' in str(error.value)
+
+
+def test_main_exits_with_a_message(tmpdir, monkeypatch):
+    monkeypatch.setattr(fcn.models, 'log_dir', lambda variant, num_classes: str(tmpdir) + '/')
+    with tf.Graph().as_default():
+        with pytest.raises(SystemExit) as error:
+            serve.main(_config())
+    assert 'No checkpoint found' in str(error.value)
@@ -0,0 +1,71 @@
+import numpy as np
+import scipy.io as spio
+import os
+import time
+from fcn.stats import STATS_PREFIX, class_weights, load_stats, repeat_factors
+
+TRAIN_CLASSES = [0, 1, 2]
+
+
+def _stats():
+    """ 4 images: class 0 everywhere, class 1 in two images, class 2 in one, class 7 (not trained) in one """
+    image_classes = {'a_0_0': [0, 1], 'a_0_1': [0, 1], 'a_0_2': [0, 2], 'a_0_3': [0, 7]}
+    pixels = np.zeros(256, dtype=np.int64)
+    pixels[[0, 1, 2, 7]] = [300, 60, 20, 20]
+    images = np.zeros(256, dtype=np.int64)
+    images[[0, 1, 2, 7]] = [4, 2, 1, 1]
+    return {'pixels': pixels.tolist(), 'images': images.tolist(), 'num_images': 4, 'image_classes': image_classes}
+
+
+def test_inverse_weights():
+    weights = class_weights(_stats(), TRAIN_CLASSES, 'inverse', max_weight=100.0)
+    # 1 / pixel frequency of classes 0, 1, 2 and "other" (class 7), normalized to a mean of 1
+    inverse = 400.0 / np.array([300, 60, 20, 20])
+    np.testing.assert_allclose(weights, inverse / inverse.mean(), rtol=1e-6)
+    assert class_weights(_stats(), TRAIN_CLASSES, 'inverse', max_weight=1.5).max() == 1.5
+
+
+def test_median_weights():
+    weights = class_weights(_stats(), TRAIN_CLASSES, 'median', max_weight=100.0)
+    # Pixel share in the images containing the class, 100 pixels per image, "other" counted over every image
+    frequency = np.array([300 / 400.0, 60 / 200.0, 20 / 100.0, 20 / 400.0])
+    np.testing.assert_allclose(weights, np.median(frequency) / frequency, rtol=1e-6)
+
+
+def test_absent_class_gets_no_weight():
+    assert class_weights(_stats(), [0, 1, 3], 'inverse')[2] == 0
+
+
+def test_repeat_factors():
+    lab_fpath = ['a_0_%d_gtCoarse_color.mat' % i for i in range(4)]
+    factors = repeat_factors(_stats(), lab_fpath, TRAIN_CLASSES, threshold=0.5)
+    # Rarest training class per image: 1 (in 2/4 images), 1, 2 (1/4) and 0 (4/4); class 7 is not trained
+    np.testing.assert_allclose(factors, [1.0, 1.0, np.sqrt(0.5 / 0.25), 1.0], rtol=1e-6)
+    np.testing.assert_allclose(repeat_factors(_stats(), lab_fpath, TRAIN_CLASSES, threshold=1.0),
+                               [np.sqrt(2), np.sqrt(2), 2.0, 1.0], rtol=1e-6)
+
+
+def _write_label(path, cls):
+    label = np.zeros((4, 6, 19), dtype=np.uint8)
+    label[:, :, cls] = 1
+    spio.savemat(path, {'label': label})
+    return path
+
+
+def test_stats_cache(tmpdir):
+    split = str(tmpdir)
+    lab_fpath = [_write_label(os.path.join(split, 'a_000000_%06d_gtCoarse_color.mat' % i), i) for i in range(2)]
+    stats = load_stats(split, lab_fpath, workers=1)
+    assert stats['pixels'][:2] == [24, 24] and stats['images'][:2] == [1, 1]
+    caches = [f for f in os.listdir(split) if f.startswith(STATS_PREFIX)]
+    assert len(caches) == 1
+    # Served from the cache while the labels are unchanged
+    with open(os.path.join(split, caches[0]), 'w') as f:
+        f.write('{"cached": true}')
+    assert load_stats(split, lab_fpath, workers=1) == {'cached': True}
+    # A rewritten label changes the fingerprint, as does a new one
+    os.utime(_write_label(lab_fpath[1], 2), (time.time() + 10, time.time() + 10))
+    assert load_stats(split, lab_fpath, workers=1)['pixels'][:3] == [24, 0, 24]
+    lab_fpath.append(_write_label(os.path.join(split, 'a_000000_000002_gtCoarse_color.mat'), 0))
+    assert load_stats(split, lab_fpath, workers=1)['num_images'] == 3
+    assert len([f for f in os.listdir(split) if f.startswith(STATS_PREFIX)]) == 3
@@ -0,0 +1,75 @@
+import threading
+import time
+import numpy as np
+import pytest
+from fcn.stream import stream
+
+IMAGE_SIZE = (8, 16)
+
+
+class FakeSession(object):
+    """ Predicts class 0 everywhere """
+
+    def run(self, pred, feed_dict):
+        return np.zeros(list(feed_dict.values())[0].shape[:3], dtype=np.uint8)
+
+
+class ListSink(object):
+    def __init__(self, fail_after=None):
+        self.names, self.closed, self.fail_after = [], False, fail_after
+
+    def __call__(self, name, image, pred):
+        if self.fail_after is not None and len(self.names) >= self.fail_after:
+            raise IOError("disk full")
+        self.names.append(name)
+
+    def close(self):
+        self.closed = True
+
+
+def _frames(count, delay=0.0):
+    for i in range(count):
+        yield '%06d' % i, np.zeros(IMAGE_SIZE + (3,), dtype=np.uint8)
+        time.sleep(delay)
+
+
+def _run(frames, sink, timeout=20):
+    """ stream() in a thread, (result, exception) or a failure when it hangs """
+    outcome = {}
+
+    def target():
+        try:
+            outcome['result'] = stream(FakeSession(), frames, sink, 'image', 'pred', 4, IMAGE_SIZE, queue_size=2)
+        except Exception as e:
+            outcome['error'] = e
+    thread = threading.Thread(target=target)
+    thread.daemon = True
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        pytest.fail("stream() hangs")
+    return outcome.get('result'), outcome.get('error')
+
+
+def test_all_frames_reach_the_sink():
+    sink = ListSink()
+    (num_frames, elapsed, latencies), error = _run(_frames(10), sink)
+    assert error is None and num_frames == 10
+    assert sink.names == ['%06d' % i for i in range(10)] and sink.closed
+
+
+def test_sink_error_is_raised():
+    # The reader is between frames, the input queue empty, when the sink fails
+    sink = ListSink(fail_after=1)
+    result, error = _run(_frames(5, delay=0.5), sink)
+    assert isinstance(error, IOError) and sink.closed
+
+
+def test_reader_error_is_raised():
+    def frames():
+        for item in _frames(3):
+            yield item
+        raise ValueError("corrupt frame")
+    sink = ListSink()
+    result, error = _run(frames(), sink)
+    assert isinstance(error, ValueError) and sink.closed
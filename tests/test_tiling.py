@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from fcn.tiling import TiledSegmenter, blend_weights, tile_offsets
+
+
+class PixelwiseSession(object):
+    """ Stands in for a session running a per-pixel classifier: the logits of a pixel are its RGB values """
+
+    def __init__(self):
+        self.tiles = []
+
+    def run(self, logits, feed_dict):
+        batch = list(feed_dict.values())[0]
+        self.tiles.extend(batch)
+        return batch
+
+
+def test_tile_offsets_cover_the_length():
+    assert tile_offsets(64, 64, 16) == [0]
+    offsets = tile_offsets(150, 64, 16)
+    assert offsets[0] == 0 and offsets[-1] == 150 - 64
+    assert all(b - a <= 64 - 16 for a, b in zip(offsets, offsets[1:]))
+
+
+def test_blend_weights_are_positive():
+    weights = blend_weights((64, 96), 16)
+    assert weights.shape == (64, 96)
+    assert weights.min() > 0 and weights.max() == 1
+
+
+@pytest.mark.parametrize('shape', [(100, 150), (64, 64), (40, 200)])
+def test_tiled_equals_untiled(shape):
+    image = np.random.RandomState(0).rand(shape[0], shape[1], 3).astype(np.float32)
+    sess = PixelwiseSession()
+    segmenter = TiledSegmenter(sess, 'image', 'logits', (64, 64), overlap=16, batch_size=3)
+    pred = segmenter(image)
+    assert pred.shape == shape and pred.dtype == np.uint8
+    np.testing.assert_array_equal(pred, np.argmax(image, axis=2))
+    assert all(tile.shape == (64, 64, 3) for tile in sess.tiles)
+
+
+def test_rejects_bad_tiles():
+    with pytest.raises(ValueError):
+        TiledSegmenter(PixelwiseSession(), 'image', 'logits', (60, 64))
+    with pytest.raises(ValueError):
+        TiledSegmenter(PixelwiseSession(), 'image', 'logits', (64, 64), overlap=64)
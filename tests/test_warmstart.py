@@ -0,0 +1,80 @@
+import numpy as np
+import tensorflow as tf
+from fcn.warmstart import SCOPE, _imagenet_tensor, _ungroup, warm_start
+
+
+def test_ungroup_is_block_diagonal():
+    # 2 groups: 3 of the 6 input channels each, 2 of the 4 outputs each
+    W = np.arange(1, 3 * 3 * 3 * 4 + 1, dtype=np.float32).reshape(3, 3, 3, 4)
+    full = _ungroup(W, (3, 3, 6, 4))
+    np.testing.assert_array_equal(full[:, :, :3, :2], W[:, :, :, :2])
+    np.testing.assert_array_equal(full[:, :, 3:, 2:], W[:, :, :, 2:])
+    assert not full[:, :, :3, 2:].any() and not full[:, :, 3:, :2].any()
+
+
+def test_imagenet_tensor_reshapes():
+    same = np.ones((3, 3, 64, 64), dtype=np.float32)
+    assert _imagenet_tensor(same, [3, 3, 64, 64], 'W1_2') is same
+    # fc6 [7*7*512, 4096] as a 7x7 convolution
+    fc = np.random.RandomState(0).rand(7 * 7 * 8, 16).astype(np.float32)
+    np.testing.assert_array_equal(_imagenet_tensor(fc, [7, 7, 8, 16], 'W6'), fc.reshape(7, 7, 8, 16))
+    grouped = np.ones((5, 5, 48, 256), dtype=np.float32)
+    assert _imagenet_tensor(grouped, [5, 5, 96, 256], 'W2').shape == (5, 5, 96, 256)
+
+
+def test_imagenet_tensor_flips_bgr_input():
+    W = np.random.RandomState(1).rand(3, 3, 3, 8).astype(np.float32)
+    np.testing.assert_array_equal(_imagenet_tensor(W, [3, 3, 3, 8], 'W1_1'), W[:, :, ::-1, :])
+    np.testing.assert_array_equal(_imagenet_tensor(W, [3, 3, 3, 8], 'W1'), W[:, :, ::-1, :])
+
+
+def test_imagenet_tensor_incompatible():
+    assert _imagenet_tensor(np.ones((3, 3, 64, 128)), [3, 3, 64, 64], 'W1_2') is None
+    assert _imagenet_tensor(np.ones((100, 16)), [7, 7, 8, 16], 'W6') is None
+    # 5 input channels do not divide 96
+    assert _imagenet_tensor(np.ones((5, 5, 5, 256)), [5, 5, 96, 256], 'W2') is None
+
+
+def _variables(shapes):
+    with tf.variable_scope('inference'):
+        return [tf.get_variable(name, initializer=tf.zeros(shape)) for name, shape in shapes]
+
+
+def test_warm_start_skips_incompatible_variables(tmpdir):
+    source = str(tmpdir.join('model.ckpt-1'))
+    with tf.Graph().as_default():
+        variables = _variables([('W1', [2, 2]), ('W2', [3]), ('b8', [4])])
+        with tf.Session() as sess:
+            sess.run([tf.assign(v, tf.ones_like(v) * (i + 1)) for i, v in enumerate(variables)])
+            tf.train.Saver().save(sess, source)
+    with tf.Graph().as_default():
+        # W2 changed shape, b8 matches, W9 is new
+        variables = _variables([('W1', [2, 2]), ('W2', [5]), ('b8', [4]), ('W9', [2])])
+        with tf.Session() as sess:
+            sess.run(tf.global_variables_initializer())
+            loaded, skipped = warm_start(sess, source, var_list=variables)
+            values = sess.run(variables)
+    assert sorted(loaded) == ['inference/W1', 'inference/b8']
+    assert sorted(skipped) == ['inference/W2', 'inference/W9']
+    assert 'shape' in skipped['inference/W2'] and 'not in' in skipped['inference/W9']
+    np.testing.assert_array_equal(values[0], 1)
+    np.testing.assert_array_equal(values[1], 0)
+    np.testing.assert_array_equal(values[2], 3)
+
+
+def test_warm_start_from_imagenet_file(tmpdir):
+    path = str(tmpdir.join('bvlc_alexnet.npy'))
+    conv1 = np.random.RandomState(2).rand(11, 11, 3, 4).astype(np.float32)
+    conv2 = np.random.RandomState(3).rand(5, 5, 2, 6).astype(np.float32)
+    np.save(path, {'conv1': [conv1, np.ones(4, np.float32)], 'conv2': [conv2, np.ones(6, np.float32)],
+                   'conv3': [np.ones((3, 3, 7, 7), np.float32)]})
+    with tf.Graph().as_default():
+        variables = _variables([('W1', [11, 11, 3, 4]), ('b1', [4]), ('W2', [5, 5, 4, 6]), ('W3', [3, 3, 6, 6])])
+        with tf.Session() as sess:
+            sess.run(tf.global_variables_initializer())
+            loaded, skipped = warm_start(sess, path, 'alexnet', var_list=variables)
+            W1, W2 = sess.run([variables[0], variables[2]])
+    assert sorted(loaded) == [SCOPE + 'W1', SCOPE + 'W2', SCOPE + 'b1']
+    assert sorted(skipped) == [SCOPE + 'W3']
+    np.testing.assert_array_equal(W1, conv1[:, :, ::-1, :])
+    np.testing.assert_array_equal(W2, _ungroup(conv2, (5, 5, 4, 6)))